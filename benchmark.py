@@ -0,0 +1,336 @@
+import getopt
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+import datasets
+from database import SQLiteDataBase
+
+
+# the usage of the benchmark on the command line
+USAGE = 'benchmark.py -r <rows> -c <idealcolumns> -t <testpoints> -n <repeat> -w <workers> ' \
+        '--seed=<seed> --noreference --output=<jsonfile> --compare=<jsonfile>'
+# the version of the layout of the result file
+BENCHMARK_VERSION = 1
+# the size of the generated data files if not overriden by command line option
+DEFAULT_ROWS = 400
+DEFAULT_IDEAL_COLUMNS = 50
+DEFAULT_TRAIN_COLUMNS = 4
+DEFAULT_TEST_POINTS = 100
+# the methods measured by the benchmark. the first one of every stage is the reference
+# implementation, which the results of all other methods are compared against
+COMPARE_METHODS = ('python', 'numpy', 'pruned', 'indexed', 'parallel')
+ASSIGN_METHODS = ('python', 'index', 'parallel')
+WRITE_MODES = datasets.WRITE_MODES
+# a measured time is reported as regression if it is more than this factor slower than before
+REGRESSION_FACTOR = 1.2
+
+
+def generate_data_files(directory, rows=DEFAULT_ROWS, ideal_columns=DEFAULT_IDEAL_COLUMNS,
+                        train_columns=DEFAULT_TRAIN_COLUMNS, test_points=DEFAULT_TEST_POINTS, seed=0):
+    """
+    writes synthetic data files like train.csv, ideal.csv and test.csv of any
+    size. every ideal function is a random mix of a sine, a line and an offset,
+    every train function is one of the ideal functions with noise and the test
+    points lie near one of the chosen ideal functions or somewhere in between
+    :param directory: the directory the files are written to
+    :param rows: the number of x-values of the train and ideal functions
+    :param ideal_columns: the number of ideal functions
+    :param train_columns: the number of train functions
+    :param test_points: the number of test points
+    :param seed: the seed of the random numbers, the same seed gives the same files
+    :return: dictionary with the filenames of 'train', 'ideal' and 'test'
+    """
+    rng = np.random.default_rng(seed)
+    x_values = np.round(np.linspace(-20, 20, rows), 6)
+    amplitudes, frequencies, slopes, offsets = rng.uniform([0, 0.1, -2, -10], [10, 2, 2, 10],
+                                                           size=(ideal_columns, 4)).T
+    ideal_functions = amplitudes[:, np.newaxis] * np.sin(frequencies[:, np.newaxis] * x_values) + \
+        slopes[:, np.newaxis] * x_values + offsets[:, np.newaxis]
+    ideal_dataframe = pd.DataFrame(ideal_functions.T, columns=['y' + str(i + 1) for i in range(ideal_columns)])
+    ideal_dataframe.insert(0, 'x', x_values)
+    chosen_functions = rng.choice(ideal_columns, size=train_columns, replace=train_columns > ideal_columns)
+    train_dataframe = pd.DataFrame((ideal_functions[chosen_functions] +
+                                    rng.normal(0, 0.3, size=(train_columns, rows))).T,
+                                   columns=['y' + str(i + 1) for i in range(train_columns)])
+    train_dataframe.insert(0, 'x', x_values)
+    # most test points are near a chosen ideal function, the others are anywhere
+    test_rows = rng.integers(0, rows, size=test_points)
+    near_function = rng.random(test_points) < 0.8
+    test_y = np.where(near_function,
+                      ideal_functions[rng.choice(chosen_functions, size=test_points), test_rows] +
+                      rng.normal(0, 0.3, size=test_points),
+                      rng.uniform(ideal_functions.min(), ideal_functions.max(), size=test_points))
+    test_dataframe = pd.DataFrame({'x': x_values[test_rows], 'y': test_y})
+    filenames = {"train": os.path.join(directory, 'train.csv'),
+                 "ideal": os.path.join(directory, 'ideal.csv'),
+                 "test": os.path.join(directory, 'test.csv')}
+    train_dataframe.to_csv(filenames['train'], index=False)
+    ideal_dataframe.to_csv(filenames['ideal'], index=False)
+    test_dataframe.to_csv(filenames['test'], index=False)
+    return filenames
+
+
+def measure(function, prepare=None, repeat=3):
+    """
+    measures a function. the time is measured repeat times without tracing
+    the memory, the peak of the memory allocated by python and numpy
+    while running the function is measured once afterwards
+    :param function: the function, which is called with the result of prepare
+     or without parameters if prepare is None
+    :param prepare: function without parameters that prepares the parameter of
+     every call, which is not measured, None if function has no parameter
+    :return: dictionary with the median and the minimum of the time in seconds,
+     the peak memory in bytes and the result of the last call
+    """
+    seconds = []
+    result = None
+    for _ in range(repeat + 1):
+        arguments = () if prepare is None else (prepare(),)
+        if len(seconds) < repeat:
+            start = time.perf_counter()
+            result = function(*arguments)
+            seconds.append(time.perf_counter() - start)
+        else:
+            tracemalloc.start()
+            try:
+                result = function(*arguments)
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return {"median_seconds": statistics.median(seconds), "min_seconds": min(seconds),
+            "peak_bytes": peak_bytes, "result": result}
+
+
+def is_same_match(result, reference):
+    """
+    checks if two results of compare_function are the same, the maximum
+    distances may differ in the last digits because of the order of the operations
+    :param result: dictionary with the ideal_function_found and the max_distance
+    :param reference: dictionary with the ideal_function_found and the max_distance
+    :return: True if the same function with the same maximum distance was found
+    """
+    return result['ideal_function_found'] == reference['ideal_function_found'] and \
+        math.isclose(result['max_distance'], reference['max_distance'], rel_tol=1e-9, abs_tol=1e-12)
+
+
+def is_same_assignment(dataframe, reference):
+    """
+    checks if two test dataframes have the same assignments and distances
+    :param dataframe: the dataframe of the TestDataSet after the assignment
+    :param reference: the dataframe of the TestDataSet after the assignment with the reference method
+    :return: True if all test points are assigned to the same functions with the same distances
+    """
+    return dataframe['IdealFunction'].astype(str).tolist() == reference['IdealFunction'].astype(str).tolist() and \
+        np.allclose(dataframe['DeltaY'].to_numpy(dtype=float), reference['DeltaY'].to_numpy(dtype=float),
+                    rtol=1e-9, atol=1e-12)
+
+
+def run_benchmark(filenames, repeat=3, workers=None, reference=True):
+    """
+    measures every stage of a run with the data files separately: loading
+    the files, compare_function and compare_functions with every compare
+    method, check_coordinates_against_function with every assign method and
+    write_to_database with every write mode. the results of every method are
+    compared with the results of the reference method, which is the first
+    method of every stage
+    :param filenames: dictionary with the filenames of 'train', 'ideal' and 'test'
+    :param repeat: the number of measurements of every stage
+    :param workers: the number of worker processes of the parallel methods, the number of CPUs if None
+    :param reference: if False, the slow python methods are not measured and the
+     second method of every stage is used as reference
+    :return: dictionary with a dictionary for every stage, which contains the
+     measurement of every method
+    """
+    stages = {"load": {}, "compare_function": {}, "compare_functions": {},
+              "check_coordinates_against_function": {}, "write_to_database": {}}
+    # loading the data files
+    loaders = {"train": lambda: datasets.DataSet('TrainData', filenames['train']),
+               "ideal": lambda: datasets.IdealDataSet('IdealData', filenames['ideal']),
+               "test": lambda: datasets.TestDataSet('TestData', filenames['test'])}
+    data_sets = {}
+    for name, loader in loaders.items():
+        measurement = measure(loader, repeat=repeat)
+        data_sets[name] = measurement.pop('result')
+        stages['load'][name] = measurement
+    train_dataframe = data_sets['train'].get_dataframe()
+    ideal_data_set = data_sets['ideal']
+    train_column = train_dataframe.columns[1]
+
+    # the 'indexed' method builds its prefilter index, the 'pruned' method calculates
+    # its statistics and the 'parallel' method starts its worker processes only once
+    # per dataset, so this is done before the measurement. the worker processes
+    # are started by the first comparison
+    ideal_data_set.get_prefilter_index()
+    ideal_data_set.get_candidate_statistics()
+    ideal_data_set.compare_function(train_dataframe[train_column], method='parallel', workers=workers)
+    compare_methods = COMPARE_METHODS if reference else COMPARE_METHODS[1:]
+    assign_methods = ASSIGN_METHODS if reference else ASSIGN_METHODS[1:]
+
+    # finding the best fitting ideal function of one and of all train functions
+    reference_result = None
+    for method in compare_methods:
+        measurement = measure(lambda: ideal_data_set.compare_function(train_dataframe[train_column],
+                                                                      method=method, workers=workers),
+                              repeat=repeat)
+        result = measurement.pop('result')
+        reference_result = reference_result or result
+        measurement['same_as_reference'] = is_same_match(result, reference_result)
+        stages['compare_function'][method] = measurement
+    reference_results = None
+    for method in compare_methods:
+        measurement = measure(lambda: ideal_data_set.compare_functions(train_dataframe, method=method,
+                                                                       workers=workers),
+                              repeat=repeat)
+        results = measurement.pop('result')
+        reference_results = reference_results or results
+        measurement['same_as_reference'] = all(is_same_match(results[c], reference_results[c])
+                                               for c in reference_results)
+        stages['compare_functions'][method] = measurement
+    # the worker processes of the 'parallel' method are not needed anymore
+    ideal_data_set.close()
+    ideal_functions_found = [(c, reference_results[c]['ideal_function_found'], reference_results[c]['max_distance'])
+                             for c in reference_results]
+
+    # assigning the test data to the found ideal functions, every
+    # measurement starts with a test dataset without assignments
+    def assign(test_data_set, method):
+        for c, name, max_distance in ideal_functions_found:
+            test_data_set.check_coordinates_against_function(ideal_data_set.get_ideal_function_by_name(name),
+                                                             name, max_distance, method=method, workers=workers)
+        return test_data_set.get_dataframe()
+
+    reference_dataframe = None
+    for method in assign_methods:
+        measurement = measure(lambda test_data_set: assign(test_data_set, method),
+                              prepare=loaders['test'], repeat=repeat)
+        dataframe = measurement.pop('result')
+        if reference_dataframe is None:
+            reference_dataframe = dataframe
+        measurement['same_as_reference'] = is_same_assignment(dataframe, reference_dataframe)
+        stages['check_coordinates_against_function'][method] = measurement
+
+    # writing the ideal dataset to a new database in a temporary directory
+    directory = tempfile.mkdtemp()
+    try:
+        for mode in WRITE_MODES:
+            def write(database_file):
+                with SQLiteDataBase('/' + database_file) as db:
+                    return ideal_data_set.write_to_database(db, mode=mode)
+
+            def prepare():
+                database_file = os.path.join(directory, 'benchmark.db')
+                if os.path.exists(database_file):
+                    os.remove(database_file)
+                return database_file
+
+            measurement = measure(write, prepare=prepare, repeat=repeat)
+            measurement['success'] = bool(measurement.pop('result'))
+            stages['write_to_database'][mode] = measurement
+    finally:
+        shutil.rmtree(directory)
+    return stages
+
+
+def compare_benchmarks(results, previous_results, factor=REGRESSION_FACTOR):
+    """
+    compares the measurements of two benchmarks with the same parameters
+    :param results: the results of the actual benchmark (see main)
+    :param previous_results: the results of an earlier benchmark
+    :param factor: a measurement is a regression if its median time is more than factor times the earlier one
+    :return: list of tuples with the stage, the method, the earlier and the actual
+     median time and True if it is a regression, for every method in both benchmarks
+    """
+    comparison = []
+    for stage, methods in results['stages'].items():
+        for method, measurement in methods.items():
+            previous_measurement = previous_results.get('stages', {}).get(stage, {}).get(method)
+            if previous_measurement is None:
+                continue
+            comparison.append((stage, method, previous_measurement['median_seconds'],
+                               measurement['median_seconds'],
+                               measurement['median_seconds'] > previous_measurement['median_seconds'] * factor))
+    return comparison
+
+
+def main(argv):
+    """
+    generates data files, measures every stage with them and prints the results
+    :param argv: command line options could be:
+     -r <rows> -c <idealcolumns> -t <testpoints> -n <repeat> -w <workers>
+     --seed=<seed> --noreference --output=<jsonfile> --compare=<jsonfile>
+    :return: None
+    """
+    parameters = {"rows": DEFAULT_ROWS, "ideal_columns": DEFAULT_IDEAL_COLUMNS,
+                  "train_columns": DEFAULT_TRAIN_COLUMNS, "test_points": DEFAULT_TEST_POINTS, "seed": 0}
+    repeat = 3
+    workers = None
+    reference = True
+    output_file = None
+    compare_file = None
+    try:
+        opts, args = getopt.getopt(argv, "hr:c:t:n:w:", ["rows=", "idealcolumns=", "testpoints=", "repeat=",
+                                                          "workers=", "seed=", "noreference", "output=",
+                                                          "compare="])
+        for opt, arg in opts:
+            if opt == '-h':
+                print(USAGE)
+                sys.exit()
+            elif opt in ("-r", "--rows"):
+                parameters['rows'] = max(1, int(arg))
+            elif opt in ("-c", "--idealcolumns"):
+                parameters['ideal_columns'] = max(1, int(arg))
+            elif opt in ("-t", "--testpoints"):
+                parameters['test_points'] = max(1, int(arg))
+            elif opt in ("-n", "--repeat"):
+                repeat = max(1, int(arg))
+            elif opt in ("-w", "--workers"):
+                workers = max(1, int(arg))
+            elif opt == "--seed":
+                parameters['seed'] = int(arg)
+            elif opt == "--noreference":
+                reference = False
+            elif opt == "--output":
+                output_file = arg
+            elif opt == "--compare":
+                compare_file = arg
+    except (getopt.GetoptError, ValueError):
+        print(USAGE)
+        sys.exit(2)
+    directory = tempfile.mkdtemp()
+    try:
+        filenames = generate_data_files(directory, **parameters)
+        stages = run_benchmark(filenames, repeat=repeat, workers=workers, reference=reference)
+    finally:
+        shutil.rmtree(directory)
+    results = {"version": BENCHMARK_VERSION, "python": sys.version.split()[0], "numpy": np.__version__,
+               "pandas": pd.__version__, "parameters": parameters, "repeat": repeat, "stages": stages}
+    for stage, methods in stages.items():
+        for method, measurement in methods.items():
+            check = measurement.get('same_as_reference', measurement.get('success'))
+            print('{:<36} {:<12} {:10.2f} ms {:10.1f} MB   {}'.format(
+                stage, method, measurement['median_seconds'] * 1000, measurement['peak_bytes'] / 1e6,
+                '' if check is None else ('ok' if check else 'DIFFERENT')))
+    if compare_file is not None:
+        with open(compare_file) as file:
+            previous_results = json.load(file)
+        if previous_results.get('parameters') != parameters:
+            print('The benchmark in ' + compare_file + ' was run with other parameters.')
+        for stage, method, previous_seconds, seconds, regression in compare_benchmarks(results, previous_results):
+            print('{:<36} {:<12} {:10.2f} ms -> {:10.2f} ms   {}'.format(
+                stage, method, previous_seconds * 1000, seconds * 1000, 'REGRESSION' if regression else ''))
+    if output_file is not None:
+        with open(output_file, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+import getopt
+import json
+import statistics
+import subprocess
+import sys
+
+
+# the modules whose import time is measured. main and server are the
+# programs, matplotlib and sqlalchemy the libraries that should only
+# be imported when a plot is rendered or the database is used
+MODULES = ('main', 'server', 'datasets', 'database', 'matplotlib.pyplot', 'sqlalchemy')
+# the libraries that are checked to be imported or not after importing a module
+HEAVY_MODULES = ('matplotlib', 'sqlalchemy')
+# the program that is run in a new interpreter for every measurement
+MEASURE_PROGRAM = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start,
+                   "loaded": [m for m in {heavy_modules!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """
+    measures the time to import a module in a new interpreter, so
+    that nothing is imported already. the interpreter start itself
+    is not measured, only the import
+    :param module: the name of the module
+    :param repeat: the number of measurements
+    :return: dictionary with the median and the minimum of the import time in
+     seconds and the heavy modules that were imported with the module
+    """
+    seconds = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', MEASURE_PROGRAM.format(module=module,
+                                                                            heavy_modules=HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True).stdout
+        measurement = json.loads(output.splitlines()[-1])
+        seconds.append(measurement['seconds'])
+        loaded = measurement['loaded']
+    return {"median_seconds": statistics.median(seconds), "min_seconds": min(seconds), "loaded": loaded}
+
+
+def main(argv):
+    """
+    measures the import time of MODULES and prints it
+    :param argv: command line options could be:
+     -n <repeat> --output=<jsonfile>
+    :return: None
+    """
+    repeat = 5
+    output_file = None
+    try:
+        opts, args = getopt.getopt(argv, "hn:", ["repeat=", "output="])
+    except getopt.GetoptError:
+        print('benchmark_startup.py -n <repeat> --output=<jsonfile>')
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print('benchmark_startup.py -n <repeat> --output=<jsonfile>')
+            sys.exit()
+        elif opt in ("-n", "--repeat"):
+            repeat = max(1, int(arg))
+        elif opt == "--output":
+            output_file = arg
+    results = {}
+    for module in MODULES:
+        results[module] = measure_import(module, repeat)
+        print('{:<20} {:8.1f} ms   imports: {}'.format(module, results[module]['median_seconds'] * 1000,
+                                                      ', '.join(results[module]['loaded']) or '-'))
+    if output_file is not None:
+        with open(output_file, 'w') as file:
+            json.dump({"python": sys.version.split()[0], "repeat": repeat, "modules": results}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,26 +1,337 @@
-import sqlalchemy as db
+import hashlib
+import json
 import logging
+import sqlite3
 import traceback
+from contextlib import contextmanager
 from datetime import datetime
 from sys import exc_info
-from sqlalchemy.exc import ArgumentError
+import pandas as pd
+
+
+# number of rows that are inserted with one executemany in bulk_write_dataframe
+DEFAULT_BATCH_SIZE = 10000
+# number of rows with one fingerprint in sync_dataframe. only blocks with
+# a changed fingerprint are written again
+DEFAULT_SYNC_BLOCK_SIZE = 4096
+# name of the table with the fingerprints of the tables written by sync_dataframe
+SYNC_METADATA_TABLE = 'SyncMetadata'
+# modes of SQLiteDataBase.write_dataframe: 'replace' uses DataFrame.to_sql,
+# 'bulk' replaces the table in one transaction with batches of executemany,
+# 'incremental' only writes the rows that changed since the last incremental write
+WRITE_MODES = ('replace', 'bulk', 'incremental')
+# number of connections kept open in the pool of SQLiteDataBase
+DEFAULT_POOL_SIZE = 5
+# seconds a connection waits for a lock on the database file
+DEFAULT_TIMEOUT = 30
+
+
+def get_database_errors():
+    """
+    returns the exceptions that could be raised when writing to the database.
+    sqlalchemy is imported when it is needed first and not when this module
+    is imported, so that runs without database do not pay for the import
+    :return: tuple with the exception classes
+    """
+    from sqlalchemy.exc import SQLAlchemyError
+    return ValueError, AttributeError, SQLAlchemyError, sqlite3.Error
+
+
+def get_column_type(dtype):
+    """
+    returns the SQLite column type for a dtype of a dataframe column,
+    using the same types as DataFrame.to_sql
+    :param dtype: the dtype of the dataframe column
+    :return: the SQLite column type
+    """
+    if dtype.kind == 'f':
+        return 'FLOAT'
+    if dtype.kind in 'iu':
+        return 'BIGINT'
+    if dtype.kind == 'b':
+        return 'BOOLEAN'
+    return 'TEXT'
+
+
+def quote_identifier(name):
+    """
+    quotes a table or column name for a SQLite statement
+    :param name: the name of the table or column
+    :return: the quoted name
+    """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def get_rows(dataframe, start, end):
+    """
+    returns the rows of the dataframe from start to end as tuples of python
+    values, beginning with the index of the row, so they could be inserted
+    with executemany
+    :param dataframe: the dataframe
+    :param start: the first row
+    :param end: the row after the last row
+    :return: list of tuples
+    """
+    batch = dataframe.iloc[start:end]
+    columns = [batch.index.tolist()] + [batch[c].tolist() for c in batch.columns]
+    return list(zip(*columns))
+
+
+@contextmanager
+def bulk_transaction(engine):
+    """
+    context manager that yields a cursor of the SQLite connection inside one
+    transaction which is committed at the end or rolled back if anything fails.
+    the transaction is controlled manually, so DROP and CREATE statements are
+    part of the transaction too. during the transaction the connection runs with
+    synchronous OFF, so SQLite does not wait for the disk after every write.
+    the journal_mode is not changed, because it is stored in the database file
+    :param engine: the database-engine
+    :return: the cursor
+    """
+    raw_connection = engine.raw_connection()
+    try:
+        sqlite_connection = raw_connection.driver_connection
+        isolation_level = sqlite_connection.isolation_level
+        sqlite_connection.isolation_level = None
+        cursor = sqlite_connection.cursor()
+        # the setting of the connection, which is restored at the end
+        synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+        try:
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('BEGIN')
+            try:
+                yield cursor
+                cursor.execute('COMMIT')
+
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+
+        finally:
+            cursor.execute('PRAGMA synchronous=' + str(int(synchronous)))
+            cursor.close()
+            sqlite_connection.isolation_level = isolation_level
+
+    finally:
+        raw_connection.close()
+
+
+def get_insert_statement(table_name, dataframe, upsert=False):
+    """
+    returns the statement to insert the rows from get_rows into the table
+    :param table_name: the name of the table
+    :param dataframe: the dataframe with the data for the table
+    :param upsert: if True, rows with an existing index are replaced
+    :return: the statement
+    """
+    columns = ['index'] + [str(c) for c in dataframe.columns]
+    return ('INSERT OR REPLACE INTO ' if upsert else 'INSERT INTO ') + quote_identifier(table_name) + \
+        ' (' + ', '.join(quote_identifier(c) for c in columns) + ')' + \
+        ' VALUES (' + ', '.join(['?'] * len(columns)) + ')'
+
+
+def replace_table(cursor, table_name, dataframe, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    drops the table and creates it again with the data of the dataframe.
+    the table gets the same columns as with DataFrame.to_sql, but the rows are
+    inserted with executemany in batches of batch_size rows
+    :param cursor: the cursor from bulk_transaction
+    :param table_name: the name of the table that should be replaced
+    :param dataframe: the data for the table as a dataframe
+    :param batch_size: the number of rows inserted with one executemany
+    :return: None
+    """
+    # the index becomes the primary key of the table if it could be one
+    if dataframe.index.dtype.kind in 'iu' and dataframe.index.is_unique:
+        index_definition = '"index" INTEGER PRIMARY KEY'
+    else:
+        index_definition = '"index" ' + get_column_type(dataframe.index.dtype)
+    column_definitions = [index_definition] + \
+        [quote_identifier(c) + ' ' + get_column_type(d) for c, d in zip(dataframe.columns, dataframe.dtypes)]
+    cursor.execute('DROP TABLE IF EXISTS ' + quote_identifier(table_name))
+    cursor.execute('CREATE TABLE ' + quote_identifier(table_name) +
+                   ' (' + ', '.join(column_definitions) + ')')
+    insert_statement = get_insert_statement(table_name, dataframe)
+    for start in range(0, dataframe.shape[0], batch_size):
+        cursor.executemany(insert_statement, get_rows(dataframe, start, start + batch_size))
+
+
+def bulk_write_dataframe(engine, table_name, dataframe, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    replaces the table with the data of the dataframe in one transaction
+    (see bulk_transaction and replace_table). if anything fails, the
+    transaction is rolled back and the old table is kept
+    :param engine: the database-engine
+    :param table_name: the name of the table that should be replaced
+    :param dataframe: the data for the table as a dataframe
+    :param batch_size: the number of rows inserted with one executemany
+    :return: number of rows written
+    """
+    with bulk_transaction(engine) as cursor:
+        replace_table(cursor, table_name, dataframe, batch_size)
+        # the table does not match its fingerprint from sync_dataframe anymore
+        if table_exists(cursor, SYNC_METADATA_TABLE):
+            cursor.execute('DELETE FROM ' + quote_identifier(SYNC_METADATA_TABLE) + ' WHERE table_name = ?',
+                           (table_name,))
+    return dataframe.shape[0]
+
+
+def write_dataframe(engine, table_name, dataframe, mode='replace', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    writes a dataframe to a table
+    :param engine: the database-engine
+    :param table_name: the name of the table
+    :param dataframe: the data for the table as a dataframe
+    :param mode: 'replace' writes with DataFrame.to_sql, 'bulk' with
+     bulk_write_dataframe and 'incremental' with sync_dataframe (see WRITE_MODES)
+    :param batch_size: the number of rows inserted with one executemany
+     with mode 'bulk' or 'incremental'
+    :return: number of rows written
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError('Unknown write mode: ' + str(mode))
+    if mode == 'bulk':
+        return bulk_write_dataframe(engine, table_name, dataframe, batch_size)
+    if mode == 'incremental':
+        return sync_dataframe(engine, table_name, dataframe, batch_size=batch_size)
+    with engine.begin() as connection:
+        dataframe.to_sql(table_name, connection, if_exists='replace')
+        # the table does not match its fingerprint from sync_dataframe anymore
+        if connection.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (SYNC_METADATA_TABLE,)).first() is not None:
+            connection.exec_driver_sql('DELETE FROM ' + quote_identifier(SYNC_METADATA_TABLE) +
+                                       ' WHERE table_name = ?', (table_name,))
+    return dataframe.shape[0]
+
+
+def table_exists(cursor, table_name):
+    """
+    checks if the table exists in the database
+    :param cursor: a cursor of the SQLite connection
+    :param table_name: the name of the table
+    :return: True if the table exists
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+    return cursor.fetchone() is not None
+
+
+def get_block_fingerprints(dataframe, block_size):
+    """
+    calculates a fingerprint of the schema of the dataframe and a fingerprint
+    of the content of every block of block_size rows, including the index
+    :param dataframe: the dataframe
+    :param block_size: the number of rows per block
+    :return: tuple with the fingerprint of the schema and the list with the
+     fingerprints of the blocks
+    """
+    schema = json.dumps([[str(c), get_column_type(d)] for c, d in zip(dataframe.columns, dataframe.dtypes)] +
+                        [block_size])
+    schema_fingerprint = hashlib.sha1(schema.encode()).hexdigest()
+    row_hashes = pd.util.hash_pandas_object(dataframe, index=True).to_numpy()
+    block_fingerprints = [hashlib.sha1(row_hashes[start:start + block_size].tobytes()).hexdigest()
+                          for start in range(0, len(row_hashes), block_size)]
+    return schema_fingerprint, block_fingerprints
+
+
+def sync_dataframe(engine, table_name, dataframe, block_size=DEFAULT_SYNC_BLOCK_SIZE,
+                   batch_size=DEFAULT_BATCH_SIZE):
+    """
+    writes only the changes of the dataframe since the last sync to the table.
+    the fingerprints of the schema and of every block of block_size rows are
+    stored in the table SyncMetadata. if nothing has changed, nothing is
+    written. if only blocks were changed or appended, only their rows are
+    written with INSERT OR REPLACE and rows that do not exist anymore are
+    deleted. the rows are identified by the index, so this needs the default
+    index 0, 1, 2, ... of the dataframe. if the schema has changed, there is no
+    fingerprint yet or the index is not the default index, the table is
+    replaced completely. everything is done in one transaction
+    :param engine: the database-engine
+    :param table_name: the name of the table
+    :param dataframe: the data for the table as a dataframe
+    :param block_size: the number of rows per block with one fingerprint
+    :param batch_size: the number of rows inserted with one executemany
+    :return: number of rows written
+    """
+    schema_fingerprint, block_fingerprints = get_block_fingerprints(dataframe, block_size)
+    fingerprint = hashlib.sha1((schema_fingerprint + ''.join(block_fingerprints)).encode()).hexdigest()
+    default_index = dataframe.index.equals(pd.RangeIndex(dataframe.shape[0]))
+    with bulk_transaction(engine) as cursor:
+        cursor.execute('CREATE TABLE IF NOT EXISTS ' + quote_identifier(SYNC_METADATA_TABLE) +
+                       ' (table_name TEXT PRIMARY KEY, fingerprint TEXT, schema_fingerprint TEXT,'
+                       ' row_count INTEGER, block_fingerprints TEXT)')
+        cursor.execute('SELECT fingerprint, schema_fingerprint, row_count, block_fingerprints FROM ' +
+                       quote_identifier(SYNC_METADATA_TABLE) + ' WHERE table_name = ?', (table_name,))
+        metadata = cursor.fetchone()
+        if metadata is not None and not table_exists(cursor, table_name):
+            metadata = None
+        if metadata is not None and metadata[0] == fingerprint:
+            # nothing has changed
+            return 0
+        if metadata is None or metadata[1] != schema_fingerprint or not default_index:
+            replace_table(cursor, table_name, dataframe, batch_size)
+            rows_written = dataframe.shape[0]
+        else:
+            old_row_count = metadata[2]
+            old_block_fingerprints = json.loads(metadata[3])
+            changed_blocks = [i for i, f in enumerate(block_fingerprints)
+                              if i >= len(old_block_fingerprints) or old_block_fingerprints[i] != f]
+            insert_statement = get_insert_statement(table_name, dataframe, upsert=True)
+            rows_written = 0
+            for i in changed_blocks:
+                start = i * block_size
+                end = min(start + block_size, dataframe.shape[0])
+                for batch_start in range(start, end, batch_size):
+                    rows = get_rows(dataframe, batch_start, min(batch_start + batch_size, end))
+                    cursor.executemany(insert_statement, rows)
+                    rows_written += len(rows)
+            if old_row_count > dataframe.shape[0]:
+                cursor.execute('DELETE FROM ' + quote_identifier(table_name) + ' WHERE "index" >= ?',
+                               (dataframe.shape[0],))
+        cursor.execute('INSERT OR REPLACE INTO ' + quote_identifier(SYNC_METADATA_TABLE) +
+                       ' (table_name, fingerprint, schema_fingerprint, row_count, block_fingerprints)'
+                       ' VALUES (?, ?, ?, ?, ?)',
+                       (table_name, fingerprint, schema_fingerprint, dataframe.shape[0],
+                        json.dumps(block_fingerprints)))
+    return rows_written
 
 
 class SQLiteDataBase:
     """
-    Initializes a SQLite Database Connection and Engine
-    with the given Database File
+    Initializes a SQLite Database Engine with a pool of Connections
+    to the given Database File and offers context managers for
+    Connections and Transactions used by all writers
     """
 
-    def __init__(self, database_file):
+    def __init__(self, database_file, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
         """
-        Initializes a SQLite Database Connection and Engine
-        with the given Database File
-        :param database_file: the SQLite Database File (could include a Path)
+        Initializes a SQLite Database Engine with a pool of Connections
+        to the given Database File
+        :param database_file: the SQLite Database File (could include a Path),
+         '' or '/:memory:' for an in-memory Database
+        :param pool_size: the number of Connections that are kept open in the pool,
+         not used by an in-memory Database
+        :param timeout: seconds a Connection waits for a lock on the Database File
+         held by another Connection or Process before it fails
         """
+        # the Connection of the connection attribute, which is opened when it is used first
+        self._connection = None
+        # sqlalchemy is imported when the first Database is initialized
+        import sqlalchemy as db
+        from sqlalchemy.exc import ArgumentError
         try:
-            self.engine = db.create_engine('sqlite://' + database_file)
-            self.connection = self.engine.connect()
+            url = db.engine.make_url('sqlite://' + database_file)
+            if url.host is None and url.database in (None, '', ':memory:'):
+                # an in-memory Database only exists in its Connection, so sqlalchemy
+                # keeps one Connection per thread instead of a pool, which takes no pool arguments
+                pool_arguments = {}
+            else:
+                pool_arguments = {"pool_size": pool_size, "max_overflow": pool_size, "pool_timeout": timeout}
+            self.engine = db.create_engine(url, connect_args={'timeout': timeout}, **pool_arguments)
+            # check that the Database could be opened, the
+            # Connection is returned to the pool afterwards
+            with self.connect():
+                pass
 
         except ArgumentError:
             now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
@@ -38,6 +349,73 @@ class SQLiteDataBase:
             logger.error("Line Code: %s", line_code)
             raise ArgumentError
 
+    def __enter__(self):
+        """
+        makes the Database usable in a with-statement, which closes it at the end
+        :return: the Database
+        """
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        """
+        closes the Database at the end of a with-statement
+        :return: None
+        """
+        self.close()
+
+    @property
+    def connection(self):
+        """
+        the open Connection of the Database, like before the pool was used.
+        it is checked out from the pool when it is used first and kept until
+        close, new code should use connect or transaction instead
+        :return: the Connection
+        """
+        if self._connection is None:
+            self._connection = self.engine.connect()
+        return self._connection
+
+    @contextmanager
+    def connect(self):
+        """
+        context manager that checks out a Connection from the pool
+        and returns it to the pool at the end
+        :return: the Connection
+        """
+        with self.engine.connect() as connection:
+            yield connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        context manager that checks out a Connection from the pool and begins a
+        Transaction, which is committed at the end or rolled back if anything fails
+        :return: the Connection
+        """
+        with self.engine.begin() as connection:
+            yield connection
+
+    def bulk_transaction(self):
+        """
+        context manager that checks out a Connection from the pool and yields a
+        cursor inside one manually controlled Transaction (see bulk_transaction)
+        :return: the cursor
+        """
+        return bulk_transaction(self.engine)
+
+    def write_dataframe(self, table_name, dataframe, mode='replace', batch_size=DEFAULT_BATCH_SIZE):
+        """
+        writes a dataframe to a table with a Connection from the pool
+        :param table_name: the name of the table
+        :param dataframe: the data for the table as a dataframe
+        :param mode: 'replace' writes with DataFrame.to_sql, 'bulk' with
+         bulk_write_dataframe and 'incremental' with sync_dataframe (see WRITE_MODES)
+        :param batch_size: the number of rows inserted with one executemany
+         with mode 'bulk' or 'incremental'
+        :return: number of rows written
+        """
+        return write_dataframe(self.engine, table_name, dataframe, mode=mode, batch_size=batch_size)
+
     def insert_data(self, db_table, dataframe):
         """
         Writes a complete Table to Database
@@ -45,6 +423,19 @@ class SQLiteDataBase:
         :param dataframe: the Data for the Table as a Dataframe
         :return:
         """
+        import sqlalchemy as db
         sql_query = db.insert(db_table)
-        data_list = dataframe.to_dict('list')
-        self.connection.execute(sql_query, data_list)
+        data_list = dataframe.to_dict('records')
+        with self.transaction() as connection:
+            connection.execute(sql_query, data_list)
+
+    def close(self):
+        """
+        closes all Connections of the pool. Connections that are checked
+        out at the moment are closed when they are returned
+        :return: None
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self.engine.dispose()
@@ -1,25 +1,112 @@
+import hashlib
+import importlib.util
+import json
 import logging
 import math
+import os
 import traceback
 from datetime import datetime
+import numpy as np
 import pandas
-from matplotlib import pyplot as plt
-from matplotlib import style
 import pandas as pd
 from sys import exc_info
 from exceptions import InvalidDataFileError, InvalidFunctionDataError, InvalidDataFrameError
+import database
+import datastore
+import instrumentation
+import matching
+import prefilter
+import rendering
+import resultcache
+import spatial
+
+
+# methods that could be chosen to find the best fitting function in compare_function:
+# 'python' compares the functions value by value, 'numpy' compares all
+# candidate functions at once in blocks of matrix operations, 'parallel' does
+# the same as 'numpy' in a pool of worker processes with a shard of the
+# candidate functions each, 'pruned' abandons a candidate function as soon
+# as its partial sum of squared distances is greater than the best one,
+# 'indexed' does the same with the lower bounds of the prefilter index, so
+# that most candidate functions are not read at all
+COMPARE_METHODS = ('python', 'numpy', 'parallel', 'pruned', 'indexed')
+# methods that could be chosen to assign the test data in check_coordinates_against_function:
+# 'python' compares every test point with every point of the function, 'index'
+# only checks the points of a spatial index that are within the maximum distance,
+# 'parallel' does the same as 'index' in a pool of worker processes with a chunk
+# of the test data each
+ASSIGN_METHODS = ('python', 'index', 'parallel')
+# the dtype of the numeric columns of a dataset loaded with compact=True
+COMPACT_DTYPE = 'float32'
+# modes that could be chosen to write a dataset to database in write_to_database
+WRITE_MODES = database.WRITE_MODES
+# modes that could be chosen to render the plots of the visualize methods
+RENDER_MODES = rendering.RENDER_MODES
+
+
+# the pyarrow parser of pandas is much faster than the default one,
+# but it is optional and cannot read a file in chunks
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+def import_pyplot():
+    """
+    imports matplotlib when the first plot is rendered. importing matplotlib
+    takes a large part of the start of the program, which is not needed
+    by runs that never show a plot
+    :return: tuple with the modules matplotlib.pyplot and matplotlib.style
+    """
+    from matplotlib import pyplot
+    from matplotlib import style
+    return pyplot, style
+
+
+def get_function_values(y_values):
+    """
+    static function that returns the y-values of a function as a 1-dimensional
+    numpy array without copying them. a list, a numpy array, a pandas series or
+    any other object with the buffer protocol is accepted. the values are checked
+    at once instead of value by value: they must have a floating point dtype and
+    must all be finite
+    :param y_values: the y-values of the function
+    :return: array with the y-values, a view on the submitted values if possible,
+     or None if the values are no valid function data
+    """
+    if isinstance(y_values, (str, bytes)):
+        return None
+    try:
+        if isinstance(y_values, pd.Series):
+            values = y_values.to_numpy()
+        else:
+            values = np.asarray(y_values)
+    except (TypeError, ValueError):
+        return None
+    if values.ndim != 1 or values.dtype.kind != 'f' or not np.isfinite(values).all():
+        return None
+    return values
 
 
 # this function does not need to be a class-method as it is static
-def load_data_from_file(filename):
+def load_data_from_file(filename, chunksize=None, dtype=None, usecols=None):
     """
     static function that loads data from a file, generates a dataframe and returns it
     :param filename: the filename with the data to load
+    :param chunksize: if set, the file is read in chunks of this number of rows
+     into one preallocated array, so the parser never holds more than one chunk
+    :param dtype: the dtype of all columns (e.g. 'float32'), None for the
+     dtypes detected by the parser (float64 when reading in chunks)
+    :param usecols: list with the names of the columns that should be loaded,
+     the x-axis column 'x' is always loaded. None for all columns
     :return: dataframe with the data loaded from the file
     """
+    if usecols is not None and 'x' not in usecols:
+        usecols = ['x'] + list(usecols)
     try:
+        if chunksize is not None:
+            return _load_data_from_file_in_chunks(filename, chunksize, dtype, usecols)
         # try to load data into dataframe and return it
-        dat: pd.DataFrame = pd.read_csv(filename)
+        engine = 'pyarrow' if PYARROW_AVAILABLE else 'c'
+        dat: pd.DataFrame = pd.read_csv(filename, dtype=dtype, usecols=usecols, engine=engine)
         return dat
 
     except FileNotFoundError:
@@ -41,6 +128,47 @@ def load_data_from_file(filename):
         raise FileNotFoundError
 
 
+def _load_data_from_file_in_chunks(filename, chunksize, dtype, usecols):
+    """
+    reads the file in chunks into one preallocated array with the data of
+    every column stored next to each other. the number of rows is estimated
+    by counting the line breaks of the file before parsing it
+    :param filename: the filename with the data to load
+    :param chunksize: number of rows that are parsed at once
+    :param dtype: the dtype of all columns, float64 if None
+    :param usecols: list with the names of the columns that should be loaded
+    :return: dataframe with the data loaded from the file
+    """
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    number_of_rows = 0
+    last_byte = b'\n'
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            number_of_rows += block.count(b'\n')
+            last_byte = block[-1:]
+    # the header is not a data row, but a last line without line break is
+    number_of_rows += 0 if last_byte == b'\n' else 1
+    number_of_rows = max(0, number_of_rows - 1)
+    columns = None
+    data = None
+    filled_rows = 0
+    for chunk in pd.read_csv(filename, chunksize=chunksize, dtype=dtype, usecols=usecols, engine='c'):
+        if data is None:
+            columns = chunk.columns
+            data = np.empty((len(columns), number_of_rows), dtype=dtype)
+        if filled_rows + len(chunk) > data.shape[1]:
+            # more rows than line breaks, which only happens with quoted line breaks
+            data = np.concatenate([data, np.empty((len(columns), filled_rows + len(chunk) - data.shape[1]),
+                                                  dtype=dtype)], axis=1)
+        data[:, filled_rows:filled_rows + len(chunk)] = chunk.to_numpy(dtype=dtype).T
+        filled_rows += len(chunk)
+    if data is None:
+        # a file without any data row, only the columns are read
+        return pd.read_csv(filename, dtype=dtype, usecols=usecols, engine='c')
+    # blank lines are counted as rows but not parsed, so not all rows may be filled
+    return pd.DataFrame(data[:, :filled_rows].T, columns=columns, copy=False)
+
+
 class DataSet:
     """
     This Class contains the dataframe with the function data
@@ -48,16 +176,53 @@ class DataSet:
     data, visualize functions and store data to database
     """
 
-    def __init__(self, name, filename):
+    @instrumentation.timed('DataSet.load')
+    def __init__(self, name, filename, chunksize=None, dtype=None, usecols=None, cache=False, mmap=False,
+                 compact=False):
         """
         expects the name of the dataset and the filename with the data to load
         :param name: name of the dataset
         :param filename: name of the file that contains the data that should be loaded
+        :param chunksize: number of rows that are read at once, None to read the whole file at once
+        :param dtype: the dtype of all columns (e.g. 'float32'), None for the detected dtypes
+        :param usecols: list with the names of the columns that should be loaded, None for all
+        :param cache: if True, the data is loaded from a binary cache next to the file
+         if the file has not changed since the cache was written. otherwise the file
+         is parsed and the cache is written
+        :param mmap: if True, the binary cache is used like with cache=True, but it is
+         memory-mapped read-only instead of being read into memory
+        :param compact: if True, the data is stored with half of the memory. all
+         columns are loaded as float32 unless another dtype is submitted
         """
         self.database_success = True
         self.name = name
         self.filename = filename
-        self.dataframe = load_data_from_file(filename)
+        self.compact = compact
+        if compact and dtype is None:
+            dtype = COMPACT_DTYPE
+        # the load options, which belong to the files stored next to the data file
+        self.dtype = dtype
+        self.usecols = usecols
+        self.cache = cache or mmap
+        self.dataframe = None
+        # the version of the loaded data, calculated by get_version when it is needed first
+        self.version = None
+        # the prefilter index of the functions, built by get_prefilter_index when it is needed first
+        self.prefilter_index = None
+        # the means and norms of the functions, calculated by get_candidate_statistics when they are needed first
+        self.candidate_statistics = None
+        # the worker processes of the method 'parallel', started by get_parallel_matcher when they are needed first
+        self.parallel_matcher = None
+        if cache or mmap:
+            self.dataframe = datastore.read_cache(filename, dtype=dtype, usecols=usecols, mmap=mmap)
+        if self.dataframe is None:
+            self.dataframe = load_data_from_file(filename, chunksize=chunksize, dtype=dtype, usecols=usecols)
+            if (cache or mmap) and datastore.write_cache(filename, self.dataframe, dtype=dtype, usecols=usecols) \
+                    and mmap:
+                # use the memory-mapped cache instead of the parsed data
+                mapped_dataframe = datastore.read_cache(filename, dtype=dtype, usecols=usecols, mmap=True)
+                if mapped_dataframe is not None:
+                    self.dataframe = mapped_dataframe
         # check if something went wrong.
         # if data file could not been found, print a notice about that.
         # exception already thrown in static method load_data_from_file
@@ -92,21 +257,21 @@ class DataSet:
             # raise InvalidDataFileError again
             raise InvalidDataFileError
 
-    def visualize_function(self, y):
+    def visualize_function(self, y, mode='decimated'):
         """
         renders a plot of the function
         :param y: name of the function in the dataframe [e.g. 'y1'] that should be visualized
+        :param mode: 'decimated' to draw only the points visible at the width of the plot,
+         'full' to draw every point (see RENDER_MODES)
         :return: None
         """
-        x_list = self.dataframe['x'].tolist()
-        y_list = self.dataframe[y].tolist()
+        plt, style = import_pyplot()
         style.use('ggplot')
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.plot(x_list, y_list, label=y, linewidth=2)
-        ax.legend()
-        ax.grid(True, color="k")
-        plt.title(self.name + ' Function ' + y)
+        fig = rendering.create_function_figure(plt, self.dataframe['x'].to_numpy(), self.dataframe[y].to_numpy(),
+                                               y, self.name + ' Function ' + y, mode=mode)
         plt.show()
+        # free the memory of the figure, a new one is created for the next plot
+        plt.close(fig)
 
     def get_dataframe(self):
         """
@@ -115,7 +280,85 @@ class DataSet:
         """
         return self.dataframe
 
-    def compare_function(self, y_values):
+    def get_version(self):
+        """
+        returns the version of the loaded data, which changes whenever the data
+        file is changed or replaced or the data is loaded with other columns or
+        dtypes. it is calculated once, so it always belongs to the loaded data
+        :return: the version as a hex string
+        """
+        if self.version is None:
+            version = {"fingerprint": datastore.get_file_fingerprint(self.filename),
+                       "columns": self.dataframe.columns.to_list(),
+                       "dtypes": [d.name for d in self.dataframe.dtypes],
+                       "rows": self.dataframe.shape[0]}
+            self.version = hashlib.sha1(json.dumps(version).encode('utf-8')).hexdigest()
+        return self.version
+
+    @instrumentation.timed()
+    def get_prefilter_index(self):
+        """
+        returns the prefilter index with the lower bounds of the functions of the
+        dataset. it is built once and, if the dataset uses the binary cache, it is
+        stored next to the data file and only built again when the file changes
+        :return: the PrefilterIndex
+        """
+        if self.prefilter_index is None:
+            columns, candidates = self.get_function_matrix()
+            if self.cache:
+                self.prefilter_index = prefilter.read_prefilter_index(self.filename, columns, dtype=self.dtype,
+                                                                      usecols=self.usecols)
+            if self.prefilter_index is None:
+                self.prefilter_index = prefilter.build_prefilter_index(candidates)
+                if self.cache:
+                    prefilter.write_prefilter_index(self.filename, self.prefilter_index, columns,
+                                                    dtype=self.dtype, usecols=self.usecols)
+        return self.prefilter_index
+
+    @instrumentation.timed()
+    def get_candidate_statistics(self):
+        """
+        returns the means and norms of the functions of the dataset, which give
+        the lower bounds of the method 'pruned' (see matching.get_lower_bounds).
+        they are calculated once, so that a comparison does not read all
+        functions before it could abandon any of them
+        :return: tuple of two arrays with the mean and the norm of every function
+        """
+        if self.candidate_statistics is None:
+            columns, candidates = self.get_function_matrix()
+            self.candidate_statistics = matching.candidate_statistics(candidates)
+        return self.candidate_statistics
+
+    def get_parallel_matcher(self, workers=None):
+        """
+        returns the ParallelMatcher with the functions of the dataset, which is used
+        by the method 'parallel'. starting the worker processes and copying the
+        functions into shared memory takes much longer than a comparison, so the
+        matcher is started once and reused by all comparisons until close is called.
+        it is only started again if another number of worker processes is requested
+        :param workers: number of worker processes, the number of CPUs if None
+        :return: the ParallelMatcher
+        """
+        if self.parallel_matcher is not None and self.parallel_matcher.workers != (workers or os.cpu_count() or 1):
+            self.close()
+        if self.parallel_matcher is None:
+            columns, candidates = self.get_function_matrix()
+            self.parallel_matcher = matching.ParallelMatcher(candidates, workers)
+        return self.parallel_matcher
+
+    def close(self):
+        """
+        stops the worker processes of the method 'parallel' and frees their shared
+        memory. the dataset could still be used, the worker processes are started
+        again when they are needed
+        :return: None
+        """
+        if self.parallel_matcher is not None:
+            self.parallel_matcher.close()
+            self.parallel_matcher = None
+
+    @instrumentation.timed()
+    def compare_function(self, y_values, method='python', chunk_size=None, workers=None, result_cache=None):
         """
         compares the function submitted in parameter y_values against all functions
         in the dataframe, calculate the distance between the points, square this and sum
@@ -123,20 +366,31 @@ class DataSet:
         the probably best fitting one and the name of the function will be returned
         together with the distance of the point that had the maximum distance from
         a point from the function in parameter y_values
-        :param y_values: the function in y_values in a simple list that should be
-         compared to any other function in this dataframe
+        :param y_values: the function in y_values that should be compared to any other
+         function in this dataframe, as a list, a numpy array, a pandas series or any
+         other object with the buffer protocol with finite floating point values
+        :param method: 'python', 'numpy', 'parallel', 'pruned' or 'indexed' (see COMPARE_METHODS)
+        :param chunk_size: number of functions compared at once with every method
+         except 'python', calculated from the number of x-values if None
+        :param workers: number of worker processes with method 'parallel',
+         the number of CPUs if None
+        :param result_cache: a MatchResultCache, which returns the result without
+         comparing if the function was already compared against this version of
+         the data, None to compare every time
         :return: A Dictionary with the ideal_function_found and the max_distance
         """
-        # check if submitted y_values is a list of float values as expected
+        if method not in COMPARE_METHODS:
+            raise ValueError('Unknown compare method: ' + str(method))
+        # check if submitted y_values are finite float values as expected
         try:
             invalid_function_data = False
-            if not isinstance(y_values, list):
+            values = get_function_values(y_values)
+            if values is None:
                 invalid_function_data = True
 
-            else:
-                for i in y_values:
-                    if not isinstance(i, float):
-                        invalid_function_data = True
+            # the matrix operation needs exactly one y-value per x-value
+            elif method != 'python' and len(values) != self.dataframe.shape[0]:
+                invalid_function_data = True
 
             if invalid_function_data:
                 raise InvalidFunctionDataError
@@ -160,6 +414,19 @@ class DataSet:
             raise InvalidFunctionDataError
 
         else:
+            if result_cache is not None:
+                key = resultcache.get_key(self.get_version(), values)
+                return_value = result_cache.get(key)
+                if return_value is None:
+                    return_value = self.compare_function(values, method=method, chunk_size=chunk_size,
+                                                         workers=workers)
+                    result_cache.put(key, return_value)
+                return return_value
+            if method != 'python':
+                return self._compare_function_vectorized(values, method, chunk_size, workers)
+            # the values are compared value by value, which is
+            # much faster with python floats than with numpy scalars
+            y_values = values.tolist()
             ideal_function_found = None
             # get the column names of this dataframe
             dataframe_columns = self.dataframe.columns.to_list()
@@ -205,21 +472,86 @@ class DataSet:
                             ideal_function_found = c
                             max_distance = temp_max_distance
 
+            instrumentation.count(instrumentation.CANDIDATES_SCORED, len(dataframe_columns) - 1)
             return_value = {"ideal_function_found": ideal_function_found, "max_distance": max_distance}
             return return_value
 
-    def write_to_database(self, engine):
+    def get_function_columns(self):
+        """
+        returns the names of all functions in the dataframe, which
+        are all columns except the x-axis column 'x'
+        :return: list with the column names of the functions
+        """
+        return [c for c in self.dataframe.columns.to_list() if c != 'x']
+
+    def get_function_matrix(self):
+        """
+        returns the functions of the dataframe as a 2-dimensional array with
+        one function per row. as long as all functions are stored next to
+        each other in one block of the dataframe, no data is copied
+        :return: tuple with the list of the function names and the array
+        """
+        columns = self.get_function_columns()
+        positions = [self.dataframe.columns.get_loc(c) for c in columns]
+        values = self.dataframe.to_numpy()
+        if positions and positions == list(range(positions[0], positions[-1] + 1)):
+            matrix = values[:, positions[0]:positions[-1] + 1]
+        else:
+            matrix = values[:, positions]
+        return columns, matrix.T
+
+    def _compare_function_vectorized(self, y_values, method, chunk_size, workers):
+        """
+        does the same as compare_function, but compares all functions in the
+        dataframe in blocks of matrix operations instead of value by value
+        :param y_values: the already validated array of y-values
+        :param method: 'numpy', 'parallel', 'pruned' or 'indexed'
+        :param chunk_size: number of functions compared at once, None for automatic
+        :param workers: number of worker processes with method 'parallel'
+        :return: A Dictionary with the ideal_function_found and the max_distance
+        """
+        columns, candidates = self.get_function_matrix()
+        if method == 'indexed':
+            # only the functions whose lower bound is not greater than the best one are compared
+            best_index, least_squared_distance, max_distance = \
+                matching.find_best_fit_pruned(candidates, y_values, chunk_size,
+                                              lower_bounds=self.get_prefilter_index().get_lower_bounds(y_values))
+        elif method == 'pruned':
+            # the functions with the smallest lower bound are compared first
+            means, norms = self.get_candidate_statistics()
+            best_index, least_squared_distance, max_distance = \
+                matching.find_best_fit_pruned(candidates, y_values, chunk_size,
+                                              lower_bounds=matching.get_lower_bounds(means, norms, y_values))
+        elif method == 'parallel':
+            best_index, least_squared_distance, max_distance = \
+                self.get_parallel_matcher(workers).find_best_fit(y_values, chunk_size)
+        else:
+            best_index, least_squared_distance, max_distance = \
+                matching.find_best_fit(candidates, y_values, chunk_size)
+        ideal_function_found = None if best_index is None else columns[best_index]
+        return {"ideal_function_found": ideal_function_found, "max_distance": max_distance}
+
+    @instrumentation.timed()
+    def write_to_database(self, engine, mode='replace', batch_size=database.DEFAULT_BATCH_SIZE):
         """
         writes the dataframe to database
         and returns True if writing to database was successful
         or False when something went wrong
-        :param engine: the database-engine
+        :param engine: the SQLiteDataBase, whose pooled connections are used,
+         or a database-engine
+        :param mode: 'replace', 'bulk' or 'incremental' (see WRITE_MODES)
+        :param batch_size: number of rows inserted at once with mode 'bulk' or 'incremental'
         :return: Success
         """
+        if mode not in WRITE_MODES:
+            raise ValueError('Unknown write mode: ' + str(mode))
         try:
-            self.dataframe.to_sql(self.name, engine, if_exists='replace')
+            if isinstance(engine, database.SQLiteDataBase):
+                engine.write_dataframe(self.name, self.dataframe, mode=mode, batch_size=batch_size)
+            else:
+                database.write_dataframe(engine, self.name, self.dataframe, mode=mode, batch_size=batch_size)
 
-        except (ValueError, AttributeError):
+        except database.get_database_errors():
             now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
             from sys import exc_info
             exception_type, exception_value, exception_traceback = exc_info()
@@ -237,6 +569,9 @@ class DataSet:
             # return None to make clear no data has been loaded
             self.database_success = False
 
+        else:
+            instrumentation.count(instrumentation.ROWS_WRITTEN, len(self.dataframe))
+
         finally:
             return self.database_success
 
@@ -250,45 +585,152 @@ class IdealDataSet(DataSet):
     This is also why this class is called IdealDataSet
     """
 
-    def __init__(self, name, filename):
+    def __init__(self, name, filename, chunksize=None, dtype=None, usecols=None, cache=False, mmap=False,
+                 compact=False):
         """
         expects the name of the dataset and the filename with the data to load
         :param name: name of the dataset
         :param filename: name of the file that contains the data that should be loaded
+        :param chunksize: number of rows that are read at once, None to read the whole file at once
+        :param dtype: the dtype of all columns (e.g. 'float32'), None for the detected dtypes
+        :param usecols: list with the names of the columns that should be loaded, None for all
+        :param cache: if True, the data is loaded from and stored to a binary cache next to the file
+        :param mmap: if True, the binary cache is memory-mapped read-only, so the ideal functions
+         are only read from disk when they are used and shared by all processes using them
+        :param compact: if True, the ideal functions are loaded as float32 unless another dtype is submitted
         """
-        DataSet.__init__(self, name, filename)
+        DataSet.__init__(self, name, filename, chunksize=chunksize, dtype=dtype, usecols=usecols, cache=cache,
+                         mmap=mmap, compact=compact)
 
     def get_ideal_function_by_name(self, name):
         """
-        returns a dataframe with the specified function
+        returns a dataframe with the specified function. the columns of the
+        returned dataframe are views on the data of this dataset, not copies
         :param name: name of the function that should be returned in a dataframe
         :return: the dataframe with the specified name
         """
-        data = {'x': self.dataframe['x'].tolist(), 'y': self.dataframe[name].tolist()}
-        return pd.DataFrame(data)
+        data = {'x': self.dataframe['x'].to_numpy(), 'y': self.dataframe[name].to_numpy()}
+        return pd.DataFrame(data, copy=False)
+
+    @instrumentation.timed()
+    def compare_functions(self, train_dataframe, method='numpy', chunk_size=None, workers=None,
+                          result_cache=None):
+        """
+        finds the best fitting ideal function for every function in the submitted
+        dataframe at once. with method 'numpy' the ideal functions are read only
+        once and compared against all functions with one matrix product per block
+        of ideal functions. method 'parallel' does the same with a shard of the
+        ideal functions in every worker process. with method 'pruned' the lower
+        bounds come from the means and norms of get_candidate_statistics,
+        with method 'indexed' from the prefilter index.
+        with every other method compare_function is called for every function in
+        the submitted dataframe
+        :param train_dataframe: dataframe with the x-axis column 'x' and the
+         functions that should be compared to the ideal functions
+        :param method: one of COMPARE_METHODS
+        :param chunk_size: number of ideal functions compared at once, None for automatic
+        :param workers: number of worker processes with method 'parallel', the number of CPUs if None
+        :param result_cache: a MatchResultCache, only the functions whose results are
+         not in the cache are compared, None to compare every function
+        :return: A Dictionary with a Dictionary with the ideal_function_found and
+         the max_distance for every function in the submitted dataframe
+        """
+        if method not in COMPARE_METHODS:
+            raise ValueError('Unknown compare method: ' + str(method))
+        # check if submitted train_dataframe is a dataframe with
+        # one y-value for every x-value of the ideal functions
+        try:
+            if not isinstance(train_dataframe, pandas.DataFrame):
+                raise InvalidDataFrameError
+            if train_dataframe.shape[0] != self.dataframe.shape[0]:
+                raise InvalidFunctionDataError
+
+        except (InvalidDataFrameError, InvalidFunctionDataError) as error:
+            now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+            exception_type, exception_value, exception_traceback = exc_info()
+            file_name, line_number, procedure_name, line_code \
+                = traceback.extract_tb(exception_traceback)[-1]
+            # get Logging-Instance from Main Scope
+            logger = logging.getLogger('__main__')
+            logger.error("Exception Datetime: %s", now)
+            logger.error("Exception Type: %s", exception_type)
+            logger.error("Exception Value: %s", exception_value)
+            logger.error("Message Value: %s", error.error_message)
+            logger.error("File Name: %s", file_name)
+            logger.error("Line Number: %d", line_number)
+            logger.error("Procedure Name: %s", procedure_name)
+            logger.error("Line Code: %s", line_code)
+            # raise Exception again to indicate something went wrong
+            raise type(error)
+
+        train_columns = [c for c in train_dataframe.columns.to_list() if c != 'x']
+        if result_cache is not None:
+            version = self.get_version()
+            keys = {c: resultcache.get_key(version, train_dataframe[c]) for c in train_columns}
+            results = {c: result_cache.get(keys[c]) for c in train_columns}
+            missing_columns = [c for c in train_columns if results[c] is None]
+            if missing_columns:
+                # compare only the functions that are not in the cache
+                missing_results = self.compare_functions(train_dataframe[missing_columns], method=method,
+                                                         chunk_size=chunk_size, workers=workers)
+                for c in missing_columns:
+                    result_cache.put(keys[c], missing_results[c])
+                    results[c] = missing_results[c]
+            return results
+        results = {}
+        if method in ('pruned', 'indexed'):
+            columns, candidates = self.get_function_matrix()
+            if method == 'pruned':
+                means, norms = self.get_candidate_statistics()
+            for c in train_columns:
+                y_values = train_dataframe[c].to_numpy(dtype=float)
+                if method == 'pruned':
+                    lower_bounds = matching.get_lower_bounds(means, norms, y_values)
+                else:
+                    lower_bounds = self.get_prefilter_index().get_lower_bounds(y_values)
+                best_index, least_squared_distance, max_distance = \
+                    matching.find_best_fit_pruned(candidates, y_values, chunk_size, lower_bounds=lower_bounds)
+                ideal_function_found = None if best_index is None else columns[best_index]
+                results[c] = {"ideal_function_found": ideal_function_found, "max_distance": max_distance}
+            return results
+        if method not in ('numpy', 'parallel'):
+            for c in train_columns:
+                results[c] = self.compare_function(train_dataframe[c], method=method,
+                                                   chunk_size=chunk_size, workers=workers)
+            return results
+        columns, candidates = self.get_function_matrix()
+        queries = train_dataframe[train_columns].to_numpy(dtype=float).T
+        if method == 'parallel':
+            best_fits = self.get_parallel_matcher(workers).find_best_fits(queries, chunk_size)
+        else:
+            best_fits = matching.find_best_fits(candidates, queries, chunk_size)
+        for c, (best_index, least_squared_distance, max_distance) in zip(train_columns, best_fits):
+            ideal_function_found = None if best_index is None else columns[best_index]
+            results[c] = {"ideal_function_found": ideal_function_found, "max_distance": max_distance}
+        return results
 
-    def visualize_comparing_functions(self, y_function, y_values, name_of_comparing_function):
+    def visualize_comparing_functions(self, y_function, y_values, name_of_comparing_function, mode='decimated'):
         """
         this method expects the name of an ideal function the object has in its dataframe
         and another function that should be compared to the chosen ideal function.
         both functions will be visualized by rendering a matplotlib-plot
         :param y_function: the name of the ideal function in the own dataset that should be compared
-        :param y_values: a list of y_values that describes the function that should be compared
-                         against the selected ideal function chosen in parameter y_function
+        :param y_values: the y_values that describe the function that should be compared
+                         against the selected ideal function chosen in parameter y_function,
+                         as a list, a numpy array, a pandas series or any other object
+                         with the buffer protocol with finite floating point values
         :param name_of_comparing_function: the name of the function submitted with parameter y_values
+        :param mode: 'decimated' to draw only the points visible at the width of the plot,
+         'full' to draw every point (see RENDER_MODES)
         :return: None
         """
-        # check if submitted y_values is a list of float values as expected
+        # check if submitted y_values are finite float values as expected
         try:
             invalid_function_data = False
-            if not isinstance(y_values, list):
+            values = get_function_values(y_values)
+            if values is None:
                 invalid_function_data = True
 
-            else:
-                for i in y_values:
-                    if not isinstance(i, float):
-                        invalid_function_data = True
-
             if invalid_function_data:
                 raise InvalidFunctionDataError
 
@@ -309,16 +751,14 @@ class IdealDataSet(DataSet):
             logger.error("Line Code: %s", line_code)
 
         else:
-            x_list = self.dataframe['x'].tolist()
-            y_list = self.dataframe[y_function].tolist()
+            # matplotlib plots the arrays of the dataframe without converting them to lists
+            plt, style = import_pyplot()
             style.use('ggplot')
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.plot(x_list, y_list, label='Ideal Function ' + y_function, linewidth=2)
-            ax.plot(x_list, y_values, label='Train Function ' + name_of_comparing_function, linewidth=1)
-            ax.legend()
-            ax.grid(True, color="k")
-            plt.title('Ideal Function ' + y_function + ' and Train Function ' + name_of_comparing_function)
+            fig = rendering.create_comparison_figure(plt, self.dataframe['x'].to_numpy(),
+                                                     self.dataframe[y_function].to_numpy(), values,
+                                                     y_function, name_of_comparing_function, mode=mode)
             plt.show()
+            plt.close(fig)
 
 
 class TestDataSet(DataSet):
@@ -330,19 +770,34 @@ class TestDataSet(DataSet):
     This is also why this class is called TestDataSet
     """
 
-    def __init__(self, name, filename):
+    def __init__(self, name, filename, chunksize=None, dtype=None, usecols=None, cache=False, compact=False):
         """
         expects the name of the dataset and the filename with the data to load
         adds column DeltaY and IdealFunction to the dataframe and fills it with
-        0 and not_assigned
+        0.0 and not_assigned
         :param name: name of the dataset
         :param filename: name of the file that contains the data that should be loaded
+        :param chunksize: number of rows that are read at once, None to read the whole file at once
+        :param dtype: the dtype of all columns (e.g. 'float32'), None for the detected dtypes
+        :param usecols: list with the names of the columns that should be loaded, None for all
+        :param cache: if True, the data is loaded from and stored to a binary cache next to the file
+        :param compact: if True, the coordinates and DeltaY are stored as float32 and
+         IdealFunction as categorical column, which stores one small integer code per
+         coordinate instead of a python string
         """
-        DataSet.__init__(self, name, filename)
-        self.dataframe['DeltaY'] = [0] * self.dataframe.shape[0]
-        self.dataframe['IdealFunction'] = ['not_assigned'] * self.dataframe.shape[0]
+        DataSet.__init__(self, name, filename, chunksize=chunksize, dtype=dtype, usecols=usecols, cache=cache,
+                         compact=compact)
+        number_of_rows = self.dataframe.shape[0]
+        # DeltaY stores distances, so it is a float column from the beginning
+        self.dataframe['DeltaY'] = np.zeros(number_of_rows, dtype=COMPACT_DTYPE if compact else np.float64)
+        if compact:
+            self.dataframe['IdealFunction'] = pd.Categorical.from_codes(np.zeros(number_of_rows, dtype=np.int8),
+                                                                        categories=['not_assigned'])
+        else:
+            self.dataframe['IdealFunction'] = ['not_assigned'] * number_of_rows
 
-    def check_coordinates_against_function(self, function, name, max_distance):
+    @instrumentation.timed()
+    def check_coordinates_against_function(self, function, name, max_distance, method='python', workers=None):
         """
         checks every coordinate in the testdata against the
         function. if it is not more far away as the maximum
@@ -352,8 +807,13 @@ class TestDataSet(DataSet):
         :param name: name of the function
         :param max_distance: the maximum distance that should not be exceeded
         by the multiplication of sqrt(2)
+        :param method: 'python', 'index' or 'parallel' (see ASSIGN_METHODS)
+        :param workers: number of worker processes with method 'parallel',
+         the number of CPUs if None
         :return: None
         """
+        if method not in ASSIGN_METHODS:
+            raise ValueError('Unknown assign method: ' + str(method))
         # check if submitted function is a dataframe
         try:
             if not isinstance(function, pandas.DataFrame):
@@ -379,6 +839,29 @@ class TestDataSet(DataSet):
             # calculate the maximum allowed distance between the points to be a
             # match by multiplying the maximum distance by the sqrt of two
             max_distance_mbsqrt2 = abs(max_distance) * math.sqrt(2)
+            if method == 'index':
+                # only the points of the function near a test point are checked
+                function_index = spatial.FunctionIndex(function['x'].to_numpy(dtype=float),
+                                                       function['y'].to_numpy(dtype=float))
+                distances = function_index.nearest_distances(self.dataframe['x'].to_numpy(dtype=float),
+                                                             self.dataframe['y'].to_numpy(dtype=float),
+                                                             max_distance_mbsqrt2)
+                self._assign_distances(distances[:, np.newaxis], [name])
+                return
+            if method == 'parallel':
+                # the chunks of the test data are checked in worker processes
+                distances = spatial.nearest_distances_parallel(
+                    [(function['x'].to_numpy(dtype=float), function['y'].to_numpy(dtype=float),
+                      max_distance_mbsqrt2)],
+                    self.dataframe['x'].to_numpy(dtype=float), self.dataframe['y'].to_numpy(dtype=float),
+                    workers)
+                self._assign_distances(distances, [name])
+                return
+            self._add_ideal_function_names([name])
+            # the distances are stored with the dtype of DeltaY, so that
+            # a compact float32 column is not upcast by pandas
+            delta_y_type = self.dataframe['DeltaY'].dtype.type
+            instrumentation.count(instrumentation.DISTANCE_EVALUATIONS, len(self.dataframe) * len(function))
             for i in self.dataframe.index:
                 test_x = self.dataframe.loc[i, 'x']
                 test_y = self.dataframe.loc[i, 'y']
@@ -403,24 +886,150 @@ class TestDataSet(DataSet):
                         if self.dataframe.loc[i, 'IdealFunction'] == 'not_assigned':
                             # assign it and store the distance
                             self.dataframe.loc[i, 'IdealFunction'] = name
-                            self.dataframe.loc[i, 'DeltaY'] = abs(distance)
+                            self.dataframe.loc[i, 'DeltaY'] = delta_y_type(abs(distance))
                         # coordinate is already assigned to an ideal function
                         else:
                             # check if distance of the already assigned function
                             # is greater. if so, assign the actual checked coordinate
                             # to the actual function. if distance is smaller, leave
                             # it assigned to the already assigned ideal function
-                            if self.dataframe.loc[i, 'DeltaY'] > distance:
+                            if self.dataframe.loc[i, 'DeltaY'] > delta_y_type(distance):
                                 # assign it and store the distance
                                 self.dataframe.loc[i, 'IdealFunction'] = name
-                                self.dataframe.loc[i, 'DeltaY'] = abs(distance)
+                                self.dataframe.loc[i, 'DeltaY'] = delta_y_type(abs(distance))
+
+    @instrumentation.timed()
+    def check_coordinates_against_functions(self, functions, method='index', workers=None):
+        """
+        does the same as calling check_coordinates_against_function for every
+        submitted function one after another. with method 'index' the distances
+        of all coordinates to all functions are calculated first, the closest
+        function is chosen for every coordinate at once and the columns DeltaY
+        and IdealFunction are written back in one assignment. with method
+        'parallel' the distances of every chunk of the test data are calculated
+        in another worker process and merged before the assignment
+        :param functions: list of tuples with the dataframe with the function,
+         the name of the function and the maximum distance, which are the
+         parameters of check_coordinates_against_function
+        :param method: 'python', 'index' or 'parallel' (see ASSIGN_METHODS)
+        :param workers: number of worker processes with method 'parallel',
+         the number of CPUs if None
+        :return: None
+        """
+        if method not in ASSIGN_METHODS:
+            raise ValueError('Unknown assign method: ' + str(method))
+        if method == 'python':
+            for function, name, max_distance in functions:
+                self.check_coordinates_against_function(function, name, max_distance, method=method)
+            return
+        test_x = self.dataframe['x'].to_numpy(dtype=float)
+        test_y = self.dataframe['y'].to_numpy(dtype=float)
+        distances = np.full((len(test_x), len(functions)), np.inf)
+        names = []
+        # the valid functions that are checked in the worker processes with method 'parallel'
+        parallel_columns = []
+        parallel_functions = []
+        for k, (function, name, max_distance) in enumerate(functions):
+            names.append(name)
+            # check if submitted function is a dataframe
+            try:
+                if not isinstance(function, pandas.DataFrame):
+                    raise InvalidDataFrameError
+
+            except InvalidDataFrameError:
+                now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+                exception_type, exception_value, exception_traceback = exc_info()
+                file_name, line_number, procedure_name, line_code \
+                    = traceback.extract_tb(exception_traceback)[-1]
+                # get Logging-Instance from Main Scope
+                logger = logging.getLogger('__main__')
+                logger.error("Exception Datetime: %s", now)
+                logger.error("Exception Type: %s", exception_type)
+                logger.error("Exception Value: %s", exception_value)
+                logger.error("Message Value: %s", InvalidDataFrameError().error_message)
+                logger.error("File Name: %s", file_name)
+                logger.error("Line Number: %d", line_number)
+                logger.error("Procedure Name: %s", procedure_name)
+                logger.error("Line Code: %s", line_code)
 
-    def visualize_test_data_with_ideal_function(self, idealfunction, name_of_ideal_function):
+            else:
+                if method == 'parallel':
+                    parallel_columns.append(k)
+                    parallel_functions.append((function['x'].to_numpy(dtype=float),
+                                               function['y'].to_numpy(dtype=float),
+                                               abs(max_distance) * math.sqrt(2)))
+                    continue
+                function_index = spatial.FunctionIndex(function['x'].to_numpy(dtype=float),
+                                                       function['y'].to_numpy(dtype=float))
+                distances[:, k] = function_index.nearest_distances(test_x, test_y,
+                                                                   abs(max_distance) * math.sqrt(2))
+        if parallel_functions:
+            distances[:, parallel_columns] = spatial.nearest_distances_parallel(parallel_functions,
+                                                                                test_x, test_y, workers)
+        self._assign_distances(distances, names)
+
+    def _assign_distances(self, distances, names):
+        """
+        assigns every coordinate to the closest of the submitted functions with a
+        finite distance, unless it is already assigned to an ideal function with
+        a smaller or equal distance. on equal distances the function that comes
+        first wins. this is the same rule as in the loop of
+        check_coordinates_against_function, but all coordinates are written back
+        at once
+        :param distances: array with one row for every coordinate and one column
+         with the distances to every function, inf if the coordinate should not
+         be assigned to the function
+        :param names: list with the names of the functions
+        :return: None
+        """
+        self._add_ideal_function_names(names)
+        ideal_functions = self.dataframe['IdealFunction']
+        delta_y = self.dataframe['DeltaY'].to_numpy(dtype=float)
+        if self.dataframe['DeltaY'].dtype != np.float64:
+            # compare the distances with the precision they are stored with,
+            # like check_coordinates_against_function does
+            distances = distances.astype(self.dataframe['DeltaY'].dtype).astype(float)
+        # the distance of the already assigned function comes first, so that
+        # it is only replaced by a function with a smaller distance
+        assigned_distances = np.where((ideal_functions == 'not_assigned').to_numpy(), np.inf, delta_y)
+        distances = np.column_stack([assigned_distances, distances])
+        closest = np.argmin(distances, axis=1)
+        assign = closest > 0
+        closest_distances = distances[np.arange(len(closest)), closest]
+        # write back both columns at once with the dtypes they already have
+        if isinstance(ideal_functions.dtype, pd.CategoricalDtype):
+            # only the integer codes of the categorical column are changed
+            name_codes = np.concatenate([[-1], ideal_functions.cat.categories.get_indexer(names)])
+            codes = np.where(assign, name_codes[closest], ideal_functions.cat.codes.to_numpy())
+            self.dataframe['IdealFunction'] = pd.Categorical.from_codes(codes, dtype=ideal_functions.dtype)
+        else:
+            closest_names = np.array([None] + list(names), dtype=object)[closest]
+            self.dataframe['IdealFunction'] = np.where(assign, closest_names, ideal_functions.to_numpy())
+        self.dataframe['DeltaY'] = np.where(assign, closest_distances, delta_y).astype(
+            self.dataframe['DeltaY'].dtype)
+
+    def _add_ideal_function_names(self, names):
+        """
+        with compact=True the column IdealFunction is categorical, so the names of
+        the functions must be categories of the column before they are assigned
+        :param names: list with the names of the functions
+        :return: None
+        """
+        ideal_functions = self.dataframe['IdealFunction']
+        if isinstance(ideal_functions.dtype, pd.CategoricalDtype):
+            new_names = [n for n in dict.fromkeys(names) if n not in ideal_functions.cat.categories]
+            if new_names:
+                self.dataframe['IdealFunction'] = ideal_functions.cat.add_categories(new_names)
+
+    def visualize_test_data_with_ideal_function(self, idealfunction, name_of_ideal_function, mode='decimated'):
         """
         this method visualizes the test data coordinates with its assigned
         ideal function
         :param: idealfunction: the dataframe with the ideal function
         :param: name_of_ideal_function: the name of the ideal function
+        :param mode: 'decimated' to draw only the points of the ideal function visible at the
+         width of the plot and many test data coordinates as a density image, 'full' to draw
+         every point (see RENDER_MODES)
         :return: None
         """
         # check if submitted function is a dataframe
@@ -445,43 +1054,32 @@ class TestDataSet(DataSet):
             logger.error("Line Code: %s", line_code)
 
         else:
-            x_list = idealfunction['x'].tolist()
-            y_list = idealfunction['y'].tolist()
-            # get all testdata coordinates assigned to the ideal function
-            test_data_x_list = []
-            test_data_y_list = []
-            for i in self.dataframe.index:
-                if self.dataframe.loc[i, 'IdealFunction'] == name_of_ideal_function:
-                    test_data_x_list.append(self.dataframe.loc[i, 'x'])
-                    test_data_y_list.append(self.dataframe.loc[i, 'y'])
+            # get all testdata coordinates assigned to the ideal function at once
+            assigned = (self.dataframe['IdealFunction'] == name_of_ideal_function).to_numpy()
             # render it
+            plt, style = import_pyplot()
             style.use('ggplot')
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.plot(x_list, y_list, label='Ideal Function ' + name_of_ideal_function, linewidth=2)
-            ax.plot(test_data_x_list, test_data_y_list, 'bo', label='Test Data')
-            ax.legend()
-            ax.grid(True, color="k")
-            plt.title('Test Data assigned to Ideal Function ' + name_of_ideal_function)
+            fig = rendering.create_test_data_figure(plt, self.dataframe['x'].to_numpy()[assigned],
+                                                    self.dataframe['y'].to_numpy()[assigned],
+                                                    idealfunction['x'].to_numpy(), idealfunction['y'].to_numpy(),
+                                                    name_of_ideal_function, mode=mode)
             plt.show()
+            plt.close(fig)
 
-    def visualize_test_data_without_assignment(self):
+    def visualize_test_data_without_assignment(self, mode='decimated'):
         """
         this method visualizes the test data coordinates
         that could not be assigned to an ideal function
+        :param mode: 'decimated' to draw many coordinates as a density image,
+         'full' to draw every coordinate (see RENDER_MODES)
         :return: None
         """
-        # get all testdata coordinates with no assignment
-        test_data_x_list = []
-        test_data_y_list = []
-        for i in self.dataframe.index:
-            if self.dataframe.loc[i, 'IdealFunction'] == 'not_assigned':
-                test_data_x_list.append(self.dataframe.loc[i, 'x'])
-                test_data_y_list.append(self.dataframe.loc[i, 'y'])
+        # get all testdata coordinates with no assignment at once
+        not_assigned = (self.dataframe['IdealFunction'] == 'not_assigned').to_numpy()
         # render it
+        plt, style = import_pyplot()
         style.use('ggplot')
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.plot(test_data_x_list, test_data_y_list, 'bo', label='Test Data')
-        ax.legend()
-        ax.grid(True, color="k")
-        plt.title('Test Data with no assignment to an Ideal Function')
+        fig = rendering.create_test_data_figure(plt, self.dataframe['x'].to_numpy()[not_assigned],
+                                                self.dataframe['y'].to_numpy()[not_assigned], mode=mode)
         plt.show()
+        plt.close(fig)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import traceback
+from datetime import datetime
+from sys import exc_info
+import numpy as np
+import pandas as pd
+
+
+# version of the layout of the cache files. caches with another
+# version are rebuilt
+CACHE_VERSION = 1
+
+
+def get_cache_filenames(filename):
+    """
+    returns the names of the files of the binary cache of a data file. the
+    data is stored in a .npy-file with one row per column of the data file
+    and the column names and the fingerprint of the data file in a .json-file
+    :param filename: the filename of the data file
+    :return: tuple with the name of the .npy-file and the name of the .json-file
+    """
+    return filename + '.cache.npy', filename + '.cache.json'
+
+
+def get_file_fingerprint(filename):
+    """
+    returns the fingerprint of a data file, which changes
+    whenever the file is changed or replaced
+    :param filename: the filename of the data file
+    :return: dictionary with the absolute path, the size and the modification time
+    """
+    stat = os.stat(filename)
+    return {"path": os.path.abspath(filename), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def get_cache_options(dtype, usecols):
+    """
+    returns the load options that change the data of the cache
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :return: dictionary with the load options
+    """
+    return {"dtype": None if dtype is None else np.dtype(dtype).name,
+            "usecols": None if usecols is None else sorted(set(usecols) | {'x'})}
+
+
+def read_cache_metadata(filename, dtype=None, usecols=None):
+    """
+    returns the metadata of the binary cache of a data file if the cache
+    exists and was built from the actual data file with the same options
+    :param filename: the filename of the data file
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :return: dictionary with the metadata or None if there is no valid cache
+    """
+    data_filename, metadata_filename = get_cache_filenames(filename)
+    try:
+        with open(metadata_filename) as file:
+            metadata = json.load(file)
+        valid = (metadata.get("version") == CACHE_VERSION and
+                 metadata.get("fingerprint") == get_file_fingerprint(filename) and
+                 metadata.get("options") == get_cache_options(dtype, usecols) and
+                 os.path.exists(data_filename))
+
+    except (OSError, ValueError):
+        return None
+
+    return metadata if valid else None
+
+
+def read_cache(filename, dtype=None, usecols=None, mmap=False):
+    """
+    loads the dataframe from the binary cache of a data file
+    :param filename: the filename of the data file
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :param mmap: if True, the .npy-file is memory-mapped read-only instead of
+     being read. opening it takes the same time for every size of the file,
+     the data is only read from disk when it is accessed and the pages are
+     shared by all processes that map the same file
+    :return: the dataframe or None if there is no valid cache
+    """
+    metadata = read_cache_metadata(filename, dtype, usecols)
+    if metadata is None:
+        return None
+    data_filename, metadata_filename = get_cache_filenames(filename)
+    try:
+        data = np.load(data_filename, mmap_mode='r' if mmap else None, allow_pickle=False)
+
+    except (OSError, ValueError):
+        return None
+
+    return dataframe_from_array(data, metadata)
+
+
+def dataframe_from_array(data, metadata):
+    """
+    builds the dataframe from the array of a cache without copying the data,
+    as long as all columns have the dtype of the array
+    :param data: the array with one row per column
+    :param metadata: the metadata of the cache
+    :return: the dataframe
+    """
+    dataframe = pd.DataFrame(data.T, columns=metadata["columns"], copy=False)
+    for column, column_dtype in zip(metadata["columns"], metadata["dtypes"]):
+        if dataframe[column].dtype.name != column_dtype:
+            dataframe[column] = dataframe[column].astype(column_dtype)
+    return dataframe
+
+
+def write_cache(filename, dataframe, dtype=None, usecols=None):
+    """
+    writes the dataframe to the binary cache of a data file. the .json-file is
+    written last, so a cache that was not written completely is never valid
+    :param filename: the filename of the data file the dataframe was loaded from
+    :param dataframe: the dataframe loaded from the data file
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :return: True if the cache was written, False if the dataframe could not be
+     stored as one numeric array or the cache files could not be written
+    """
+    if not all(d.kind in 'biuf' for d in dataframe.dtypes):
+        return False
+    data_filename, metadata_filename = get_cache_filenames(filename)
+    metadata = {"version": CACHE_VERSION,
+                "fingerprint": get_file_fingerprint(filename),
+                "options": get_cache_options(dtype, usecols),
+                "columns": dataframe.columns.to_list(),
+                "dtypes": [d.name for d in dataframe.dtypes]}
+    common_dtype = np.result_type(*dataframe.dtypes) if dataframe.shape[1] else np.float64
+    try:
+        data = np.ascontiguousarray(dataframe.to_numpy(dtype=common_dtype).T)
+        # invalidate the old cache, write to temporary files
+        # and replace the cache files afterwards
+        if os.path.exists(metadata_filename):
+            os.remove(metadata_filename)
+        with open(data_filename + '.tmp', 'wb') as file:
+            np.save(file, data, allow_pickle=False)
+        os.replace(data_filename + '.tmp', data_filename)
+        with open(metadata_filename + '.tmp', 'w') as file:
+            json.dump(metadata, file)
+        os.replace(metadata_filename + '.tmp', metadata_filename)
+
+    except OSError:
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        logger.error("The cache of the following file could not be written: %s", filename)
+        # the cache is optional, the data was loaded anyway
+        return False
+
+    return True
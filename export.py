@@ -0,0 +1,234 @@
+import logging
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from sys import exc_info
+import numpy as np
+import pandas as pd
+import pipeline
+import rendering
+
+
+# formats the plots could be exported to
+IMAGE_FORMATS = ('png', 'svg', 'pdf')
+
+
+def get_export_jobs(ideal_columns, ideal_functions_found, directory, image_format='png',
+                    name_of_ideal_data_set='IdealData'):
+    """
+    returns the plots that are exported: every ideal function, every found ideal
+    function with its train function, the test data assigned to every found ideal
+    function and the test data that was not assigned
+    :param ideal_columns: list with the names of all ideal functions
+    :param ideal_functions_found: list of dictionaries with the TrainFunction,
+     the IdealFunction and the MaxDistance of every found ideal function
+    :param directory: the directory the image files are written to
+    :param image_format: one of IMAGE_FORMATS
+    :param name_of_ideal_data_set: the name of the IdealDataSet in the titles of the ideal functions
+    :return: list of tuples with the kind of the plot, its parameters and the filename.
+     the parameters are the index of the ideal function and the index of the train
+     function or the code of the assigned test data in the shared data (see export_plots)
+    """
+    jobs = []
+    for k, name in enumerate(ideal_columns):
+        jobs.append(('function', (k, name, name_of_ideal_data_set + ' Function ' + name),
+                     os.path.join(directory, 'ideal_function_' + name + '.' + image_format)))
+    for t, ideal_function in enumerate(ideal_functions_found):
+        ideal_name = ideal_function['IdealFunction']
+        train_name = ideal_function['TrainFunction']
+        jobs.append(('comparison', (ideal_columns.index(ideal_name), t, ideal_name, train_name),
+                     os.path.join(directory, 'train_function_' + train_name + '_ideal_function_' + ideal_name +
+                                  '.' + image_format)))
+    # the code 0 stands for not assigned test data, the code of a found ideal function is its position + 1
+    for code, ideal_name in enumerate(get_assignment_names(ideal_functions_found)):
+        if code == 0:
+            jobs.append(('test_data', (0, -1, None),
+                         os.path.join(directory, 'test_data_not_assigned.' + image_format)))
+        else:
+            jobs.append(('test_data', (code, ideal_columns.index(ideal_name), ideal_name),
+                         os.path.join(directory, 'test_data_ideal_function_' + ideal_name + '.' + image_format)))
+    return jobs
+
+
+def get_assignment_names(ideal_functions_found):
+    """
+    returns the names the test data could be assigned to, every name only once
+    :param ideal_functions_found: list of dictionaries with the IdealFunction of every found ideal function
+    :return: list with 'not_assigned' and the names of the found ideal functions
+    """
+    names = ['not_assigned']
+    for ideal_function in ideal_functions_found:
+        if ideal_function['IdealFunction'] not in names:
+            names.append(ideal_function['IdealFunction'])
+    return names
+
+
+# the data of the plots and the pyplot module, attached once in every worker process of export_plots
+_worker_shared_memory = None
+_worker_data = None
+_worker_pyplot = None
+
+
+def _attach_plot_data(shared_memory_name, layout):
+    """
+    initializer of the worker processes of export_plots, which attaches the
+    shared memory with the data of the plots without copying it and prepares
+    matplotlib with the non-interactive Agg backend, so no window is opened
+    :param shared_memory_name: the name of the shared memory
+    :param layout: list of tuples with the name, the shape, the dtype and the offset of every array
+    :return: None
+    """
+    global _worker_shared_memory, _worker_data, _worker_pyplot
+    _worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    _worker_data = {name: np.ndarray(shape, dtype=dtype, buffer=_worker_shared_memory.buf, offset=offset)
+                    for name, shape, dtype, offset in layout}
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    from matplotlib import pyplot
+    from matplotlib import style
+    style.use('ggplot')
+    _worker_pyplot = pyplot
+
+
+def _export_plots_in_worker(jobs, mode):
+    """
+    renders the plots of a chunk of jobs in a worker process of export_plots
+    :param jobs: list of tuples with the kind of the plot, its parameters and the filename (see get_export_jobs)
+    :param mode: one of rendering.RENDER_MODES
+    :return: list with the filenames that were written
+    """
+    plt = _worker_pyplot
+    x_values = _worker_data['x']
+    written = []
+    for kind, parameters, filename in jobs:
+        if kind == 'function':
+            k, name, title = parameters
+            fig = rendering.create_function_figure(plt, x_values, _worker_data['ideal'][k], name, title,
+                                                   mode=mode)
+        elif kind == 'comparison':
+            k, t, ideal_name, train_name = parameters
+            fig = rendering.create_comparison_figure(plt, x_values, _worker_data['ideal'][k],
+                                                     _worker_data['train'][t], ideal_name, train_name, mode=mode)
+        else:
+            code, k, ideal_name = parameters
+            assigned = _worker_data['test_codes'] == code
+            test_x = _worker_data['test_x'][assigned]
+            test_y = _worker_data['test_y'][assigned]
+            if ideal_name is None:
+                fig = rendering.create_test_data_figure(plt, test_x, test_y, mode=mode)
+            else:
+                fig = rendering.create_test_data_figure(plt, test_x, test_y, x_values, _worker_data['ideal'][k],
+                                                        ideal_name, mode=mode)
+        try:
+            fig.savefig(filename)
+            written.append(filename)
+
+        except OSError:
+            now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+            exception_type, exception_value, exception_traceback = exc_info()
+            file_name, line_number, procedure_name, line_code \
+                = traceback.extract_tb(exception_traceback)[-1]
+            # get Logging-Instance from Main Scope
+            logger = logging.getLogger('__main__')
+            logger.error("Exception Datetime: %s", now)
+            logger.error("Exception Type: %s", exception_type)
+            logger.error("Exception Value: %s", exception_value)
+            logger.error("File Name: %s", file_name)
+            logger.error("Line Number: %d", line_number)
+            logger.error("Procedure Name: %s", procedure_name)
+            logger.error("Line Code: %s", line_code)
+            logger.error("The following plot could not be written: %s", filename)
+
+        finally:
+            # the figures are not shown, so they are closed at once to free their memory
+            plt.close(fig)
+    return written
+
+
+def export_plots(ideal_data_set, train_data_set, test_data_set, ideal_functions_found, directory,
+                 workers=None, mode='decimated', image_format='png', chunk_size=None):
+    """
+    renders all plots of a run to image files without opening a window (see
+    get_export_jobs). the plots are split into chunks that are rendered by a
+    pool of worker processes. the data of the plots is copied once into shared
+    memory, which every worker attaches, so only the chunks are sent to the workers
+    :param ideal_data_set: the IdealDataSet
+    :param train_data_set: the DataSet with the train functions
+    :param test_data_set: the TestDataSet after the assignment
+    :param ideal_functions_found: list of dictionaries with the TrainFunction,
+     the IdealFunction and the MaxDistance of every found ideal function
+    :param directory: the directory the image files are written to, which is created if it does not exist
+    :param workers: number of worker processes, the number of CPUs if None
+    :param mode: one of rendering.RENDER_MODES
+    :param image_format: one of IMAGE_FORMATS
+    :param chunk_size: number of plots per chunk, calculated so that every worker gets about four chunks if None
+    :return: tuple with the list of the filenames that were written and the list of those that were not
+    """
+    if mode not in rendering.RENDER_MODES:
+        raise ValueError('Unknown render mode: ' + str(mode))
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError('Unknown image format: ' + str(image_format))
+    ideal_columns, ideal_matrix = ideal_data_set.get_function_matrix()
+    jobs = get_export_jobs(ideal_columns, ideal_functions_found, directory, image_format, ideal_data_set.name)
+    filenames = [filename for kind, parameters, filename in jobs]
+    try:
+        os.makedirs(directory, exist_ok=True)
+
+    except OSError:
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        return [], filenames
+
+    # the data of all plots, the test data is assigned to the codes of get_assignment_names
+    train_dataframe = train_data_set.get_dataframe()
+    test_dataframe = test_data_set.get_dataframe()
+    assignments = pd.Categorical(test_dataframe['IdealFunction'].astype(str),
+                                 categories=get_assignment_names(ideal_functions_found))
+    x_values = ideal_data_set.get_dataframe()['x'].to_numpy(dtype=np.float64)
+    train_functions = np.empty((len(ideal_functions_found), len(x_values)))
+    for t, ideal_function in enumerate(ideal_functions_found):
+        train_functions[t] = train_dataframe[ideal_function['TrainFunction']].to_numpy(dtype=np.float64)
+    arrays = {"x": x_values,
+              "ideal": ideal_matrix,
+              "train": train_functions,
+              "test_x": test_dataframe['x'].to_numpy(dtype=np.float64),
+              "test_y": test_dataframe['y'].to_numpy(dtype=np.float64),
+              "test_codes": np.asarray(assignments.codes, dtype=np.int64)}
+    layout = []
+    offset = 0
+    for name, values in arrays.items():
+        layout.append((name, np.shape(values), 'float64' if name != 'test_codes' else 'int64', offset))
+        offset += max(8, int(np.prod(np.shape(values))) * 8)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(jobs) // (workers * 4)))
+    shared = shared_memory.SharedMemory(create=True, size=offset)
+    try:
+        for name, shape, dtype, array_offset in layout:
+            np.ndarray(shape, dtype=dtype, buffer=shared.buf, offset=array_offset)[...] = arrays[name]
+        with ProcessPoolExecutor(max_workers=min(workers, max(1, len(jobs))),
+                                 mp_context=pipeline.get_process_context(), initializer=_attach_plot_data,
+                                 initargs=(shared.name, layout)) as executor:
+            futures = [executor.submit(_export_plots_in_worker, jobs[start:start + chunk_size], mode)
+                       for start in range(0, len(jobs), chunk_size)]
+            written = [filename for future in futures for filename in future.result()]
+
+    finally:
+        shared.close()
+        shared.unlink()
+
+    written_filenames = set(written)
+    return written, [filename for filename in filenames if filename not in written_filenames]
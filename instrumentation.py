@@ -0,0 +1,241 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+from sys import exc_info
+
+
+# names of the counters, which are increased by the code that does the work
+CANDIDATES_SCORED = 'candidates_scored'
+DISTANCE_EVALUATIONS = 'distance_evaluations'
+ROWS_WRITTEN = 'rows_written'
+
+# the instrumentation is disabled until enable is called. while it is
+# disabled, stage, timed and count only check this flag and do nothing else
+_enabled = False
+_lock = threading.Lock()
+# the finished stages as tuples of name, start, duration, process id and thread id
+_events = []
+_counters = {}
+# the time all stages are measured from
+_origin = time.perf_counter()
+
+
+def enable():
+    """
+    starts recording stages and counters, everything recorded before is dropped
+    :return: None
+    """
+    global _enabled
+    reset()
+    _enabled = True
+
+
+def disable():
+    """
+    stops recording stages and counters, the recorded ones are kept until reset or enable
+    :return: None
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """
+    returns if stages and counters are recorded
+    :return: True if enabled
+    """
+    return _enabled
+
+
+def reset():
+    """
+    drops all recorded stages and counters
+    :return: None
+    """
+    global _origin
+    with _lock:
+        _events.clear()
+        _counters.clear()
+        _origin = time.perf_counter()
+
+
+class _Stage:
+    """
+    Measures the time of a stage from the beginning to the end of a with-statement
+    """
+
+    def __init__(self, name):
+        """
+        prepares the measurement of a stage
+        :param name: the name of the stage
+        """
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        """
+        starts the measurement
+        :return: the stage
+        """
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        """
+        records the stage, also if it was left by an exception
+        :return: None
+        """
+        duration = time.perf_counter() - self.start
+        with _lock:
+            _events.append((self.name, self.start - _origin, duration, os.getpid(), threading.get_ident()))
+
+
+class _DisabledStage:
+    """
+    Stands for a stage while the instrumentation is disabled and does nothing
+    """
+
+    def __enter__(self):
+        """
+        does nothing
+        :return: the stage
+        """
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        """
+        does nothing
+        :return: None
+        """
+
+
+# there is only one disabled stage, so that stage does not create an object while disabled
+_DISABLED_STAGE = _DisabledStage()
+
+
+def stage(name):
+    """
+    returns a context manager, which measures the time of the with-statement
+    as a stage with the name. stages may be nested and run in several threads
+    :param name: the name of the stage
+    :return: the context manager
+    """
+    if not _enabled:
+        return _DISABLED_STAGE
+    return _Stage(name)
+
+
+def timed(name=None):
+    """
+    decorator, which measures every call of a function as a stage
+    :param name: the name of the stage, the qualified name of the function if None
+    :return: the decorator
+    """
+    def decorator(function):
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Stage(stage_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """
+    increases a counter. the counters of worker processes are not collected,
+    so work done there is only counted if the calling process knows its amount
+    :param name: the name of the counter (e.g. CANDIDATES_SCORED)
+    :param value: the number the counter is increased by
+    :return: None
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + int(value)
+
+
+def get_counters():
+    """
+    returns the actual values of all counters
+    :return: dictionary with the value of every counter
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def get_report():
+    """
+    summarizes the recorded stages and counters
+    :return: dictionary with the number of calls, the total and the maximum
+     time in seconds of every stage in the order of their first start and
+     the values of all counters
+    """
+    with _lock:
+        events = sorted(_events, key=lambda event: event[1])
+        counters = dict(_counters)
+    stages = {}
+    for name, start, duration, process_id, thread_id in events:
+        summary = stages.setdefault(name, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        summary['calls'] += 1
+        summary['total_seconds'] += duration
+        summary['max_seconds'] = max(summary['max_seconds'], duration)
+    return {"stages": stages, "counters": counters}
+
+
+def get_chrome_trace():
+    """
+    returns the recorded stages in the trace event format, which could be
+    opened with chrome://tracing or https://ui.perfetto.dev. every stage is a
+    complete event in the row of its thread, the counters are added at the end
+    :return: dictionary with the list traceEvents
+    """
+    with _lock:
+        events = sorted(_events, key=lambda event: event[1])
+        counters = dict(_counters)
+    trace_events = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+                     "pid": process_id, "tid": thread_id}
+                    for name, start, duration, process_id, thread_id in events]
+    end = max([(start + duration) * 1e6 for name, start, duration, process_id, thread_id in events] or [0])
+    trace_events += [{"name": name, "ph": "C", "ts": end, "pid": os.getpid(), "args": {name: value}}
+                     for name, value in counters.items()]
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def write_report(filename, chrome_trace=False):
+    """
+    writes the recorded stages and counters to a json file
+    :param filename: the name of the json file
+    :param chrome_trace: if True, the file is written in the trace event
+     format of get_chrome_trace, otherwise the summary of get_report
+    :return: True if the file was written, False if not
+    """
+    try:
+        with open(filename, 'w') as file:
+            json.dump(get_chrome_trace() if chrome_trace else get_report(), file, indent=None if chrome_trace else 2)
+
+    except OSError:
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        return False
+
+    return True
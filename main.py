@@ -1,25 +1,74 @@
+import functools
 import math
 import sys
 import getopt
 import logging
+import traceback
+from datetime import datetime
+from sys import exc_info
 
-from sqlalchemy.exc import ArgumentError
-
-from database import SQLiteDataBase
+from database import SQLiteDataBase, get_database_errors
 import datasets
-from exceptions import InvalidFunctionDataError, InvalidDataFileError
+import export
+import instrumentation
+import pipeline
+import resultcache
+import results as run_results
+from exceptions import InvalidFunctionDataError, InvalidDataFileError, InvalidDataFrameError
+
+
+# the command line options of this program
+USAGE = ('main.py -t <testdatafile> -r <traindatafile> -i <idealdatafile> -d <databasefile>'
+         ' -m <' + '|'.join(datasets.COMPARE_METHODS) + '>'
+         ' -a <' + '|'.join(datasets.ASSIGN_METHODS) + '>'
+         ' --chunksize=<rows> --float32 --cache --mmap'
+         ' --dbmode=<' + '|'.join(datasets.WRITE_MODES) + '> -w <workers> --pipeline'
+         ' --batch --output=<jsonfile> --nodb --resultcache --compact'
+         ' --profile=<jsonfile> --trace=<tracefile>'
+         ' --render=<' + '|'.join(datasets.RENDER_MODES) + '> --export=<directory>')
+
+# exit codes of this program. in batch mode the program stops
+# with the exit code of the first error that appears
+EXIT_SUCCESS = 0
+EXIT_USAGE_ERROR = 2
+EXIT_DATA_FILE_ERROR = 3
+EXIT_DATABASE_ERROR = 4
+EXIT_MATCHING_ERROR = 5
+EXIT_OUTPUT_ERROR = 6
 
 
-def handle_exception(errormessage):
+def print_database_write_result(success, name, batch=False):
+    """
+    prints if a dataset was written to database
+    :param success: the result of DataSet.write_to_database
+    :param name: the name of the data, which is printed
+    :param batch: if True, the program is stopped with EXIT_DATABASE_ERROR
+     if the dataset was not written
+    :return: None
+    """
+    if success:
+        print(name + " stored in Database.")
+    else:
+        print("ERROR: " + name + " NOT stored in Database. See error.log for more details.")
+        if batch:
+            sys.exit(EXIT_DATABASE_ERROR)
+
+
+def handle_exception(errormessage, batch=False, exit_code=1):
     """
     Handles critical exceptions and let the user decide
-    if the program should be interrupted or continued
+    if the program should be interrupted or continued.
+    in batch mode nobody could decide, so the program is stopped
     :param errormessage: the errormessage from the exception that appeared
+    :param batch: if True, the program is stopped without asking
+    :param exit_code: the exit code the program is stopped with in batch mode
     :return: None
     """
     print('ERROR:')
     print(errormessage)
     print('Please see error.log for more details.')
+    if batch:
+        sys.exit(exit_code)
     print('The program probably will not run correctly.')
     print('Do you want to continue anyway?')
     print('[Y] - Yes, continue anyway.')
@@ -31,6 +80,31 @@ def handle_exception(errormessage):
             sys.exit(0)
 
 
+def export_all_plots(ideal_data_set, train_data_set, test_data_set, ideal_functions_found, directory,
+                     workers=None, render_mode='decimated'):
+    """
+    exports every ideal function, every found ideal function with its train function
+    and the assigned and not assigned test data to image files and prints the result
+    :param ideal_data_set: the IdealDataSet
+    :param train_data_set: the DataSet with the train functions
+    :param test_data_set: the TestDataSet after the assignment
+    :param ideal_functions_found: list of dictionaries with the TrainFunction,
+     the IdealFunction and the MaxDistance of every found ideal function
+    :param directory: the directory the image files are written to
+    :param workers: number of worker processes, the number of CPUs if None
+    :param render_mode: one of datasets.RENDER_MODES
+    :return: True if all plots were written, False if not
+    """
+    print('Exporting all plots to ' + directory + '...')
+    written, failed = export.export_plots(ideal_data_set, train_data_set, test_data_set, ideal_functions_found,
+                                          directory, workers=workers, mode=render_mode)
+    print(str(len(written)) + ' plots written to ' + directory + '.')
+    if failed:
+        print('ERROR: ' + str(len(failed)) + ' plots NOT written. See error.log for more details.')
+        return False
+    return True
+
+
 def main(argv):
     """
     this program reads train, test and ideal data
@@ -39,6 +113,10 @@ def main(argv):
     writes everything to database
     :param argv: command line options could be:
      -t <testdatafile> -r <traindatafile> -i <idealdatafile> -d <databasefile>
+     -m <comparemethod> -a <assignmethod> --chunksize=<rows> --float32 --cache --mmap
+     --dbmode=<writemode> -w <workers> --pipeline --batch --output=<jsonfile> --nodb
+     --resultcache --compact --profile=<jsonfile> --trace=<tracefile> --render=<rendermode>
+     --export=<directory>
     :return: None
     """
     # the data is stored in datasets which are declared here already
@@ -58,18 +136,60 @@ def main(argv):
     ideal_data_file = 'ideal.csv'
     # define database file if not overriden by command line option
     database_file = '/database/sqlitedatabase.db'
+    # define the method to find the best fitting ideal functions
+    # if not overriden by command line option
+    compare_method = 'python'
+    # define the method to assign the test data to the found ideal
+    # functions if not overriden by command line option
+    assign_method = 'python'
+    # read the data files at once with the detected dtypes
+    # if not overriden by command line options
+    chunksize = None
+    dtype = None
+    # parse the data files every time if not overriden by command line option
+    cache = False
+    # read the ideal data into memory if not overriden by command line option
+    mmap = False
+    # write the datasets to database with DataFrame.to_sql
+    # if not overriden by command line option
+    write_mode = 'replace'
+    # number of worker processes of the parallel methods, the number
+    # of CPUs if not overriden by command line option
+    workers = None
+    # run every step one after another if not overriden by command line option
+    run_pipelined = False
+    # ask the user and show the menu at the end if not overriden by command line option
+    run_batch = False
+    # write no json file with the results if not overriden by command line option
+    output_file = None
+    # write everything to database if not overriden by command line option
+    use_database = True
+    # compare every train function every time if not overriden by command line option
+    use_result_cache = False
+    # store the data with the default dtypes if not overriden by command line option
+    compact = False
+    # measure no stages and count nothing if not overriden by command line options
+    profile_file = None
+    trace_file = None
+    # draw only the points that could be seen in the plots if not overriden by command line option
+    render_mode = 'decimated'
+    # export no plots to image files if not overriden by command line option
+    export_directory = None
     # check command line options for alternative database and data files
     try:
-        opts, args = getopt.getopt(argv, "ht:r:i:d:",
+        opts, args = getopt.getopt(argv, "ht:r:i:d:m:a:w:",
                                    ["testdata=", "traindata=", "idealdata=",
-                                    "database="])
+                                    "database=", "method=", "assignmethod=",
+                                    "chunksize=", "float32", "cache", "mmap", "dbmode=",
+                                    "workers=", "pipeline", "batch", "output=", "nodb",
+                                    "resultcache", "compact", "profile=", "trace=", "render=", "export="])
     except getopt.GetoptError:
-        print('main.py -t <testdatafile> -r <traindatafile> -i <idealdatafile> -d <databasefile>')
-        sys.exit(2)
+        print(USAGE)
+        sys.exit(EXIT_USAGE_ERROR)
     options_set = False
     for opt, arg in opts:
         if opt == '-h':
-            print('main.py -t <testdatafile> -r <traindatafile> -i <idealdatafile> -d <databasefile>')
+            print(USAGE)
             sys.exit()
         elif opt in ("-t", "--testdata"):
             test_data_file = arg
@@ -83,67 +203,213 @@ def main(argv):
         elif opt in ("-d", "--database"):
             database_file = arg
             options_set = True
-    print('\nUsage: main.py -t <testdatafile> -r <traindatafile> -i <idealdatafile> -d <databasefile>\n')
+        elif opt in ("-m", "--method"):
+            if arg not in datasets.COMPARE_METHODS:
+                print('Unknown compare method ' + arg + '. Please use one of: ' +
+                      ', '.join(datasets.COMPARE_METHODS))
+                sys.exit(EXIT_USAGE_ERROR)
+            compare_method = arg
+            options_set = True
+        elif opt in ("-a", "--assignmethod"):
+            if arg not in datasets.ASSIGN_METHODS:
+                print('Unknown assign method ' + arg + '. Please use one of: ' +
+                      ', '.join(datasets.ASSIGN_METHODS))
+                sys.exit(EXIT_USAGE_ERROR)
+            assign_method = arg
+            options_set = True
+        elif opt == "--chunksize":
+            try:
+                chunksize = int(arg)
+            except ValueError:
+                chunksize = 0
+            if chunksize < 1:
+                print('The chunksize must be a positive number of rows.')
+                sys.exit(EXIT_USAGE_ERROR)
+            options_set = True
+        elif opt == "--float32":
+            dtype = 'float32'
+            options_set = True
+        elif opt == "--cache":
+            cache = True
+            options_set = True
+        elif opt == "--mmap":
+            mmap = True
+            options_set = True
+        elif opt == "--dbmode":
+            if arg not in datasets.WRITE_MODES:
+                print('Unknown database write mode ' + arg + '. Please use one of: ' +
+                      ', '.join(datasets.WRITE_MODES))
+                sys.exit(EXIT_USAGE_ERROR)
+            write_mode = arg
+            options_set = True
+        elif opt in ("-w", "--workers"):
+            try:
+                workers = int(arg)
+            except ValueError:
+                workers = 0
+            if workers < 1:
+                print('The number of workers must be a positive number.')
+                sys.exit(EXIT_USAGE_ERROR)
+            options_set = True
+        elif opt == "--pipeline":
+            run_pipelined = True
+            options_set = True
+        elif opt == "--batch":
+            run_batch = True
+            options_set = True
+        elif opt == "--output":
+            output_file = arg
+            options_set = True
+        elif opt == "--nodb":
+            use_database = False
+            options_set = True
+        elif opt == "--resultcache":
+            use_result_cache = True
+            options_set = True
+        elif opt == "--compact":
+            compact = True
+            options_set = True
+        elif opt == "--profile":
+            profile_file = arg
+            options_set = True
+        elif opt == "--trace":
+            trace_file = arg
+            options_set = True
+        elif opt == "--render":
+            if arg not in datasets.RENDER_MODES:
+                print('Unknown render mode ' + arg + '. Please use one of: ' +
+                      ', '.join(datasets.RENDER_MODES))
+                sys.exit(EXIT_USAGE_ERROR)
+            render_mode = arg
+            options_set = True
+        elif opt == "--export":
+            export_directory = arg
+            options_set = True
+    print('\nUsage: ' + USAGE + '\n')
     if not options_set:
         print('No options set. Using preset options for data files:')
     print('Testdata File: ' + test_data_file)
     print('Traindata File: ' + train_data_file)
     print('Idealdata File: ' + ideal_data_file)
     print('SQLite Database File: ' + database_file)
-    input('\nPress Enter to start reading Data Files an initialize Database.')
+    print('Compare Method: ' + compare_method)
+    print('Assign Method: ' + assign_method)
+    print('Read Data Files in Chunks of: ' + ('all rows' if chunksize is None else str(chunksize) + ' rows'))
+    print('Data Type: ' + ('detected' if dtype is None else dtype))
+    print('Binary Cache of Data Files: ' + ('on' if cache else 'off'))
+    print('Memory-mapped Ideal Data: ' + ('on' if mmap else 'off'))
+    print('Database Write Mode: ' + write_mode)
+    print('Worker Processes: ' + ('number of CPUs' if workers is None else str(workers)))
+    print('Pipelined Execution: ' + ('on' if run_pipelined else 'off'))
+    print('Batch Mode: ' + ('on' if run_batch else 'off'))
+    print('Results File: ' + ('none' if output_file is None else output_file))
+    print('Write to Database: ' + ('on' if use_database else 'off'))
+    print('Cache of Match Results: ' + ('on' if use_result_cache else 'off'))
+    print('Compact Data Representation: ' + ('on' if compact else 'off'))
+    print('Profile File: ' + ('none' if profile_file is None else profile_file))
+    print('Trace File: ' + ('none' if trace_file is None else trace_file))
+    print('Render Mode of Plots: ' + render_mode)
+    print('Export Plots to: ' + ('none' if export_directory is None else export_directory))
+    if not run_batch:
+        input('\nPress Enter to start reading Data Files an initialize Database.')
 
+    # the stages and counters are only recorded if they are written to a file
+    if profile_file is not None or trace_file is not None:
+        instrumentation.enable()
     # initialize sqlite database
     db = None
-    try:
-        db = SQLiteDataBase(database_file)
-    except ArgumentError:
-        print('ERROR: Database could not be initialized. See error.log for more Details.')
-    # check if this worked out
-    if isinstance(db, SQLiteDataBase):
-        print('Database initialized successfully.')
-    else:
-        print('ERROR: Database could not be initialized. See error.log for more Details.')
-    # create datasets
-    try:
-        test_data_set = datasets.TestDataSet('TestData', test_data_file)
-    except (FileNotFoundError, InvalidDataFileError):
-        handle_exception(test_data_file + " could not been found or contains invalid data.")
-    try:
-        ideal_data_set = datasets.IdealDataSet('IdealData', ideal_data_file)
-    except (FileNotFoundError, InvalidDataFileError):
-        handle_exception(ideal_data_file + " could not been found or contains invalid data.")
-    try:
-        train_data_set = datasets.DataSet('TrainData', train_data_file)
-    except (FileNotFoundError, InvalidDataFileError):
-        handle_exception(train_data_file + " could not been found or contains invalid data.")
+    with instrumentation.stage('main.initialize_database'):
+        if use_database:
+            # sqlalchemy is only imported when the database is used
+            from sqlalchemy.exc import ArgumentError
+            try:
+                db = SQLiteDataBase(database_file)
+            except ArgumentError:
+                # already logged by SQLiteDataBase
+                print('ERROR: Database could not be initialized. See error.log for more Details.')
+            except get_database_errors():
+                # e.g. the database file could not be opened
+                now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+                exception_type, exception_value, exception_traceback = exc_info()
+                file_name, line_number, procedure_name, line_code \
+                    = traceback.extract_tb(exception_traceback)[-1]
+                # get Logging-Instance from Main Scope
+                logger = logging.getLogger('__main__')
+                logger.error("Exception Datetime: %s", now)
+                logger.error("Exception Type: %s", exception_type)
+                logger.error("Exception Value: %s", exception_value)
+                logger.error("File Name: %s", file_name)
+                logger.error("Line Number: %d", line_number)
+                logger.error("Procedure Name: %s", procedure_name)
+                logger.error("Line Code: %s", line_code)
+            # check if this worked out
+            if isinstance(db, SQLiteDataBase):
+                print('Database initialized successfully.')
+            else:
+                print('ERROR: Database could not be initialized. See error.log for more Details.')
+                if run_batch:
+                    sys.exit(EXIT_DATABASE_ERROR)
+    # create datasets. when running pipelined, all data files
+    # are loaded at the same time in background threads
+    loaders = [functools.partial(datasets.TestDataSet, 'TestData', test_data_file, chunksize=chunksize,
+                                 dtype=dtype, cache=cache, compact=compact),
+               functools.partial(datasets.IdealDataSet, 'IdealData', ideal_data_file, chunksize=chunksize,
+                                 dtype=dtype, cache=cache, mmap=mmap, compact=compact),
+               functools.partial(datasets.DataSet, 'TrainData', train_data_file, chunksize=chunksize,
+                                 dtype=dtype, cache=cache, compact=compact)]
+    with instrumentation.stage('main.load_data_files'):
+        if run_pipelined:
+            loaders = [future.result for future in pipeline.load_concurrently(loaders)]
+        loaded_data_sets = []
+        for loader, data_file in zip(loaders, [test_data_file, ideal_data_file, train_data_file]):
+            data_set = None
+            try:
+                data_set = loader()
+            except (FileNotFoundError, InvalidDataFileError):
+                handle_exception(data_file + " could not been found or contains invalid data.",
+                                 batch=run_batch, exit_code=EXIT_DATA_FILE_ERROR)
+            loaded_data_sets.append(data_set)
+        test_data_set, ideal_data_set, train_data_set = loaded_data_sets
+    # when running pipelined, the datasets are written to database by a
+    # background thread while the calculation goes on. the results are
+    # printed when all datasets are written
+    database_writer = pipeline.DatabaseWriter(db) if run_pipelined and use_database else None
+    pending_writes = []
     # write ideal dataset to database
-    ideal_db_success = ideal_data_set.write_to_database(db.engine)
-    if ideal_db_success:
-        print("Ideal Data stored in Database.")
-    else:
-        print("ERROR: Ideal Data NOT stored in Database. See error.log for more details.")
-    # write train dataset to database
-    train_db_success = train_data_set.write_to_database(db.engine)
-    if train_db_success:
-        print("Train Data stored in Database.")
-    else:
-        print("ERROR: Train Data NOT stored in Database. See error.log for more details.")
+    with instrumentation.stage('main.write_to_database'):
+        if database_writer is not None:
+            pending_writes.append((database_writer.write(ideal_data_set, mode=write_mode), "Ideal Data"))
+        elif use_database:
+            print_database_write_result(ideal_data_set.write_to_database(db, mode=write_mode), "Ideal Data",
+                                        batch=run_batch)
+        # write train dataset to database
+        if database_writer is not None:
+            pending_writes.append((database_writer.write(train_data_set, mode=write_mode), "Train Data"))
+        elif use_database:
+            print_database_write_result(train_data_set.write_to_database(db, mode=write_mode), "Train Data",
+                                        batch=run_batch)
     train_dataframe = train_data_set.get_dataframe()
+    # the match results are stored in the database, so that they are
+    # reused by the next run with the same train and ideal data
+    result_cache = None
+    if use_result_cache:
+        result_cache = resultcache.MatchResultCache(db if isinstance(db, SQLiteDataBase) else None)
     # now find the best fitting ideal data functions for
     # every function in the train data set
-    train_data_columns = list(train_dataframe.columns.values)
     print('Starting to calculate the best fitting ideal data function for every function in the train data set...')
-    for c in train_data_columns:
-        if c != 'x':
-            print('Train data checking function: ' + c)
-            y_column = train_dataframe[c].tolist()
-            try:
-                result = ideal_data_set.compare_function(y_column)
-            except InvalidFunctionDataError:
-                print('ERROR:')
-                print('Invalid Function Data was submitted to compare_function. This should not happen!')
-                print('With invalid Data, no best fitting ideal function can be found!')
-            else:
+    with instrumentation.stage('main.find_ideal_functions'):
+        try:
+            results = ideal_data_set.compare_functions(train_dataframe, method=compare_method, workers=workers,
+                                                       result_cache=result_cache)
+        except (InvalidFunctionDataError, InvalidDataFrameError):
+            print('ERROR:')
+            print('Invalid Function Data was submitted to compare_functions. This should not happen!')
+            print('With invalid Data, no best fitting ideal function can be found!')
+            if run_batch:
+                sys.exit(EXIT_MATCHING_ERROR)
+        else:
+            for c, result in results.items():
+                print('Train data checked function: ' + c)
                 ideal_function_found = result['ideal_function_found']
                 max_distance = result['max_distance']
                 print('Best fitting ideal function for train data function ' + c + ' is ' + ideal_function_found)
@@ -151,25 +417,77 @@ def main(argv):
                 ideal_functions_found.append({"TrainFunction": c,
                                               "IdealFunction": ideal_function_found,
                                               "MaxDistance": max_distance})
+        finally:
+            # the worker processes of the method 'parallel' are not needed anymore
+            ideal_data_set.close()
     # now check every coordinate in the Test Data and assign it
     # to a found ideal function if the test data coordinate is not
     # more far away than sqrt(2) * max_distance of the point most far
     # away from the train data
     print('Start checking every coordinate in the Test Data against the found ideal functions.')
-    for ideal_function in ideal_functions_found:
-        name_of_ideal_function = ideal_function['IdealFunction']
-        max_distance = ideal_function['MaxDistance']
-        print('\nComparing every coordinate in Test Data against Ideal Function ' + name_of_ideal_function)
-        print('with the Maximum Distance from the Train Data of', max_distance)
-        print('which will result in the criteria of', max_distance, '* sqrt(2) =', max_distance*math.sqrt(2))
-        print('Every point which is not more far away from the ideal function will be assigned to it.')
-        test_data_set.check_coordinates_against_function(ideal_data_set.get_ideal_function_by_name(
-            name_of_ideal_function), name_of_ideal_function, max_distance)
-    test_db_success = test_data_set.write_to_database(db.engine)
-    if test_db_success:
-        print("\nTest Data stored in Database.")
-    else:
-        print("\nERROR: Test Data NOT stored in Database. See error.log for more details.")
+    with instrumentation.stage('main.assign_test_data'):
+        functions_to_check = []
+        for ideal_function in ideal_functions_found:
+            name_of_ideal_function = ideal_function['IdealFunction']
+            max_distance = ideal_function['MaxDistance']
+            print('\nComparing every coordinate in Test Data against Ideal Function ' + name_of_ideal_function)
+            print('with the Maximum Distance from the Train Data of', max_distance)
+            print('which will result in the criteria of', max_distance, '* sqrt(2) =', max_distance*math.sqrt(2))
+            print('Every point which is not more far away from the ideal function will be assigned to it.')
+            functions_to_check.append((ideal_data_set.get_ideal_function_by_name(name_of_ideal_function),
+                                       name_of_ideal_function, max_distance))
+        test_data_set.check_coordinates_against_functions(functions_to_check, method=assign_method,
+                                                          workers=workers)
+    print('')
+    with instrumentation.stage('main.write_to_database'):
+        if database_writer is not None:
+            pending_writes.append((database_writer.write(test_data_set, mode=write_mode), "Test Data"))
+            # wait until everything is written to database
+            database_writer.close()
+            for future, name in pending_writes:
+                print_database_write_result(future.result(), name, batch=run_batch)
+        elif use_database:
+            print_database_write_result(test_data_set.write_to_database(db, mode=write_mode), "Test Data",
+                                        batch=run_batch)
+        # in batch mode the best fitting ideal functions are stored in
+        # database as well, because nobody looks at the output
+        if run_batch and use_database:
+            print_database_write_result(run_results.write_matches_to_database(db, ideal_functions_found,
+                                                                              mode=write_mode),
+                                        "Found Ideal Functions", batch=run_batch)
+    # close all connections to the database, it is not used anymore
+    if isinstance(db, SQLiteDataBase):
+        db.close()
+    # write the results to a json file
+    with instrumentation.stage('main.write_results_file'):
+        if output_file is not None:
+            if run_results.write_results_file(output_file, run_results.get_results(ideal_functions_found,
+                                                                                   test_data_set.get_dataframe())):
+                print('Results written to ' + output_file + '.')
+            else:
+                print('ERROR: Results NOT written to ' + output_file + '. See error.log for more details.')
+                if run_batch:
+                    sys.exit(EXIT_OUTPUT_ERROR)
+    # render all plots to image files without showing them
+    if export_directory is not None:
+        with instrumentation.stage('main.export_plots'):
+            if not export_all_plots(ideal_data_set, train_data_set, test_data_set, ideal_functions_found,
+                                    export_directory, workers, render_mode) and run_batch:
+                sys.exit(EXIT_OUTPUT_ERROR)
+    # write the time of every stage and the counters to json files
+    for filename, chrome_trace in [(profile_file, False), (trace_file, True)]:
+        if filename is None:
+            continue
+        if instrumentation.write_report(filename, chrome_trace=chrome_trace):
+            print(('Trace' if chrome_trace else 'Profile') + ' written to ' + filename + '.')
+        else:
+            print('ERROR: ' + ('Trace' if chrome_trace else 'Profile') + ' NOT written to ' + filename +
+                  '. See error.log for more details.')
+            if run_batch:
+                sys.exit(EXIT_OUTPUT_ERROR)
+    # in batch mode the program ends when everything is written
+    if run_batch:
+        sys.exit(EXIT_SUCCESS)
     # everything is calculated and written to database
     # show the command line menu
     user_input = ''
@@ -179,8 +497,9 @@ def main(argv):
         print('[2] - Visualize the found ideal functions in comparison to the train function')
         print('[3] - Visualize assigned and not assigned test data')
         print('[4] - Visualize all ideal functions')
+        print('[5] - Export all plots to image files')
         print('[Q] - Quit')
-        user_input = input('Please enter [1-4] or Q to Quit: ')
+        user_input = input('Please enter [1-5] or Q to Quit: ')
         if user_input == '1':
             print('\n')
             while user_input.upper() != 'B':
@@ -193,7 +512,7 @@ def main(argv):
                 n = 1
                 for ideal_function in ideal_functions_found:
                     if str(n) == user_input:
-                        ideal_data_set.visualize_function(ideal_function['IdealFunction'])
+                        ideal_data_set.visualize_function(ideal_function['IdealFunction'], mode=render_mode)
                     n += 1
         elif user_input == '2':
             print('\n')
@@ -208,9 +527,10 @@ def main(argv):
                 n = 1
                 for ideal_function in ideal_functions_found:
                     if str(n) == user_input:
-                        y_values = train_data_set.get_dataframe()[ideal_function['TrainFunction']].tolist()
+                        y_values = train_data_set.get_dataframe()[ideal_function['TrainFunction']]
                         ideal_data_set.visualize_comparing_functions(ideal_function['IdealFunction'], y_values,
-                                                                     ideal_function['TrainFunction'])
+                                                                     ideal_function['TrainFunction'],
+                                                                     mode=render_mode)
                     n += 1
         elif user_input == '3':
             print('\n')
@@ -228,10 +548,11 @@ def main(argv):
                     if str(n) == user_input:
                         ideal_function_df = ideal_data_set.get_ideal_function_by_name(ideal_function['IdealFunction'])
                         test_data_set.visualize_test_data_with_ideal_function(ideal_function_df,
-                                                                              ideal_function['IdealFunction'])
+                                                                              ideal_function['IdealFunction'],
+                                                                              mode=render_mode)
                     n += 1
                 if user_input.upper() == 'N':
-                    test_data_set.visualize_test_data_without_assignment()
+                    test_data_set.visualize_test_data_without_assignment(mode=render_mode)
         elif user_input == '4':
             print('\n')
             while user_input.upper() != 'B':
@@ -246,12 +567,17 @@ def main(argv):
                         input_value = int(user_input)
                         if (input_value <= number_of_ideal_functions) & (input_value > 0):
                             ideal_function_name = 'y' + str(input_value)
-                            ideal_data_set.visualize_function(ideal_function_name)
+                            ideal_data_set.visualize_function(ideal_function_name, mode=render_mode)
                         else:
                             print('Invalid Input. Please enter a number between 1 and ' +
                                   str(number_of_ideal_functions))
                     except ValueError:
                         print('Invalid Input. Please enter a number between 1 and ' + str(number_of_ideal_functions))
+        elif user_input == '5':
+            print('\n')
+            directory = input('Please enter the directory for the image files [plots]: ') or 'plots'
+            export_all_plots(ideal_data_set, train_data_set, test_data_set, ideal_functions_found, directory,
+                             workers, render_mode)
 
         elif user_input.upper() == 'Q':
             sys.exit(0)
@@ -0,0 +1,411 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import instrumentation
+import pipeline
+
+
+# the candidate functions are compared in blocks so that the temporary
+# matrices of the deviations never grow beyond this number of bytes.
+# with 400k x-samples this still allows about 20 candidates per block.
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def get_chunk_size(number_of_samples, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    calculates how many candidate functions fit into one block
+    :param number_of_samples: number of x-samples of every candidate function
+    :param chunk_bytes: the maximum size of one block in bytes
+    :return: the number of candidate functions per block (at least 1)
+    """
+    return max(1, int(chunk_bytes // (max(1, number_of_samples) * 8)))
+
+
+def candidate_errors(candidates, y_values):
+    """
+    calculates the sum of squared distances and the maximum distance of every
+    candidate function to the function in y_values in one matrix operation.
+    the distance is calculated like in DataSet.compare_function as the
+    y-value of the candidate minus the y-value of y_values and the maximum
+    distance is never smaller than 0
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param y_values: 1-dimensional array with the y-values to compare against
+    :return: tuple of two arrays with the sum of squared distances and the
+             maximum distance of every candidate
+    """
+    candidates = np.ascontiguousarray(candidates, dtype=np.float64)
+    deviations = candidates - y_values
+    if deviations.shape[1] == 0:
+        max_distances = np.zeros(deviations.shape[0])
+    else:
+        max_distances = np.maximum(deviations.max(axis=1), 0.0)
+    # every row is summed on its own, so the sum of a candidate is exactly the
+    # same no matter which and how many other candidates are in the block.
+    # einsum does not guarantee this for a block with a single row
+    np.square(deviations, out=deviations)
+    sums_of_squared_distances = deviations.sum(axis=1)
+    return sums_of_squared_distances, max_distances
+
+
+def find_best_fit(candidates, y_values, chunk_size=None):
+    """
+    finds the candidate function with the least sum of squared distances
+    to the function in y_values. the candidates are processed in blocks of
+    chunk_size rows to bound the memory. if two candidates have the same sum
+    of squared distances, the first one wins like in DataSet.compare_function
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param y_values: 1-dimensional array with the y-values to compare against
+    :param chunk_size: number of candidates per block, calculated from
+                       DEFAULT_CHUNK_BYTES if None
+    :return: tuple with the row index of the best candidate (None if there is
+             no candidate), its sum of squared distances and its maximum distance
+    """
+    y_values = np.asarray(y_values, dtype=np.float64)
+    number_of_candidates = candidates.shape[0]
+    if chunk_size is None:
+        chunk_size = get_chunk_size(candidates.shape[1])
+    best_index = None
+    least_squared_distance = None
+    max_distance = 0.0
+    for start in range(0, number_of_candidates, chunk_size):
+        sums, max_distances = candidate_errors(candidates[start:start + chunk_size], y_values)
+        instrumentation.count(instrumentation.CANDIDATES_SCORED, len(sums))
+        i = int(np.argmin(sums))
+        # only a strictly smaller sum replaces the best candidate of an earlier
+        # block, so the first candidate wins on equal sums
+        if least_squared_distance is None or sums[i] < least_squared_distance:
+            best_index = start + i
+            least_squared_distance = float(sums[i])
+            max_distance = float(max_distances[i])
+    return best_index, least_squared_distance, max_distance
+
+
+# relative tolerance of the sums of squared distances calculated with
+# ||a-b||^2 = ||a||^2 - 2a.b + ||b||^2. candidates within this tolerance
+# of the best one are checked again with the exact calculation
+GRAM_TOLERANCE = 1e-8
+
+
+def find_best_fits(candidates, queries, chunk_size=None):
+    """
+    finds the best fitting candidate function for every function in queries
+    at once. the sums of squared distances of all queries to all candidates
+    of a block are calculated with a single matrix product by using
+    ||a-b||^2 = ||a||^2 - 2a.b + ||b||^2. because this formula is not exact,
+    the candidates that are within GRAM_TOLERANCE of the best one are checked
+    again with candidate_errors, so the result is the same as calling
+    find_best_fit for every query
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param queries: 2-dimensional array with one function to compare per row
+    :param chunk_size: number of candidates per block, calculated from
+                       DEFAULT_CHUNK_BYTES if None
+    :return: list with a tuple of the row index of the best candidate, its sum
+             of squared distances and its maximum distance for every query
+    """
+    queries = np.ascontiguousarray(queries, dtype=np.float64)
+    number_of_candidates = candidates.shape[0]
+    if number_of_candidates == 0:
+        return [(None, None, 0.0) for _ in range(queries.shape[0])]
+    if chunk_size is None:
+        chunk_size = get_chunk_size(candidates.shape[1])
+    query_norms = np.einsum('ij,ij->i', queries, queries)
+    approximated_sums = np.empty((queries.shape[0], number_of_candidates))
+    candidate_norms = np.empty(number_of_candidates)
+    for start in range(0, number_of_candidates, chunk_size):
+        block = np.ascontiguousarray(candidates[start:start + chunk_size], dtype=np.float64)
+        end = start + block.shape[0]
+        candidate_norms[start:end] = np.einsum('ij,ij->i', block, block)
+        approximated_sums[:, start:end] = queries @ block.T
+    instrumentation.count(instrumentation.CANDIDATES_SCORED, number_of_candidates * queries.shape[0])
+    approximated_sums *= -2.0
+    approximated_sums += query_norms[:, np.newaxis]
+    approximated_sums += candidate_norms
+    tolerances = GRAM_TOLERANCE * (query_norms[:, np.newaxis] + candidate_norms)
+    results = []
+    for q in range(queries.shape[0]):
+        upper_bound = np.min(approximated_sums[q] + tolerances[q])
+        # candidates that could be the best one after the exact calculation
+        indices = np.flatnonzero(approximated_sums[q] - tolerances[q] <= upper_bound)
+        sums, max_distances = candidate_errors(candidates[indices], queries[q])
+        i = int(np.argmin(sums))
+        results.append((int(indices[i]), float(sums[i]), float(max_distances[i])))
+    return results
+
+
+# relative tolerance of the partial sums and lower bounds in find_best_fit_pruned.
+# a candidate is only abandoned if it is worse than the best one by more than this
+PRUNE_TOLERANCE = 1e-8
+# factor of the rounding allowance of the lower bounds (see get_rounding_allowances)
+ROUNDING_ALLOWANCE_FACTOR = 8.0
+# number of x-samples after which find_best_fit_pruned checks the partial sums again
+DEFAULT_SEGMENT_SIZE = 4096
+
+
+def candidate_statistics(candidates, chunk_size=None):
+    """
+    calculates the mean and the euclidean norm of every candidate function,
+    which are needed for the lower bounds of get_lower_bounds
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param chunk_size: number of candidates per block, calculated from
+                       DEFAULT_CHUNK_BYTES if None
+    :return: tuple of two arrays with the mean and the norm of every candidate
+    """
+    number_of_candidates = candidates.shape[0]
+    if chunk_size is None:
+        chunk_size = get_chunk_size(candidates.shape[1])
+    means = np.zeros(number_of_candidates)
+    norms = np.zeros(number_of_candidates)
+    for start in range(0, number_of_candidates, chunk_size):
+        block = np.asarray(candidates[start:start + chunk_size], dtype=np.float64)
+        if block.shape[1]:
+            means[start:start + block.shape[0]] = block.mean(axis=1)
+        norms[start:start + block.shape[0]] = np.sqrt(np.einsum('ij,ij->i', block, block))
+    return means, norms
+
+
+def get_rounding_allowances(norms, y_norm, number_of_samples):
+    """
+    calculates for every candidate how much the rounding errors of the means
+    and norms could make a lower bound greater than the exact one. the means
+    and norms are sums of n x-samples, whose rounding errors grow with n and
+    with the size of the values, so that a small difference of two large
+    values is lost when the values are far away from 0. PRUNE_TOLERANCE is
+    relative to the sum of squared distances and could not absorb this
+    :param norms: array with the norm of every candidate (see candidate_statistics)
+    :param y_norm: the norm of the y-values to compare against
+    :param number_of_samples: the number of x-samples n
+    :return: array with the allowance of every candidate, which is
+             ROUNDING_ALLOWANCE_FACTOR * eps * n * (norm of candidate + y_norm)^2
+    """
+    return ROUNDING_ALLOWANCE_FACTOR * np.finfo(np.float64).eps * number_of_samples * (norms + y_norm) ** 2
+
+
+def get_lower_bounds(means, norms, y_values):
+    """
+    calculates for every candidate a value that is never greater than its sum of
+    squared distances to y_values. with n x-samples the sum of squared distances
+    is at least n * (mean of candidate - mean of y_values)^2 and at least
+    (norm of candidate - norm of y_values)^2, so the greater one is used. the
+    allowance of get_rounding_allowances is subtracted from it, so that the
+    bound also holds with the rounding errors of the means and norms
+    :param means: array with the mean of every candidate (see candidate_statistics)
+    :param norms: array with the norm of every candidate (see candidate_statistics)
+    :param y_values: 1-dimensional array with the y-values to compare against
+    :return: array with the lower bound of every candidate
+    """
+    y_values = np.asarray(y_values, dtype=np.float64)
+    if len(y_values) == 0:
+        return np.zeros(len(means))
+    y_norm = np.sqrt(np.dot(y_values, y_values))
+    mean_bounds = len(y_values) * (means - y_values.mean()) ** 2
+    norm_bounds = (norms - y_norm) ** 2
+    allowances = get_rounding_allowances(norms, y_norm, len(y_values))
+    return np.maximum(np.maximum(mean_bounds, norm_bounds) - allowances, 0.0)
+
+
+def find_best_fit_pruned(candidates, y_values, chunk_size=None, segment_size=DEFAULT_SEGMENT_SIZE,
+                         lower_bounds=None):
+    """
+    does the same as find_best_fit, but abandons a candidate as soon as the
+    sum of squared distances of its first x-samples is already greater than
+    the sum of the best candidate so far. the candidates of a block are
+    processed segment by segment of segment_size x-samples, so only the
+    candidates that are still possible are read further. with lower_bounds the
+    candidates are processed in the order of their lower bound, so that a good
+    candidate is found early, and candidates whose bound is greater than the
+    best sum are not read at all. the candidates that are not abandoned are
+    checked again with candidate_errors, so the result is the same as the
+    result of find_best_fit as long as lower_bounds are lower bounds, which
+    includes the rounding errors of their calculation (see get_rounding_allowances)
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param y_values: 1-dimensional array with the y-values to compare against
+    :param chunk_size: number of candidates per block, calculated from
+                       DEFAULT_CHUNK_BYTES if None
+    :param segment_size: number of x-samples after which the partial sums are checked
+    :param lower_bounds: array with a lower bound of the sum of squared distances
+                         of every candidate (see get_lower_bounds) or None
+    :return: tuple with the row index of the best candidate (None if there is
+             no candidate), its sum of squared distances and its maximum distance
+    """
+    y_values = np.asarray(y_values, dtype=np.float64)
+    number_of_candidates, number_of_samples = candidates.shape
+    if chunk_size is None:
+        chunk_size = get_chunk_size(number_of_samples)
+    if lower_bounds is None:
+        order = np.arange(number_of_candidates)
+    else:
+        order = np.argsort(lower_bounds, kind='stable')
+    best_index = None
+    least_squared_distance = None
+    max_distance = 0.0
+    start = 0
+    while start < number_of_candidates:
+        # the first candidate is compared alone, so that its sum could
+        # already abandon the candidates of the first block
+        end = start + (1 if start == 0 else chunk_size)
+        indices = order[start:end]
+        start = end
+        threshold = None
+        if least_squared_distance is not None:
+            threshold = least_squared_distance * (1.0 + PRUNE_TOLERANCE)
+            if lower_bounds is not None:
+                indices = indices[lower_bounds[indices] <= threshold]
+                # the candidates are sorted by their lower bound,
+                # so no later candidate could be better
+                if len(indices) == 0:
+                    break
+        instrumentation.count(instrumentation.CANDIDATES_SCORED, len(indices))
+        partial_sums = np.zeros(len(indices))
+        active = np.arange(len(indices))
+        for segment_start in range(0, number_of_samples, segment_size):
+            if threshold is not None:
+                active = active[partial_sums[active] <= threshold]
+                if len(active) == 0:
+                    break
+            segment_end = segment_start + segment_size
+            deviations = np.asarray(candidates[indices[active], segment_start:segment_end], dtype=np.float64) \
+                - y_values[segment_start:segment_end]
+            partial_sums[active] += np.einsum('ij,ij->i', deviations, deviations)
+        if threshold is not None:
+            active = active[partial_sums[active] <= threshold]
+        if len(active) == 0:
+            continue
+        # the exact sums of the remaining candidates decide, on equal sums the first candidate wins
+        survivors = indices[active]
+        sums, max_distances = candidate_errors(candidates[survivors], y_values)
+        i = int(np.lexsort((survivors, sums))[0])
+        if least_squared_distance is None or sums[i] < least_squared_distance or \
+                (sums[i] == least_squared_distance and survivors[i] < best_index):
+            best_index = int(survivors[i])
+            least_squared_distance = float(sums[i])
+            max_distance = float(max_distances[i])
+    return best_index, least_squared_distance, max_distance
+
+
+# the shared memory with the candidates, attached once in every worker process
+_worker_shared_memory = None
+_worker_candidates = None
+
+
+def _attach_candidates(shared_memory_name, shape):
+    """
+    initializer of the worker processes of ParallelMatcher, which attaches
+    the shared memory with the candidates without copying them
+    :param shared_memory_name: the name of the shared memory
+    :param shape: the shape of the candidates array
+    :return: None
+    """
+    global _worker_shared_memory, _worker_candidates
+    _worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    _worker_candidates = np.ndarray(shape, dtype=np.float64, buffer=_worker_shared_memory.buf)
+
+
+def _find_best_fits_in_shard(start, end, queries, chunk_size):
+    """
+    finds the best fitting candidate of the shard from start to end for every query
+    in a worker process of ParallelMatcher
+    :param start: the first candidate of the shard
+    :param end: the candidate after the last candidate of the shard
+    :param queries: 2-dimensional array with one function to compare per row
+    :param chunk_size: number of candidates per block
+    :return: list with a tuple of the row index of the best candidate, its sum
+             of squared distances and its maximum distance for every query
+    """
+    results = find_best_fits(_worker_candidates[start:end], queries, chunk_size)
+    return [(start + best_index, least_squared_distance, max_distance)
+            for best_index, least_squared_distance, max_distance in results]
+
+
+class ParallelMatcher:
+    """
+    Finds the best fitting candidates with a pool of worker processes.
+    The candidates are copied once into shared memory, which every worker
+    attaches when it is started. Every worker searches a shard of the
+    candidates and the best candidates of the shards are reduced to the
+    best candidate of all. On equal sums of squared distances the first
+    candidate wins, so the results are the same as with find_best_fits.
+    """
+
+    def __init__(self, candidates, workers=None):
+        """
+        copies the candidates into shared memory and starts the worker processes
+        :param candidates: 2-dimensional array with one candidate function per row
+        :param workers: number of worker processes, the number of CPUs if None
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.shape = candidates.shape
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=max(1, candidates.size * 8))
+        try:
+            shared_candidates = np.ndarray(self.shape, dtype=np.float64, buffer=self.shared_memory.buf)
+            shared_candidates[:] = candidates
+            del shared_candidates
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=pipeline.get_process_context(),
+                                                initializer=_attach_candidates,
+                                                initargs=(self.shared_memory.name, self.shape))
+
+        except BaseException:
+            self.shared_memory.close()
+            self.shared_memory.unlink()
+            raise
+
+    def __enter__(self):
+        """
+        makes the matcher usable in a with-statement, which closes it at the end
+        :return: the matcher
+        """
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        """
+        closes the matcher at the end of a with-statement
+        :return: None
+        """
+        self.close()
+
+    def find_best_fits(self, queries, chunk_size=None):
+        """
+        does the same as find_best_fits, but every worker process
+        searches another shard of the candidates
+        :param queries: 2-dimensional array with one function to compare per row
+        :param chunk_size: number of candidates per block, calculated from
+                           DEFAULT_CHUNK_BYTES if None
+        :return: list with a tuple of the row index of the best candidate, its sum
+                 of squared distances and its maximum distance for every query
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float64)
+        number_of_candidates = self.shape[0]
+        if number_of_candidates == 0:
+            return [(None, None, 0.0) for _ in range(queries.shape[0])]
+        bounds = np.linspace(0, number_of_candidates, min(self.workers, number_of_candidates) + 1).astype(int)
+        futures = [self.executor.submit(_find_best_fits_in_shard, int(start), int(end), queries, chunk_size)
+                   for start, end in zip(bounds[:-1], bounds[1:])]
+        shard_results = [future.result() for future in futures]
+        # the counters of the worker processes are not collected, so the work is counted here
+        instrumentation.count(instrumentation.CANDIDATES_SCORED, number_of_candidates * queries.shape[0])
+        results = []
+        for q in range(queries.shape[0]):
+            # the smallest sum wins and on equal sums the smallest index
+            results.append(min((shard[q] for shard in shard_results), key=lambda r: (r[1], r[0])))
+        return results
+
+    def find_best_fit(self, y_values, chunk_size=None):
+        """
+        does the same as find_best_fit, but every worker process
+        searches another shard of the candidates
+        :param y_values: 1-dimensional array with the y-values to compare against
+        :param chunk_size: number of candidates per block, calculated from
+                           DEFAULT_CHUNK_BYTES if None
+        :return: tuple with the row index of the best candidate (None if there is
+                 no candidate), its sum of squared distances and its maximum distance
+        """
+        return self.find_best_fits(np.asarray(y_values, dtype=np.float64)[np.newaxis, :], chunk_size)[0]
+
+    def close(self):
+        """
+        stops the worker processes and frees the shared memory
+        :return: None
+        """
+        self.executor.shutdown()
+        self.shared_memory.close()
+        self.shared_memory.unlink()
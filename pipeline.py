@@ -0,0 +1,83 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+
+def get_process_context():
+    """
+    returns the context the process pools of the parallel methods are started
+    with. forking a process while another thread, e.g. the DatabaseWriter,
+    holds a lock of sqlite, logging or malloc could leave the lock held forever
+    in the forked process. so the worker processes are started by a fresh
+    forkserver process or, where there is none, spawned as new interpreters
+    :return: the multiprocessing context
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # the forkserver imports the modules of the workers with numpy and pandas
+        # once, so every worker process forked from it starts without importing them
+        context.set_forkserver_preload(['matching', 'spatial', 'export'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def load_concurrently(loaders):
+    """
+    starts loading all data files at the same time, every one in another
+    thread. reading and parsing the files mostly happens in pandas and numpy
+    without holding the global interpreter lock, so the files are loaded
+    in about the time of the largest one
+    :param loaders: list of functions without parameters, which load a data file each
+    :return: list of futures with the result of every loader in the same order
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, len(loaders)), thread_name_prefix='DataFileLoader')
+    futures = [executor.submit(loader) for loader in loaders]
+    # the threads finish when all files are loaded, nobody has to wait for them here
+    executor.shutdown(wait=False)
+    return futures
+
+
+class DatabaseWriter:
+    """
+    Writes datasets to the database in the background while the program
+    goes on. SQLite allows only one writer at a time, so all datasets are
+    written one after another by a single thread in the order in which they
+    were submitted.
+    """
+
+    def __init__(self, engine):
+        """
+        starts the writer thread
+        :param engine: the database the datasets are written to
+        """
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='DatabaseWriter')
+
+    def __enter__(self):
+        """
+        makes the writer usable in a with-statement, which waits for all writes at the end
+        :return: the writer
+        """
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        """
+        waits for all writes at the end of a with-statement
+        :return: None
+        """
+        self.close()
+
+    def write(self, data_set, mode='replace'):
+        """
+        submits a dataset to be written to the database
+        :param data_set: the dataset, which must not be changed until it is written
+        :param mode: the write mode of DataSet.write_to_database
+        :return: future with the result of DataSet.write_to_database
+        """
+        return self.executor.submit(data_set.write_to_database, self.engine, mode=mode)
+
+    def close(self):
+        """
+        waits until all submitted datasets are written and stops the writer thread
+        :return: None
+        """
+        self.executor.shutdown(wait=True)
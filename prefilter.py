@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import traceback
+from datetime import datetime
+from sys import exc_info
+import numpy as np
+import datastore
+import matching
+
+
+# version of the layout of the index files. indexes with another version are rebuilt
+PREFILTER_VERSION = 1
+# number of segments of the piecewise aggregate approximation of every function
+DEFAULT_NUMBER_OF_SEGMENTS = 64
+
+
+class PrefilterIndex:
+    """
+    Summaries of the candidate functions that give a lower bound of the sum
+    of squared distances of every candidate to a function without reading
+    the candidates. The x-samples are split into segments and the mean of
+    every candidate in every segment is stored (piecewise aggregate
+    approximation) together with the norm of every candidate.
+    """
+
+    def __init__(self, segment_starts, segment_means, norms):
+        """
+        creates the index from the summaries of the candidates
+        :param segment_starts: array with the first x-sample of every segment
+        :param segment_means: 2-dimensional array with the mean of every
+                              candidate (rows) in every segment (columns)
+        :param norms: array with the euclidean norm of every candidate
+        """
+        self.segment_starts = np.asarray(segment_starts, dtype=np.int64)
+        self.segment_means = np.asarray(segment_means, dtype=np.float64)
+        self.norms = np.asarray(norms, dtype=np.float64)
+
+    def get_lower_bounds(self, y_values):
+        """
+        calculates for every candidate a value that is never greater than its
+        sum of squared distances to y_values. within a segment of length L the
+        sum of squared distances is at least L * (difference of the means)^2,
+        so the sum over all segments is a lower bound. the difference of the
+        norms squared is another one, the greater one is used. the allowance
+        of matching.get_rounding_allowances is subtracted from it, so that the
+        bound also holds with the rounding errors of the summaries
+        :param y_values: 1-dimensional array with the y-values to compare against
+        :return: array with the lower bound of every candidate
+        """
+        y_values = np.asarray(y_values, dtype=np.float64)
+        if len(y_values) == 0 or len(self.segment_starts) == 0:
+            return np.zeros(len(self.norms))
+        segment_lengths = np.diff(np.append(self.segment_starts, len(y_values)))
+        y_segment_means = np.add.reduceat(y_values, self.segment_starts) / segment_lengths
+        y_norm = np.sqrt(np.dot(y_values, y_values))
+        segment_bounds = ((self.segment_means - y_segment_means) ** 2) @ segment_lengths
+        norm_bounds = (self.norms - y_norm) ** 2
+        allowances = matching.get_rounding_allowances(self.norms, y_norm, len(y_values))
+        return np.maximum(np.maximum(segment_bounds, norm_bounds) - allowances, 0.0)
+
+
+def build_prefilter_index(candidates, number_of_segments=DEFAULT_NUMBER_OF_SEGMENTS, chunk_size=None):
+    """
+    calculates the summaries of the candidates in blocks of chunk_size candidates
+    :param candidates: 2-dimensional array with one candidate function per row
+    :param number_of_segments: number of segments of the x-samples, at most one per x-sample
+    :param chunk_size: number of candidates per block, calculated from
+                       matching.DEFAULT_CHUNK_BYTES if None
+    :return: the PrefilterIndex
+    """
+    number_of_candidates, number_of_samples = candidates.shape
+    if chunk_size is None:
+        chunk_size = matching.get_chunk_size(number_of_samples)
+    segment_starts = np.unique(np.linspace(0, number_of_samples, min(number_of_segments, number_of_samples) + 1)
+                               .astype(np.int64)[:-1])
+    segment_lengths = np.diff(np.append(segment_starts, number_of_samples))
+    segment_means = np.zeros((number_of_candidates, len(segment_starts)))
+    norms = np.zeros(number_of_candidates)
+    for start in range(0, number_of_candidates, chunk_size):
+        block = np.asarray(candidates[start:start + chunk_size], dtype=np.float64)
+        end = start + block.shape[0]
+        if len(segment_starts):
+            segment_means[start:end] = np.add.reduceat(block, segment_starts, axis=1) / segment_lengths
+        norms[start:end] = np.sqrt(np.einsum('ij,ij->i', block, block))
+    return PrefilterIndex(segment_starts, segment_means, norms)
+
+
+def get_prefilter_filenames(filename):
+    """
+    returns the names of the files of the prefilter index of a data file. the
+    summaries are stored in a .npz-file and the fingerprint of the data file
+    in a .json-file, like the binary cache of the datastore
+    :param filename: the filename of the data file
+    :return: tuple with the name of the .npz-file and the name of the .json-file
+    """
+    return filename + '.prefilter.npz', filename + '.prefilter.json'
+
+
+def read_prefilter_index(filename, columns, dtype=None, usecols=None):
+    """
+    loads the prefilter index of a data file if it was built from the actual
+    data file with the same options and for the same columns
+    :param filename: the filename of the data file
+    :param columns: list with the names of the candidate functions of the index
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :return: the PrefilterIndex or None if there is no valid index
+    """
+    data_filename, metadata_filename = get_prefilter_filenames(filename)
+    try:
+        with open(metadata_filename) as file:
+            metadata = json.load(file)
+        if metadata.get("version") != PREFILTER_VERSION or \
+                metadata.get("fingerprint") != datastore.get_file_fingerprint(filename) or \
+                metadata.get("options") != datastore.get_cache_options(dtype, usecols) or \
+                metadata.get("columns") != list(columns):
+            return None
+        with np.load(data_filename, allow_pickle=False) as data:
+            return PrefilterIndex(data['segment_starts'], data['segment_means'], data['norms'])
+
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_prefilter_index(filename, prefilter_index, columns, dtype=None, usecols=None):
+    """
+    writes the prefilter index of a data file next to it. the .json-file is
+    written last, so an index that was not written completely is never valid
+    :param filename: the filename of the data file the candidates were loaded from
+    :param prefilter_index: the PrefilterIndex
+    :param columns: list with the names of the candidate functions of the index
+    :param dtype: the dtype of all columns or None for the detected dtypes
+    :param usecols: list with the names of the loaded columns or None for all
+    :return: True if the index was written, False if not
+    """
+    data_filename, metadata_filename = get_prefilter_filenames(filename)
+    metadata = {"version": PREFILTER_VERSION,
+                "fingerprint": datastore.get_file_fingerprint(filename),
+                "options": datastore.get_cache_options(dtype, usecols),
+                "columns": list(columns)}
+    try:
+        # invalidate the old index, write to temporary files
+        # and replace the index files afterwards
+        if os.path.exists(metadata_filename):
+            os.remove(metadata_filename)
+        with open(data_filename + '.tmp', 'wb') as file:
+            np.savez(file, segment_starts=prefilter_index.segment_starts,
+                     segment_means=prefilter_index.segment_means, norms=prefilter_index.norms)
+        os.replace(data_filename + '.tmp', data_filename)
+        with open(metadata_filename + '.tmp', 'w') as file:
+            json.dump(metadata, file)
+        os.replace(metadata_filename + '.tmp', metadata_filename)
+
+    except OSError:
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        logger.error("The prefilter index of the following file could not be written: %s", filename)
+        # the index is optional, it is built again the next time
+        return False
+
+    return True
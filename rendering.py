@@ -0,0 +1,195 @@
+import numpy as np
+
+
+# modes that could be chosen to render the plots of the datasets:
+# 'decimated' reduces lines to the points that are visible at the width of
+# the plot and draws large numbers of points as a density image, 'full'
+# passes every point to matplotlib
+RENDER_MODES = ('decimated', 'full')
+# number of buckets of a decimated line if the width of the plot is unknown
+DEFAULT_BUCKETS = 1000
+# with mode 'decimated' points are only drawn one by one up to this number,
+# more points are drawn as a density image
+DEFAULT_MAX_POINTS = 10000
+# number of bins of the density image in x and y direction
+DEFAULT_BINS = (400, 240)
+
+
+def get_number_of_buckets(ax):
+    """
+    returns the number of pixels in the width of a plot, so that a line
+    is decimated to about as many buckets as could be seen
+    :param ax: the matplotlib axes of the plot
+    :return: the number of buckets
+    """
+    try:
+        return max(1, int(ax.get_window_extent().width))
+    except (AttributeError, TypeError, ValueError):
+        return DEFAULT_BUCKETS
+
+
+def decimate_line(x_values, y_values, buckets=DEFAULT_BUCKETS):
+    """
+    reduces a line to at most four points per bucket: the first, the last, the
+    lowest and the highest point. the x-range is split into buckets of the same
+    width, so with one bucket per pixel the decimated line looks exactly like
+    the full one, but the time to draw it only depends on the number of buckets
+    :param x_values: the x-values of the line
+    :param y_values: the y-values of the line
+    :param buckets: the number of buckets, e.g. the width of the plot in pixels
+    :return: tuple with the x-values and the y-values of the decimated line. if
+     the line has not more than four points per bucket, the submitted values
+    """
+    x_values = np.asarray(x_values)
+    y_values = np.asarray(y_values)
+    number_of_points = len(x_values)
+    if number_of_points <= 4 * buckets:
+        return x_values, y_values
+    # the points are drawn in the order of their x-values
+    if (np.diff(x_values) < 0).any():
+        order = np.argsort(x_values, kind='stable')
+        x_values = x_values[order]
+        y_values = y_values[order]
+    x_min = x_values[0]
+    width = x_values[-1] - x_min
+    if width > 0:
+        bucket_ids = np.minimum(((x_values - x_min) * (buckets / width)).astype(np.int64), buckets - 1)
+    else:
+        bucket_ids = np.zeros(number_of_points, dtype=np.int64)
+    # the x-values are sorted, so every bucket is a range of points
+    bucket_starts = np.flatnonzero(np.diff(bucket_ids, prepend=-1))
+    bucket_ends = np.append(bucket_starts[1:], number_of_points) - 1
+    # sorting by the bucket and then by the y-value puts the lowest point of
+    # every bucket at its start and the highest one at its end
+    order = np.lexsort((y_values, bucket_ids))
+    points = np.unique(np.concatenate([bucket_starts, bucket_ends, order[bucket_starts], order[bucket_ends]]))
+    return x_values[points], y_values[points]
+
+
+def bin_points(x_values, y_values, bins=DEFAULT_BINS):
+    """
+    counts the points in every cell of a grid over the range of the points
+    :param x_values: the x-values of the points
+    :param y_values: the y-values of the points
+    :param bins: tuple with the number of cells in x and y direction
+    :return: tuple with the 2-dimensional array of the counts with one row for
+     every cell in y direction and the extent (x_min, x_max, y_min, y_max) of the grid
+    """
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    counts, x_edges, y_edges = np.histogram2d(x_values, y_values, bins=bins)
+    return counts.T, (x_edges[0], x_edges[-1], y_edges[0], y_edges[-1])
+
+
+def plot_line(ax, x_values, y_values, mode='decimated', **kwargs):
+    """
+    draws a line, decimated to the width of the plot with mode 'decimated'
+    :param ax: the matplotlib axes of the plot
+    :param x_values: the x-values of the line
+    :param y_values: the y-values of the line
+    :param mode: one of RENDER_MODES
+    :param kwargs: the keyword arguments of ax.plot, e.g. label and linewidth
+    :return: None
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError('Unknown render mode: ' + str(mode))
+    if mode == 'decimated':
+        x_values, y_values = decimate_line(x_values, y_values, get_number_of_buckets(ax))
+    ax.plot(x_values, y_values, **kwargs)
+
+
+def plot_points(ax, x_values, y_values, fmt, mode='decimated', max_points=DEFAULT_MAX_POINTS,
+                bins=DEFAULT_BINS, **kwargs):
+    """
+    draws points. with mode 'decimated' more than max_points points are drawn
+    as an image of the number of points in every cell of a grid instead
+    :param ax: the matplotlib axes of the plot
+    :param x_values: the x-values of the points
+    :param y_values: the y-values of the points
+    :param fmt: the format string of ax.plot, e.g. 'bo'
+    :param mode: one of RENDER_MODES
+    :param max_points: the maximum number of points that are drawn one by one
+    :param bins: tuple with the number of cells of the grid in x and y direction
+    :param kwargs: the keyword arguments of ax.plot, e.g. label
+    :return: None
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError('Unknown render mode: ' + str(mode))
+    if mode == 'full' or len(x_values) <= max_points:
+        ax.plot(x_values, y_values, fmt, **kwargs)
+        return
+    counts, extent = bin_points(x_values, y_values, bins)
+    # empty cells stay transparent, the logarithm keeps single points visible next to dense areas
+    ax.imshow(np.ma.masked_equal(np.log1p(counts), 0), origin='lower', extent=extent, aspect='auto',
+              cmap='Blues', interpolation='nearest')
+    # an empty line with the format of the points stands for the image in the legend
+    ax.plot([], [], fmt, **kwargs)
+
+
+def create_function_figure(plt, x_values, y_values, label, title, mode='decimated'):
+    """
+    creates the figure of a single function
+    :param plt: the pyplot module of matplotlib
+    :param x_values: the x-values of the function
+    :param y_values: the y-values of the function
+    :param label: the label of the function in the legend
+    :param title: the title of the plot
+    :param mode: one of RENDER_MODES
+    :return: the figure
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_line(ax, x_values, y_values, mode=mode, label=label, linewidth=2)
+    ax.legend()
+    ax.grid(True, color="k")
+    ax.set_title(title)
+    return fig
+
+
+def create_comparison_figure(plt, x_values, ideal_y_values, train_y_values, ideal_name, train_name,
+                             mode='decimated'):
+    """
+    creates the figure of an ideal function and the train function it was found for
+    :param plt: the pyplot module of matplotlib
+    :param x_values: the x-values of both functions
+    :param ideal_y_values: the y-values of the ideal function
+    :param train_y_values: the y-values of the train function
+    :param ideal_name: the name of the ideal function
+    :param train_name: the name of the train function
+    :param mode: one of RENDER_MODES
+    :return: the figure
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_line(ax, x_values, ideal_y_values, mode=mode, label='Ideal Function ' + ideal_name, linewidth=2)
+    plot_line(ax, x_values, train_y_values, mode=mode, label='Train Function ' + train_name, linewidth=1)
+    ax.legend()
+    ax.grid(True, color="k")
+    ax.set_title('Ideal Function ' + ideal_name + ' and Train Function ' + train_name)
+    return fig
+
+
+def create_test_data_figure(plt, test_x_values, test_y_values, ideal_x_values=None, ideal_y_values=None,
+                            ideal_name=None, mode='decimated'):
+    """
+    creates the figure of the test data assigned to an ideal function
+    or of the test data that was not assigned, if there is no ideal function
+    :param plt: the pyplot module of matplotlib
+    :param test_x_values: the x-values of the test data
+    :param test_y_values: the y-values of the test data
+    :param ideal_x_values: the x-values of the ideal function or None
+    :param ideal_y_values: the y-values of the ideal function or None
+    :param ideal_name: the name of the ideal function or None
+    :param mode: one of RENDER_MODES
+    :return: the figure
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if ideal_name is not None:
+        plot_line(ax, ideal_x_values, ideal_y_values, mode=mode, label='Ideal Function ' + ideal_name,
+                  linewidth=2)
+    plot_points(ax, test_x_values, test_y_values, 'bo', mode=mode, label='Test Data')
+    ax.legend()
+    ax.grid(True, color="k")
+    if ideal_name is not None:
+        ax.set_title('Test Data assigned to Ideal Function ' + ideal_name)
+    else:
+        ax.set_title('Test Data with no assignment to an Ideal Function')
+    return fig
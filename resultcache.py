@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import threading
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+from sys import exc_info
+import numpy as np
+import database
+
+
+# name of the database table with the stored match results
+RESULT_CACHE_TABLE = 'MatchResultCache'
+# number of match results kept in memory
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def get_key(version, y_values):
+    """
+    returns the key of the match result of a function against a version of
+    the ideal functions. the same y-values always give the same key, no
+    matter if they are submitted as a list, an array or a pandas series
+    :param version: the version of the ideal dataset (see DataSet.get_version)
+    :param y_values: the y-values of the function
+    :return: the key as a hex string
+    """
+    values = np.ascontiguousarray(np.asarray(y_values, dtype=np.float64))
+    key = hashlib.sha1(version.encode('utf-8'))
+    key.update(str(len(values)).encode('utf-8'))
+    key.update(values.tobytes())
+    return key.hexdigest()
+
+
+class MatchResultCache:
+    """
+    Stores the results of IdealDataSet.compare_function and compare_functions,
+    so that a function that was already compared against the same version of
+    the ideal functions does not need to be compared again. The most recently
+    used results are kept in memory and the least recently used one is dropped
+    when there are more than max_entries. With a database all results are also
+    stored in the table RESULT_CACHE_TABLE, so they survive the program.
+    """
+
+    def __init__(self, engine=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        creates an empty cache
+        :param engine: the SQLiteDataBase the results are stored in, None to keep them only in memory
+        :param max_entries: the number of results kept in memory
+        """
+        self.engine = engine
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.table_created = False
+        # number of results that were found and not found in the cache
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        returns the stored match result
+        :param key: the key of the result (see get_key)
+        :return: dictionary with the ideal_function_found and the max_distance or None if it is not stored
+        """
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+        if result is None and self.engine is not None:
+            result = self._read_from_database(key)
+            if result is not None:
+                self._remember(key, result)
+        with self.lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if result is None else dict(result)
+
+    def put(self, key, result):
+        """
+        stores a match result
+        :param key: the key of the result (see get_key)
+        :param result: dictionary with the ideal_function_found and the max_distance
+        :return: None
+        """
+        result = {"ideal_function_found": result['ideal_function_found'],
+                  "max_distance": result['max_distance']}
+        self._remember(key, result)
+        if self.engine is not None:
+            self._write_to_database(key, result)
+
+    def _remember(self, key, result):
+        """
+        keeps a match result in memory and drops the least recently used ones
+        :param key: the key of the result
+        :param result: dictionary with the ideal_function_found and the max_distance
+        :return: None
+        """
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _create_table(self, connection):
+        """
+        creates the table of the results in the database if it does not exist yet
+        :param connection: the connection to the database
+        :return: None
+        """
+        if not self.table_created:
+            connection.exec_driver_sql('CREATE TABLE IF NOT EXISTS ' + RESULT_CACHE_TABLE +
+                                       ' (key TEXT PRIMARY KEY, ideal_function_found TEXT, max_distance REAL)')
+            self.table_created = True
+
+    def _read_from_database(self, key):
+        """
+        reads a match result from the database
+        :param key: the key of the result
+        :return: dictionary with the ideal_function_found and the max_distance or None if it is not stored
+        """
+        try:
+            with self.engine.transaction() as connection:
+                self._create_table(connection)
+                row = connection.exec_driver_sql('SELECT ideal_function_found, max_distance FROM ' +
+                                                 RESULT_CACHE_TABLE + ' WHERE key = ?', (key,)).fetchone()
+
+        except database.get_database_errors():
+            now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+            exception_type, exception_value, exception_traceback = exc_info()
+            file_name, line_number, procedure_name, line_code \
+                = traceback.extract_tb(exception_traceback)[-1]
+            # get Logging-Instance from Main Scope
+            logger = logging.getLogger('__main__')
+            logger.error("Exception Datetime: %s", now)
+            logger.error("Exception Type: %s", exception_type)
+            logger.error("Exception Value: %s", exception_value)
+            logger.error("File Name: %s", file_name)
+            logger.error("Line Number: %d", line_number)
+            logger.error("Procedure Name: %s", procedure_name)
+            logger.error("Line Code: %s", line_code)
+            # the cache works without the database, the result is calculated again
+            return None
+
+        if row is None:
+            return None
+        return {"ideal_function_found": row[0], "max_distance": row[1]}
+
+    def _write_to_database(self, key, result):
+        """
+        writes a match result to the database
+        :param key: the key of the result
+        :param result: dictionary with the ideal_function_found and the max_distance
+        :return: None
+        """
+        try:
+            with self.engine.transaction() as connection:
+                self._create_table(connection)
+                connection.exec_driver_sql('INSERT OR REPLACE INTO ' + RESULT_CACHE_TABLE +
+                                           ' (key, ideal_function_found, max_distance) VALUES (?, ?, ?)',
+                                           (key, result['ideal_function_found'], float(result['max_distance'])))
+
+        except database.get_database_errors():
+            now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+            exception_type, exception_value, exception_traceback = exc_info()
+            file_name, line_number, procedure_name, line_code \
+                = traceback.extract_tb(exception_traceback)[-1]
+            # get Logging-Instance from Main Scope
+            logger = logging.getLogger('__main__')
+            logger.error("Exception Datetime: %s", now)
+            logger.error("Exception Type: %s", exception_type)
+            logger.error("Exception Value: %s", exception_value)
+            logger.error("File Name: %s", file_name)
+            logger.error("Line Number: %d", line_number)
+            logger.error("Procedure Name: %s", procedure_name)
+            logger.error("Line Code: %s", line_code)
+            # the cache works without the database, the result is kept in memory anyway
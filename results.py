@@ -0,0 +1,99 @@
+import json
+import logging
+import traceback
+from datetime import datetime
+from sys import exc_info
+import pandas as pd
+import database
+import instrumentation
+
+
+# name of the database table with the best fitting ideal functions
+MATCHES_TABLE = 'IdealFunctionsFound'
+
+
+def get_results(ideal_functions_found, test_dataframe):
+    """
+    collects the results of a run in a dictionary, which could be written
+    as json. the assignments are stored column by column, so that the
+    file stays small and could be read directly into a dataframe again
+    :param ideal_functions_found: list of dictionaries with the TrainFunction,
+     the IdealFunction and the MaxDistance of every found ideal function
+    :param test_dataframe: the dataframe of the test data with the
+     columns x, y, IdealFunction and DeltaY
+    :return: dictionary with the matches, the assignments and the
+     number of assigned test points per ideal function
+    """
+    ideal_functions = test_dataframe['IdealFunction'].astype(str)
+    return {"matches": [{"TrainFunction": f['TrainFunction'],
+                         "IdealFunction": f['IdealFunction'],
+                         "MaxDistance": float(f['MaxDistance'])} for f in ideal_functions_found],
+            "assignment_counts": {str(k): int(v) for k, v in ideal_functions.value_counts().items()},
+            "assignments": {"x": test_dataframe['x'].astype(float).tolist(),
+                            "y": test_dataframe['y'].astype(float).tolist(),
+                            "IdealFunction": ideal_functions.tolist(),
+                            "DeltaY": test_dataframe['DeltaY'].astype(float).tolist()}}
+
+
+def write_results_file(filename, results):
+    """
+    writes the results of a run to a json file
+    :param filename: the name of the json file
+    :param results: the dictionary of get_results
+    :return: True if the file was written, False if not
+    """
+    try:
+        with open(filename, 'w') as file:
+            json.dump(results, file)
+
+    except OSError:
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        return False
+
+    return True
+
+
+def write_matches_to_database(engine, ideal_functions_found, mode='replace'):
+    """
+    writes the best fitting ideal functions with their maximum
+    distance to the table MATCHES_TABLE of the database
+    :param engine: the SQLiteDataBase
+    :param ideal_functions_found: list of dictionaries with the TrainFunction,
+     the IdealFunction and the MaxDistance of every found ideal function
+    :param mode: the write mode of SQLiteDataBase.write_dataframe
+    :return: True if the table was written, False if not
+    """
+    dataframe = pd.DataFrame(ideal_functions_found, columns=['TrainFunction', 'IdealFunction', 'MaxDistance'])
+    try:
+        engine.write_dataframe(MATCHES_TABLE, dataframe, mode=mode)
+
+    except database.get_database_errors():
+        now = datetime.now().strftime("%d-%m-%Y %I:%M:%S %p")
+        exception_type, exception_value, exception_traceback = exc_info()
+        file_name, line_number, procedure_name, line_code \
+            = traceback.extract_tb(exception_traceback)[-1]
+        # get Logging-Instance from Main Scope
+        logger = logging.getLogger('__main__')
+        logger.error("Exception Datetime: %s", now)
+        logger.error("Exception Type: %s", exception_type)
+        logger.error("Exception Value: %s", exception_value)
+        logger.error("File Name: %s", file_name)
+        logger.error("Line Number: %d", line_number)
+        logger.error("Procedure Name: %s", procedure_name)
+        logger.error("Line Code: %s", line_code)
+        return False
+
+    instrumentation.count(instrumentation.ROWS_WRITTEN, len(dataframe))
+    return True
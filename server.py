@@ -0,0 +1,243 @@
+import getopt
+import json
+import logging
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+import datasets
+import matching
+import spatial
+from exceptions import InvalidDataFileError
+
+
+# the command line options of the server
+USAGE = 'server.py -i <idealdatafile> -H <host> -p <port> --cache --mmap'
+
+
+class MatchingService:
+    """
+    Keeps an IdealDataSet and everything derived from it in memory, so that
+    requests only have to do the matching itself. The matrix of the ideal
+    functions is prepared once and the spatial index of an ideal function
+    is built when it is used first and kept for all following requests.
+    """
+
+    def __init__(self, ideal_data_set):
+        """
+        prepares the ideal functions for the matching
+        :param ideal_data_set: the IdealDataSet with the ideal functions
+        """
+        self.ideal_data_set = ideal_data_set
+        columns, candidates = ideal_data_set.get_function_matrix()
+        self.columns = columns
+        # one contiguous row per ideal function, so that no request has to convert them again
+        self.candidates = np.ascontiguousarray(candidates, dtype=np.float64)
+        self.x_values = ideal_data_set.get_dataframe()['x'].to_numpy(dtype=float)
+        self.function_indexes = {}
+        self.lock = threading.Lock()
+
+    def get_status(self):
+        """
+        returns the size of the ideal functions held by the service
+        :return: dictionary with the number of ideal functions and x-values
+        """
+        return {"ideal_functions": len(self.columns), "x_values": len(self.x_values)}
+
+    def match(self, functions):
+        """
+        finds the best fitting ideal function for every submitted function
+        like IdealDataSet.compare_functions with method 'numpy'
+        :param functions: dictionary with a list of y-values for every function,
+         one y-value for every x-value of the ideal functions
+        :return: dictionary with the ideal_function_found and the max_distance for every function
+        """
+        names = list(functions)
+        queries = np.asarray([functions[name] for name in names], dtype=np.float64)
+        if queries.ndim != 2 or queries.shape[1] != len(self.x_values) or not np.isfinite(queries).all():
+            raise ValueError('Every function needs one finite y-value for each of the ' +
+                             str(len(self.x_values)) + ' x-values of the ideal functions.')
+        best_fits = matching.find_best_fits(self.candidates, queries)
+        results = {}
+        for name, (best_index, least_squared_distance, max_distance) in zip(names, best_fits):
+            results[name] = {"ideal_function_found": None if best_index is None else self.columns[best_index],
+                             "max_distance": max_distance}
+        return results
+
+    def get_function_index(self, name):
+        """
+        returns the spatial index of an ideal function, which is built when it is requested first
+        :param name: the name of the ideal function
+        :return: the FunctionIndex of the ideal function
+        """
+        with self.lock:
+            function_index = self.function_indexes.get(name)
+            if function_index is None:
+                if name not in self.columns:
+                    raise ValueError('Unknown ideal function: ' + str(name))
+                function_index = spatial.FunctionIndex(self.x_values,
+                                                       self.candidates[self.columns.index(name)])
+                self.function_indexes[name] = function_index
+        return function_index
+
+    def assign(self, test_x, test_y, functions):
+        """
+        assigns every test point to the closest of the submitted ideal functions,
+        if it is not more far away than the maximum distance multiplied by sqrt(2),
+        like TestDataSet.check_coordinates_against_functions
+        :param test_x: list with the x-values of the test points
+        :param test_y: list with the y-values of the test points
+        :param functions: list of tuples with the name of the ideal function and the maximum distance
+        :return: dictionary with the lists IdealFunction and DeltaY with a value for every test point
+        """
+        test_x = np.asarray(test_x, dtype=np.float64)
+        test_y = np.asarray(test_y, dtype=np.float64)
+        if test_x.ndim != 1 or test_x.shape != test_y.shape:
+            raise ValueError('x and y need the same number of values.')
+        distances = np.full((len(test_x), len(functions) + 1), np.inf)
+        for k, (name, max_distance) in enumerate(functions):
+            distances[:, k + 1] = self.get_function_index(name).nearest_distances(
+                test_x, test_y, abs(float(max_distance)) * math.sqrt(2))
+        # the first column stands for not assigned, so it is only chosen if no
+        # function is close enough. on equal distances the first function wins
+        closest = np.argmin(distances, axis=1)
+        names = np.array(['not_assigned'] + [name for name, max_distance in functions], dtype=object)
+        delta_y = np.where(closest > 0, distances[np.arange(len(closest)), closest], 0.0)
+        return {"IdealFunction": names[closest].tolist(), "DeltaY": delta_y.tolist()}
+
+
+class MatchingRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests to the MatchingService of the server with json:
+    GET /status returns the size of the ideal functions,
+    POST /match expects {"functions": {name: [y-values]}} and
+    POST /assign expects {"x": [...], "y": [...], "functions": [[name, max_distance]]}
+    """
+
+    def do_GET(self):
+        """
+        answers GET-requests
+        :return: None
+        """
+        if self.path == '/status':
+            self.send_json(200, self.server.service.get_status())
+        else:
+            self.send_json(404, {"error": "Unknown path " + self.path})
+
+    def do_POST(self):
+        """
+        answers POST-requests
+        :return: None
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(content_length))
+            if self.path == '/match':
+                response = self.server.service.match(request['functions'])
+            elif self.path == '/assign':
+                response = self.server.service.assign(request['x'], request['y'], request['functions'])
+            else:
+                self.send_json(404, {"error": "Unknown path " + self.path})
+                return
+
+        except (ValueError, TypeError, KeyError) as error:
+            self.send_json(400, {"error": str(error)})
+            return
+
+        self.send_json(200, response)
+
+    def send_json(self, status, response):
+        """
+        sends the response as json
+        :param status: the http status code
+        :param response: the object that is sent as json
+        :return: None
+        """
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        requests are not logged, only errors are written to error.log
+        :return: None
+        """
+
+
+def create_server(service, host='127.0.0.1', port=8080):
+    """
+    creates the http server for a MatchingService, which answers
+    every request in another thread
+    :param service: the MatchingService
+    :param host: the host the server listens on
+    :param port: the port the server listens on, 0 for any free port
+    :return: the server, which is started with serve_forever
+    """
+    server = ThreadingHTTPServer((host, port), MatchingRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv):
+    """
+    loads the ideal data once and answers matching
+    requests until the server is interrupted
+    :param argv: command line options could be:
+     -i <idealdatafile> -H <host> -p <port> --cache --mmap
+    :return: None
+    """
+    # configure logging
+    logging.basicConfig(filename="error.log", filemode="a")
+    # define the options if not overriden by command line option
+    ideal_data_file = 'ideal.csv'
+    host = '127.0.0.1'
+    port = 8080
+    cache = False
+    mmap = False
+    try:
+        opts, args = getopt.getopt(argv, "hi:H:p:", ["idealdata=", "host=", "port=", "cache", "mmap"])
+    except getopt.GetoptError:
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(USAGE)
+            sys.exit()
+        elif opt in ("-i", "--idealdata"):
+            ideal_data_file = arg
+        elif opt in ("-H", "--host"):
+            host = arg
+        elif opt in ("-p", "--port"):
+            try:
+                port = int(arg)
+            except ValueError:
+                print('The port must be a number.')
+                sys.exit(2)
+        elif opt == "--cache":
+            cache = True
+        elif opt == "--mmap":
+            mmap = True
+    try:
+        ideal_data_set = datasets.IdealDataSet('IdealData', ideal_data_file, cache=cache, mmap=mmap)
+    except (FileNotFoundError, InvalidDataFileError):
+        print('ERROR: ' + ideal_data_file + ' could not been found or contains invalid data.')
+        # the same exit code as in main.py for invalid data files
+        sys.exit(3)
+    server = create_server(MatchingService(ideal_data_set), host, port)
+    print('Serving ' + ideal_data_file + ' on http://' + host + ':' + str(server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,218 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import instrumentation
+import pipeline
+
+
+# the test points are processed in blocks so that the temporary
+# matrices with the lower bounds never grow beyond this number of bytes
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+class FunctionIndex:
+    """
+    Spatial index over the points of a function. The points are sorted
+    by their x-value and grouped into blocks of block_size neighbouring
+    points. Every block stores its bounding box, so that for a test point
+    only the points of the blocks that could contain a point within the
+    searched radius have to be checked.
+    """
+
+    def __init__(self, x_values, y_values, block_size=None):
+        """
+        builds the index over the points of the function
+        :param x_values: the x-values of the function
+        :param y_values: the y-values of the function
+        :param block_size: number of points per block, calculated from the
+                           number of points if None
+        """
+        x_values = np.asarray(x_values, dtype=np.float64)
+        y_values = np.asarray(y_values, dtype=np.float64)
+        order = np.argsort(x_values, kind='stable')
+        number_of_points = len(order)
+        if block_size is None:
+            block_size = max(16, min(256, int(math.sqrt(number_of_points) / 4)))
+        self.block_size = block_size
+        self.number_of_points = number_of_points
+        # fill up the last block with the last point, which does not change
+        # any distance, so that every block has the same number of points
+        number_of_blocks = -(-number_of_points // block_size)
+        padding = number_of_blocks * block_size - number_of_points
+        order = np.concatenate([order, np.repeat(order[-1:], padding)])
+        self.x = x_values[order]
+        self.y = y_values[order]
+        blocks_x = self.x.reshape(number_of_blocks, block_size)
+        blocks_y = self.y.reshape(number_of_blocks, block_size)
+        self.block_x_min = blocks_x[:, 0]
+        self.block_x_max = blocks_x[:, -1]
+        self.block_y_min = blocks_y.min(axis=1)
+        self.block_y_max = blocks_y.max(axis=1)
+
+    def nearest_distances(self, test_x, test_y, radius, chunk_bytes=DEFAULT_CHUNK_BYTES):
+        """
+        calculates for every test point the distance to the nearest point
+        of the function, if it is not more far away than radius
+        :param test_x: the x-values of the test points
+        :param test_y: the y-values of the test points
+        :param radius: the maximum distance that should be searched
+        :param chunk_bytes: the maximum size of the temporary matrices in bytes
+        :return: array with the distance to the nearest point of the function
+                 for every test point or inf if there is no point within radius
+        """
+        test_x = np.asarray(test_x, dtype=np.float64)
+        test_y = np.asarray(test_y, dtype=np.float64)
+        distances = np.full(len(test_x), np.inf)
+        if self.number_of_points == 0 or len(test_x) == 0:
+            return distances
+        # the blocks that overlap the x-range [x - radius, x + radius]
+        first_blocks = np.searchsorted(self.block_x_max, test_x - radius, 'left')
+        end_blocks = np.searchsorted(self.block_x_min, test_x + radius, 'right')
+        window = max(1, int((end_blocks - first_blocks).max()))
+        chunk_size = max(1, int(chunk_bytes // (window * 8 * 6)))
+        for start in range(0, len(test_x), chunk_size):
+            end = start + chunk_size
+            distances[start:end] = self._nearest_distances_of_chunk(
+                test_x[start:end], test_y[start:end], radius,
+                first_blocks[start:end], end_blocks[start:end], window)
+        return distances
+
+    def _nearest_distances_of_chunk(self, test_x, test_y, radius, first_blocks, end_blocks, window):
+        """
+        does the work of nearest_distances for a chunk of test points
+        :param test_x: the x-values of the test points
+        :param test_y: the y-values of the test points
+        :param radius: the maximum distance that should be searched
+        :param first_blocks: the first block in the x-range of every test point
+        :param end_blocks: the block after the last block in the x-range of every test point
+        :param window: the maximum number of blocks in the x-range of a test point
+        :return: array with the distances of the chunk
+        """
+        block_ids = first_blocks[:, np.newaxis] + np.arange(window)
+        valid = block_ids < end_blocks[:, np.newaxis]
+        block_ids = np.minimum(block_ids, len(self.block_x_min) - 1)
+        # the distance of a test point to the bounding box of a block
+        # is a lower bound of the distance to every point in the block
+        dx = np.maximum(np.maximum(self.block_x_min[block_ids] - test_x[:, np.newaxis],
+                                   test_x[:, np.newaxis] - self.block_x_max[block_ids]), 0.0)
+        dy = np.maximum(np.maximum(self.block_y_min[block_ids] - test_y[:, np.newaxis],
+                                   test_y[:, np.newaxis] - self.block_y_max[block_ids]), 0.0)
+        lower_bounds = np.hypot(dx, dy)
+        lower_bounds[~valid | (lower_bounds > radius)] = np.inf
+        # check the blocks in the order of their lower bound until the
+        # lower bound of the next block is greater than the nearest point found
+        ranking = np.argsort(lower_bounds, axis=1)
+        lower_bounds = np.take_along_axis(lower_bounds, ranking, axis=1)
+        block_ids = np.take_along_axis(block_ids, ranking, axis=1)
+        distances = np.full(len(test_x), np.inf)
+        offsets = np.arange(self.block_size)
+        active = np.arange(len(test_x))
+        for rank in range(window):
+            active = active[lower_bounds[active, rank] <= np.minimum(distances[active], radius)]
+            if len(active) == 0:
+                break
+            points = block_ids[active, rank][:, np.newaxis] * self.block_size + offsets
+            instrumentation.count(instrumentation.DISTANCE_EVALUATIONS, points.size)
+            block_distances = np.hypot(self.x[points] - test_x[active, np.newaxis],
+                                       self.y[points] - test_y[active, np.newaxis]).min(axis=1)
+            distances[active] = np.minimum(distances[active], block_distances)
+        distances[distances > radius] = np.inf
+        return distances
+
+
+# the test points, the distances and the indexes of the functions,
+# attached once in every worker process of nearest_distances_parallel
+_worker_shared_memory = None
+_worker_test_points = None
+_worker_distances = None
+_worker_function_indexes = None
+
+
+def _attach_test_points(shared_memory_name, number_of_test_points, functions):
+    """
+    initializer of the worker processes of nearest_distances_parallel, which
+    attaches the shared memory with the test points and the distances without
+    copying them and builds the index of every function once per worker
+    :param shared_memory_name: the name of the shared memory
+    :param number_of_test_points: the number of test points
+    :param functions: list of tuples with the x-values and the y-values of every function
+    :return: None
+    """
+    global _worker_shared_memory, _worker_test_points, _worker_distances, _worker_function_indexes
+    _worker_shared_memory = shared_memory.SharedMemory(name=shared_memory_name)
+    _worker_test_points = np.ndarray((2, number_of_test_points), dtype=np.float64,
+                                     buffer=_worker_shared_memory.buf)
+    _worker_distances = np.ndarray((number_of_test_points, len(functions)), dtype=np.float64,
+                                   buffer=_worker_shared_memory.buf, offset=_worker_test_points.nbytes)
+    _worker_function_indexes = [FunctionIndex(x_values, y_values) for x_values, y_values in functions]
+
+
+def _nearest_distances_of_rows(start, end, radii):
+    """
+    calculates the distances of the test points from start to end to every
+    function in a worker process of nearest_distances_parallel and writes
+    them into the shared memory
+    :param start: the first test point of the chunk
+    :param end: the test point after the last test point of the chunk
+    :param radii: list with the maximum distance that should be searched for every function
+    :return: None
+    """
+    for k, (function_index, radius) in enumerate(zip(_worker_function_indexes, radii)):
+        _worker_distances[start:end, k] = function_index.nearest_distances(
+            _worker_test_points[0, start:end], _worker_test_points[1, start:end], radius)
+
+
+def nearest_distances_parallel(functions, test_x, test_y, workers=None, chunk_size=None):
+    """
+    does the same as calling FunctionIndex.nearest_distances for every function,
+    but the test points are split into chunks that are processed by a pool of
+    worker processes. the test points and the distances are stored in shared
+    memory, so only the bounds of the chunks are sent to the workers
+    :param functions: list of tuples with the x-values, the y-values and the
+                      maximum distance that should be searched for every function
+    :param test_x: the x-values of the test points
+    :param test_y: the y-values of the test points
+    :param workers: number of worker processes, the number of CPUs if None
+    :param chunk_size: number of test points per chunk, calculated so that
+                       every worker gets about four chunks if None
+    :return: array with one row for every test point and one column with the
+             distances to every function, inf if there is no point within the
+             maximum distance
+    """
+    workers = workers or os.cpu_count() or 1
+    test_x = np.asarray(test_x, dtype=np.float64)
+    test_y = np.asarray(test_y, dtype=np.float64)
+    number_of_test_points = len(test_x)
+    if number_of_test_points == 0 or len(functions) == 0:
+        return np.full((number_of_test_points, len(functions)), np.inf)
+    if chunk_size is None:
+        chunk_size = max(1, -(-number_of_test_points // (workers * 4)))
+    shared = shared_memory.SharedMemory(create=True, size=number_of_test_points * (2 + len(functions)) * 8)
+    try:
+        test_points = np.ndarray((2, number_of_test_points), dtype=np.float64, buffer=shared.buf)
+        test_points[0] = test_x
+        test_points[1] = test_y
+        distances = np.ndarray((number_of_test_points, len(functions)), dtype=np.float64,
+                               buffer=shared.buf, offset=test_points.nbytes)
+        initargs = (shared.name, number_of_test_points,
+                    [(np.asarray(x_values, dtype=np.float64), np.asarray(y_values, dtype=np.float64))
+                     for x_values, y_values, radius in functions])
+        radii = [radius for x_values, y_values, radius in functions]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pipeline.get_process_context(),
+                                 initializer=_attach_test_points, initargs=initargs) as executor:
+            futures = [executor.submit(_nearest_distances_of_rows, start,
+                                       min(start + chunk_size, number_of_test_points), radii)
+                       for start in range(0, number_of_test_points, chunk_size)]
+            for future in futures:
+                future.result()
+        # copy the distances out of the shared memory before it is freed
+        result = distances.copy()
+        del test_points, distances
+
+    finally:
+        shared.close()
+        shared.unlink()
+
+    return result
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+import datasets as ds
+import benchmark
+
+
+class UnitTestBenchmark(unittest.TestCase):
+    def setUp(self):
+        # the data files are generated in a temporary directory
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_generate_data_files(self):
+        filenames = benchmark.generate_data_files(self.directory, rows=30, ideal_columns=7, test_points=12)
+        train_dataframe = ds.DataSet('TrainData', filenames['train']).get_dataframe()
+        ideal_dataframe = ds.IdealDataSet('IdealData', filenames['ideal']).get_dataframe()
+        test_dataframe = ds.DataSet('TestData', filenames['test']).get_dataframe()
+        self.assertEqual(train_dataframe.shape, (30, 1 + benchmark.DEFAULT_TRAIN_COLUMNS))
+        self.assertEqual(ideal_dataframe.shape, (30, 8))
+        self.assertEqual(test_dataframe.shape, (12, 2))
+        self.assertEqual(train_dataframe['x'].tolist(), ideal_dataframe['x'].tolist())
+
+        # the same seed gives the same files
+        other_directory = os.path.join(self.directory, 'other')
+        os.mkdir(other_directory)
+        other_filenames = benchmark.generate_data_files(other_directory, rows=30, ideal_columns=7, test_points=12)
+        for name in filenames:
+            with open(filenames[name]) as file, open(other_filenames[name]) as other_file:
+                self.assertEqual(file.read(), other_file.read())
+
+    def test_run_benchmark(self):
+        filenames = benchmark.generate_data_files(self.directory, rows=40, ideal_columns=9, test_points=15)
+        stages = benchmark.run_benchmark(filenames, repeat=1, workers=2)
+        self.assertEqual(list(stages['compare_function']), list(benchmark.COMPARE_METHODS))
+        self.assertEqual(list(stages['check_coordinates_against_function']), list(benchmark.ASSIGN_METHODS))
+        self.assertEqual(list(stages['write_to_database']), list(benchmark.WRITE_MODES))
+        for stage, methods in stages.items():
+            for method, measurement in methods.items():
+                self.assertGreaterEqual(measurement['median_seconds'], 0)
+                self.assertGreaterEqual(measurement['peak_bytes'], 0)
+                # every fast method gives the same results as the reference method
+                self.assertTrue(measurement.get('same_as_reference', measurement.get('success', True)))
+
+        # a benchmark compared with itself has no regressions
+        results = {"stages": stages}
+        comparison = benchmark.compare_benchmarks(results, results)
+        self.assertEqual(len(comparison), sum(len(methods) for methods in stages.values()))
+        self.assertFalse(any(regression for stage, method, previous, actual, regression in comparison))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,12 @@
+import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
 from sqlalchemy.exc import ArgumentError
 from database import SQLiteDataBase
+import database
+import datasets as ds
 
 
 class UnitTestDatabase(unittest.TestCase):
@@ -13,6 +19,144 @@ class UnitTestDatabase(unittest.TestCase):
         with self.assertRaises(ArgumentError):
             fail = SQLiteDataBase('not_existing_file')
 
+        # an in-memory database keeps its data in the connection of every thread
+        for database_file in ['', '/:memory:']:
+            with SQLiteDataBase(database_file) as db:
+                data_set = ds.DataSet('TrainData', 'train.csv')
+                self.assertTrue(data_set.write_to_database(db))
+                with db.connect() as connection:
+                    self.assertEqual(connection.exec_driver_sql('SELECT COUNT(*) FROM TrainData').scalar(), 400)
+
+    def test_connections(self):
+        # use a database in a temporary directory to keep the database of the program untouched
+        directory = tempfile.mkdtemp()
+        try:
+            database_file = os.path.join(directory, 'test.db')
+            with SQLiteDataBase('/' + database_file, pool_size=2) as db:
+                # a transaction is committed at the end of the with-statement
+                with db.transaction() as connection:
+                    connection.exec_driver_sql('CREATE TABLE Test (value INTEGER)')
+                    connection.exec_driver_sql('INSERT INTO Test VALUES (1)')
+                with db.connect() as connection:
+                    self.assertEqual(connection.exec_driver_sql('SELECT value FROM Test').scalar(), 1)
+
+                # a transaction is rolled back when something fails
+                with self.assertRaises(ZeroDivisionError):
+                    with db.transaction() as connection:
+                        connection.exec_driver_sql('INSERT INTO Test VALUES (2)')
+                        1 / 0
+                with db.connect() as connection:
+                    self.assertEqual(connection.exec_driver_sql('SELECT COUNT(*) FROM Test').scalar(), 1)
+
+                # the datasets are written with the connections of the database
+                data_set = ds.DataSet('TrainData', 'train.csv')
+                for mode in ds.WRITE_MODES:
+                    self.assertTrue(data_set.write_to_database(db, mode=mode))
+                    with db.connect() as connection:
+                        self.assertEqual(connection.exec_driver_sql('SELECT COUNT(*) FROM TrainData').scalar(),
+                                         400)
+
+                # a table replaced after an incremental write is written completely by the next one
+                db.write_dataframe('TrainData', data_set.get_dataframe().head(10))
+                self.assertEqual(db.write_dataframe('TrainData', data_set.get_dataframe(), mode='incremental'), 400)
+
+                # all connections are returned to the pool
+                self.assertEqual(db.engine.pool.checkedout(), 0)
+
+                # the connection attribute is one open connection like before the pool was used,
+                # which is kept until the database is closed
+                self.assertEqual(db.connection.exec_driver_sql('SELECT COUNT(*) FROM TrainData').scalar(), 400)
+                connection = db.connection
+                self.assertIs(db.connection, connection)
+                self.assertEqual(db.engine.pool.checkedout(), 1)
+            self.assertTrue(connection.closed)
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_bulk_write_dataframe(self):
+        # use a database in a temporary directory to keep the database of the program untouched
+        directory = tempfile.mkdtemp()
+        try:
+            database_file = os.path.join(directory, 'test.db')
+            db = SQLiteDataBase('/' + database_file)
+            data_set = ds.DataSet('TrainData', 'train.csv')
+            dataframe = data_set.get_dataframe()
+
+            # the bulk mode should write the same rows as DataFrame.to_sql
+            self.assertTrue(data_set.write_to_database(db.engine, mode='bulk', batch_size=7))
+            connection = sqlite3.connect(database_file)
+            rows = connection.execute('SELECT * FROM TrainData ORDER BY "index"').fetchall()
+            self.assertEqual(len(rows), dataframe.shape[0])
+            self.assertEqual(rows[3], tuple([3] + dataframe.iloc[3].tolist()))
+
+            # writing again replaces the table
+            database.bulk_write_dataframe(db.engine, 'TrainData', dataframe.head(10))
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM TrainData').fetchone()[0], 10)
+            connection.close()
+
+            # the journal mode of the database file and the synchronous setting of the
+            # connection are kept, the connection is the same one from the pool every time
+            raw_connection = db.engine.raw_connection()
+            raw_connection.driver_connection.execute('PRAGMA synchronous=NORMAL')
+            raw_connection.close()
+            database.bulk_write_dataframe(db.engine, 'TrainData', dataframe)
+            raw_connection = db.engine.raw_connection()
+            self.assertEqual(raw_connection.driver_connection.execute('PRAGMA synchronous').fetchone()[0], 1)
+            raw_connection.close()
+            connection = sqlite3.connect(database_file)
+            self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            connection.close()
+            self.assertFalse(os.path.exists(database_file + '-wal'))
+
+            # an unknown write mode should raise a ValueError
+            with self.assertRaises(ValueError):
+                data_set.write_to_database(db.engine, mode='unknown')
+
+            # writing fails without a database engine
+            self.assertFalse(ds.DataSet('TrainData', 'train.csv').write_to_database(None, mode='bulk'))
+            db.engine.dispose()
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sync_dataframe(self):
+        # use a database in a temporary directory to keep the database of the program untouched
+        directory = tempfile.mkdtemp()
+        try:
+            database_file = os.path.join(directory, 'test.db')
+            db = SQLiteDataBase('/' + database_file)
+            dataframe = ds.DataSet('TrainData', 'train.csv').get_dataframe()
+
+            # the first sync writes everything, a second sync of the same data nothing
+            self.assertEqual(database.sync_dataframe(db.engine, 'TrainData', dataframe, block_size=50), 400)
+            self.assertEqual(database.sync_dataframe(db.engine, 'TrainData', dataframe, block_size=50), 0)
+
+            # only the changed block and the appended rows are written
+            changed_dataframe = dataframe.copy()
+            changed_dataframe.loc[120, 'y1'] = 0.0
+            changed_dataframe.loc[400] = [20.0, 1.0, 2.0, 3.0, 4.0]
+            self.assertEqual(database.sync_dataframe(db.engine, 'TrainData', changed_dataframe, block_size=50), 51)
+            connection = sqlite3.connect(database_file)
+            rows = connection.execute('SELECT * FROM TrainData ORDER BY "index"').fetchall()
+            self.assertEqual(rows, [tuple([i] + changed_dataframe.loc[i].tolist()) for i in changed_dataframe.index])
+
+            # rows that do not exist anymore are deleted
+            self.assertEqual(database.sync_dataframe(db.engine, 'TrainData', dataframe.head(75), block_size=50), 25)
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM TrainData').fetchone()[0], 75)
+
+            # a table replaced after an incremental write is written completely by the next one
+            data_set = ds.DataSet('TrainData', 'train.csv')
+            data_set.dataframe = dataframe.head(10)
+            self.assertTrue(data_set.write_to_database(db.engine, mode='replace'))
+            self.assertEqual(database.sync_dataframe(db.engine, 'TrainData', dataframe, block_size=50), 400)
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM TrainData').fetchone()[0], 400)
+            connection.close()
+            db.engine.dispose()
+
+        finally:
+            shutil.rmtree(directory)
+
 
 if __name__ == '__main__':
     unittest.main()
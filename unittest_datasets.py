@@ -1,7 +1,10 @@
+import array
 import unittest
+import numpy as np
 import pandas
+import benchmark_startup
 import datasets as ds
-from exceptions import InvalidFunctionDataError, InvalidDataFileError
+from exceptions import InvalidFunctionDataError, InvalidDataFileError, InvalidDataFrameError
 
 
 class UnitTestDatasetOperations(unittest.TestCase):
@@ -15,6 +18,18 @@ class UnitTestDatasetOperations(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             ds.load_data_from_file('not_exisiting_file')
 
+        # reading the file in chunks should give the same data
+        chunked_result = ds.load_data_from_file('test.csv', chunksize=7)
+        self.assertTrue(chunked_result.equals(result))
+        with self.assertRaises(FileNotFoundError):
+            ds.load_data_from_file('not_exisiting_file', chunksize=7)
+
+        # only the selected columns and the x-axis should be loaded with the selected dtype
+        result = ds.load_data_from_file('ideal.csv', chunksize=100, dtype='float32', usecols=['y2'])
+        self.assertListEqual(result.columns.tolist(), ['x', 'y2'])
+        self.assertListEqual(result.dtypes.tolist(), ['float32', 'float32'])
+        self.assertEqual(result.shape[0], 400)
+
     def test_class_DataSet(self):
         # check class dataset
         data_set = ds.DataSet('DataSet', 'train.csv')
@@ -44,11 +59,41 @@ class UnitTestDatasetOperations(unittest.TestCase):
         expected_result = {"ideal_function_found": 'y1', "max_distance": 0}
         self.assertDictEqual(result, expected_result)
 
+        # the numpy method should find the same function with the same
+        # maximum distance, also when only a few functions are compared at once
+        result = data_set.compare_function(y_column, method='numpy')
+        self.assertDictEqual(result, expected_result)
+        result = data_set.compare_function(y_column, method='numpy', chunk_size=1)
+        self.assertDictEqual(result, expected_result)
+
+        # an unknown method should raise a ValueError
+        with self.assertRaises(ValueError):
+            data_set.compare_function(y_column, method='unknown')
+
         # when invalid data is submitted to compare_function an InvalidFunctionDataError
         # should be raised
         with self.assertRaises(InvalidFunctionDataError):
             data_set.compare_function('this is invalid data')
 
+        # the numpy method needs one y-value for every x-value
+        with self.assertRaises(InvalidFunctionDataError):
+            data_set.compare_function(y_column[1:], method='numpy')
+
+        # numpy arrays, pandas series and other buffers are accepted without converting them to lists
+        y_series = dataframe['y1']
+        for y_values in [y_series, y_series.to_numpy(), array.array('d', y_column)]:
+            for method in ['python', 'numpy']:
+                self.assertDictEqual(data_set.compare_function(y_values, method=method), expected_result)
+        self.assertTrue(np.shares_memory(ds.get_function_values(y_series), y_series.to_numpy()))
+        self.assertEqual(data_set.compare_function(y_series.to_numpy(dtype='float32'))['ideal_function_found'],
+                         'y1')
+
+        # the values must be finite floating point values in one dimension
+        for y_values in [np.arange(len(y_column)), y_series.to_numpy()[:, np.newaxis], [1.0, 'a'],
+                         np.full(len(y_column), np.nan), np.array(['a', 'b'])]:
+            with self.assertRaises(InvalidFunctionDataError):
+                data_set.compare_function(y_values)
+
         # writing to database could not be tested without an instance
         # of a test-database which is not present. so only testing
         # if writing to database fails because of an invalid database engine
@@ -76,6 +121,20 @@ class UnitTestDatasetOperations(unittest.TestCase):
         # should return a dataframe with the selected function
         result = ideal_data_set.get_ideal_function_by_name('y1')
         self.assertIsInstance(result, pandas.DataFrame)
+        # which is a view on the data of the dataset
+        self.assertTrue(np.shares_memory(result['y'].to_numpy(), ideal_data_set.get_dataframe()['y1'].to_numpy()))
+
+        # comparing the ideal data set with itself should find every function
+        # itself with a maximum distance of 0
+        results = ideal_data_set.compare_functions(ideal_data_set.get_dataframe())
+        self.assertEqual(results['y1'], {"ideal_function_found": 'y1', "max_distance": 0.0})
+
+        # when no dataframe or a dataframe with another number of x-values
+        # is submitted, an exception should be raised
+        with self.assertRaises(InvalidDataFrameError):
+            ideal_data_set.compare_functions('this is invalid data')
+        with self.assertRaises(InvalidFunctionDataError):
+            ideal_data_set.compare_functions(ideal_data_set.get_dataframe().head(10))
 
     def test_class_TestDataSet(self):
         # check class TestDataSet
@@ -90,6 +149,63 @@ class UnitTestDatasetOperations(unittest.TestCase):
         with self.assertRaises(InvalidDataFileError):
             ds.TestDataSet('This should raise an Invalid Data File Exception', 'error.csv')
 
+        # the assignment with the spatial index should assign every coordinate
+        # to the same ideal function with the same distance
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        indexed_test_data_set = ds.TestDataSet('TestDataSet', 'test.csv')
+        for name, max_distance in [('y36', 0.5), ('y11', 0.5), ('y2', 0.5), ('y33', 0.5)]:
+            function = ideal_data_set.get_ideal_function_by_name(name)
+            test_data_set.check_coordinates_against_function(function, name, max_distance)
+            indexed_test_data_set.check_coordinates_against_function(function, name, max_distance, method='index')
+        dataframe = test_data_set.get_dataframe()
+        indexed_dataframe = indexed_test_data_set.get_dataframe()
+        self.assertListEqual(indexed_dataframe['IdealFunction'].tolist(), dataframe['IdealFunction'].tolist())
+        self.assertListEqual(indexed_dataframe['DeltaY'].tolist(), dataframe['DeltaY'].tolist())
+
+        # checking all functions at once should give the same result
+        # as checking the functions one after another
+        batch_test_data_set = ds.TestDataSet('TestDataSet', 'test.csv')
+        batch_test_data_set.check_coordinates_against_functions(
+            [(ideal_data_set.get_ideal_function_by_name(name), name, max_distance)
+             for name, max_distance in [('y36', 0.5), ('y11', 0.5), ('y2', 0.5), ('y33', 0.5)]])
+        batch_dataframe = batch_test_data_set.get_dataframe()
+        self.assertListEqual(batch_dataframe['IdealFunction'].tolist(), dataframe['IdealFunction'].tolist())
+        self.assertListEqual(batch_dataframe['DeltaY'].tolist(), dataframe['DeltaY'].tolist())
+
+    def test_compact_representation(self):
+        # with compact=True the data is stored as float32 and IdealFunction as categorical
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv', compact=True)
+        self.assertTrue(all(d == 'float32' for d in ideal_data_set.get_dataframe().dtypes))
+        functions = [(ideal_data_set.get_ideal_function_by_name(name), name, max_distance)
+                     for name, max_distance in [('y36', 0.5), ('y11', 0.49), ('y2', 0.5), ('y33', 0.49)]]
+        test_data_set = ds.TestDataSet('TestDataSet', 'test.csv', compact=True)
+        dataframe = test_data_set.get_dataframe()
+        self.assertEqual(dataframe['DeltaY'].dtype, 'float32')
+        self.assertIsInstance(dataframe['IdealFunction'].dtype, pandas.CategoricalDtype)
+        self.assertLess(dataframe.memory_usage(deep=True).sum(),
+                        ds.TestDataSet('TestDataSet', 'test.csv').get_dataframe().memory_usage(deep=True).sum() / 2)
+
+        # every assign method should keep the dtypes and assign the same functions
+        for function, name, max_distance in functions:
+            test_data_set.check_coordinates_against_function(function, name, max_distance)
+        dataframe = test_data_set.get_dataframe()
+        self.assertEqual(dataframe['DeltaY'].dtype, 'float32')
+        self.assertIsInstance(dataframe['IdealFunction'].dtype, pandas.CategoricalDtype)
+        for method in ['index', 'parallel']:
+            other_test_data_set = ds.TestDataSet('TestDataSet', 'test.csv', compact=True)
+            other_test_data_set.check_coordinates_against_functions(functions, method=method, workers=2)
+            other_dataframe = other_test_data_set.get_dataframe()
+            self.assertEqual(other_dataframe['DeltaY'].dtype, 'float32')
+            self.assertIsInstance(other_dataframe['IdealFunction'].dtype, pandas.CategoricalDtype)
+            self.assertListEqual(other_dataframe['IdealFunction'].tolist(), dataframe['IdealFunction'].tolist())
+            self.assertListEqual(other_dataframe['DeltaY'].tolist(), dataframe['DeltaY'].tolist())
+
+    def test_lazy_imports(self):
+        # matplotlib and sqlalchemy should only be imported when a plot is
+        # rendered or the database is used, not when the programs start
+        for module in ['main', 'server', 'datasets']:
+            self.assertEqual(benchmark_startup.measure_import(module, repeat=1)['loaded'], [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import datastore
+import datasets as ds
+
+
+class UnitTestDatastore(unittest.TestCase):
+    def setUp(self):
+        # the cache files are written next to the data file,
+        # so a copy of the data file in a temporary directory is used
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'train.csv')
+        shutil.copyfile('train.csv', self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cache(self):
+        # without a cache nothing should be loaded from it
+        self.assertIsNone(datastore.read_cache(self.filename))
+
+        # loading a dataset with cache should write the cache,
+        # which contains the same data as the data file
+        data_set = ds.DataSet('DataSet', self.filename, cache=True)
+        for cache_filename in datastore.get_cache_filenames(self.filename):
+            self.assertTrue(os.path.exists(cache_filename))
+        cached_dataframe = datastore.read_cache(self.filename)
+        self.assertTrue(cached_dataframe.equals(data_set.get_dataframe()))
+        self.assertTrue(ds.DataSet('DataSet', self.filename, cache=True).get_dataframe().equals(cached_dataframe))
+
+        # the cache is only valid for the same load options
+        self.assertIsNone(datastore.read_cache(self.filename, dtype='float32'))
+        self.assertIsNone(datastore.read_cache(self.filename, usecols=['y1']))
+
+        # the cache is not valid anymore when the data file changes
+        with open(self.filename, 'a') as file:
+            file.write('20.0,1.0,2.0,3.0,4.0\n')
+        self.assertIsNone(datastore.read_cache(self.filename))
+        data_set = ds.DataSet('DataSet', self.filename, cache=True)
+        self.assertEqual(data_set.get_dataframe().shape[0], 401)
+        self.assertEqual(datastore.read_cache(self.filename).shape[0], 401)
+
+    def test_mmap(self):
+        # the memory-mapped dataset should contain the same data as the data file
+        # and build the cache when it does not exist
+        data_set = ds.IdealDataSet('IdealDataSet', self.filename, mmap=True)
+        self.assertTrue(data_set.get_dataframe().equals(ds.load_data_from_file(self.filename)))
+        self.assertIsNotNone(datastore.read_cache_metadata(self.filename))
+
+        # the memory-mapped data is read-only and the
+        # functions are views on the memory-mapped data
+        data_set = ds.IdealDataSet('IdealDataSet', self.filename, mmap=True)
+        values = data_set.get_dataframe().to_numpy()
+        self.assertFalse(values.flags.writeable)
+        function = data_set.get_ideal_function_by_name('y2')
+        self.assertTrue(np.shares_memory(function['y'].to_numpy(), values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+import datasets as ds
+import export
+
+
+class UnitTestExport(unittest.TestCase):
+    def setUp(self):
+        # the plots are written to a temporary directory
+        self.directory = tempfile.mkdtemp()
+        # only a few ideal functions, so that there are not too many plots to render
+        self.ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv', usecols=['y1', 'y2', 'y11', 'y33', 'y36'])
+        self.train_data_set = ds.DataSet('TrainData', 'train.csv')
+        self.test_data_set = ds.TestDataSet('TestData', 'test.csv')
+        results = self.ideal_data_set.compare_functions(self.train_data_set.get_dataframe())
+        self.ideal_functions_found = [{"TrainFunction": c, "IdealFunction": r['ideal_function_found'],
+                                       "MaxDistance": r['max_distance']} for c, r in results.items()]
+        self.test_data_set.check_coordinates_against_functions(
+            [(self.ideal_data_set.get_ideal_function_by_name(f['IdealFunction']), f['IdealFunction'],
+              f['MaxDistance']) for f in self.ideal_functions_found])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_export_jobs(self):
+        jobs = export.get_export_jobs(self.ideal_data_set.get_function_columns(), self.ideal_functions_found,
+                                      self.directory)
+        kinds = [kind for kind, parameters, filename in jobs]
+        # every ideal function, every train function and the test data of every found
+        # ideal function and the test data that was not assigned
+        self.assertEqual(kinds.count('function'), 5)
+        self.assertEqual(kinds.count('comparison'), 4)
+        self.assertEqual(kinds.count('test_data'), len(export.get_assignment_names(self.ideal_functions_found)))
+        self.assertEqual(len(set(filename for kind, parameters, filename in jobs)), len(jobs))
+
+    def test_export_plots(self):
+        directory = os.path.join(self.directory, 'plots')
+        written, failed = export.export_plots(self.ideal_data_set, self.train_data_set, self.test_data_set,
+                                              self.ideal_functions_found, directory, workers=2)
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(os.listdir(directory)), sorted(os.path.basename(f) for f in written))
+        for filename in written:
+            with open(filename, 'rb') as file:
+                self.assertEqual(file.read(8), b'\x89PNG\r\n\x1a\n')
+
+        # nothing is written if the directory could not be created
+        not_a_directory = os.path.join(self.directory, 'file')
+        open(not_a_directory, 'w').close()
+        written, failed = export.export_plots(self.ideal_data_set, self.train_data_set, self.test_data_set,
+                                              self.ideal_functions_found, not_a_directory, workers=2)
+        self.assertEqual(written, [])
+        self.assertEqual(len(failed), 5 + 4 + len(export.get_assignment_names(self.ideal_functions_found)))
+
+        with self.assertRaises(ValueError):
+            export.export_plots(self.ideal_data_set, self.train_data_set, self.test_data_set,
+                                self.ideal_functions_found, directory, image_format='bmp')
+
+
+if __name__ == '__main__':
+    unittest.main()
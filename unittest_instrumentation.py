@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import datasets as ds
+import instrumentation
+
+
+class UnitTestInstrumentation(unittest.TestCase):
+    def tearDown(self):
+        # the other tests run without instrumentation
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled(self):
+        # while disabled nothing is recorded
+        instrumentation.disable()
+        instrumentation.reset()
+        with instrumentation.stage('stage'):
+            instrumentation.count(instrumentation.ROWS_WRITTEN, 5)
+        ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        self.assertEqual(instrumentation.get_report(), {"stages": {}, "counters": {}})
+
+    def test_stages_and_counters(self):
+        instrumentation.enable()
+
+        @instrumentation.timed('function')
+        def function(value):
+            instrumentation.count('calls')
+            return value * 2
+
+        with instrumentation.stage('outer'):
+            self.assertEqual(function(2), 4)
+            self.assertEqual(function(3), 6)
+        report = instrumentation.get_report()
+        self.assertEqual(list(report['stages']), ['outer', 'function'])
+        self.assertEqual(report['stages']['function']['calls'], 2)
+        self.assertGreaterEqual(report['stages']['outer']['total_seconds'],
+                                report['stages']['function']['total_seconds'])
+        self.assertEqual(report['counters'], {"calls": 2})
+
+        # the stages of a run are recorded with the work that was done
+        instrumentation.enable()
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        results = ideal_data_set.compare_functions(train_dataframe, method='numpy')
+        test_data_set = ds.TestDataSet('TestDataSet', 'test.csv')
+        test_data_set.check_coordinates_against_function(ideal_data_set.get_ideal_function_by_name('y1'), 'y1',
+                                                         results['y1']['max_distance'])
+        report = instrumentation.get_report()
+        self.assertEqual(report['stages']['DataSet.load']['calls'], 3)
+        self.assertEqual(report['stages']['IdealDataSet.compare_functions']['calls'], 1)
+        self.assertEqual(report['stages']['TestDataSet.check_coordinates_against_function']['calls'], 1)
+        self.assertEqual(report['counters'][instrumentation.CANDIDATES_SCORED], 4 * 50)
+        self.assertEqual(report['counters'][instrumentation.DISTANCE_EVALUATIONS], 100 * 400)
+
+    def test_write_report(self):
+        directory = tempfile.mkdtemp()
+        try:
+            instrumentation.enable()
+            with instrumentation.stage('stage'):
+                instrumentation.count(instrumentation.ROWS_WRITTEN, 7)
+            report_file = os.path.join(directory, 'profile.json')
+            trace_file = os.path.join(directory, 'trace.json')
+            self.assertTrue(instrumentation.write_report(report_file))
+            self.assertTrue(instrumentation.write_report(trace_file, chrome_trace=True))
+            with open(report_file) as file:
+                self.assertEqual(json.load(file), instrumentation.get_report())
+            with open(trace_file) as file:
+                trace_events = json.load(file)['traceEvents']
+            self.assertEqual([event['ph'] for event in trace_events], ['X', 'C'])
+            self.assertEqual(trace_events[0]['name'], 'stage')
+            self.assertEqual(trace_events[1]['args'], {instrumentation.ROWS_WRITTEN: 7})
+            # a file in a directory that does not exist could not be written
+            self.assertFalse(instrumentation.write_report(os.path.join(directory, 'missing', 'profile.json')))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import numpy as np
+import datasets as ds
+import matching
+
+
+class UnitTestMatching(unittest.TestCase):
+    def test_find_best_fit(self):
+        # the numpy method should find the same ideal functions with the same
+        # maximum distances as the python method for every train function
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        for c in ['y1', 'y2', 'y3', 'y4']:
+            y_column = train_dataframe[c].tolist()
+            expected_result = ideal_data_set.compare_function(y_column)
+            for chunk_size in [None, 1, 7]:
+                result = ideal_data_set.compare_function(y_column, method='numpy', chunk_size=chunk_size)
+                self.assertEqual(result['ideal_function_found'], expected_result['ideal_function_found'])
+                self.assertAlmostEqual(result['max_distance'], expected_result['max_distance'])
+
+        # on equal sums of squared distances the first candidate wins,
+        # also if it is in an earlier block
+        candidates = np.array([[1.0, 2.0], [0.0, 0.0], [0.0, 0.0], [0.5, 0.5]])
+        best_index, least_squared_distance, max_distance = \
+            matching.find_best_fit(candidates, [0.0, 0.0], chunk_size=1)
+        self.assertEqual(best_index, 1)
+        self.assertEqual(least_squared_distance, 0.0)
+
+        # the maximum distance is the largest positive deviation of the candidate
+        best_index, least_squared_distance, max_distance = \
+            matching.find_best_fit(np.array([[1.0, -3.0]]), [0.0, 0.0])
+        self.assertEqual(max_distance, 1.0)
+        self.assertEqual(least_squared_distance, 10.0)
+
+        # without any candidate no function is found
+        best_index, least_squared_distance, max_distance = \
+            matching.find_best_fit(np.empty((0, 2)), [0.0, 0.0])
+        self.assertIsNone(best_index)
+
+    def test_find_best_fits(self):
+        # the batch matching should give exactly the same results as
+        # find_best_fit for every single function
+        rng = np.random.default_rng(1)
+        candidates = rng.normal(size=(40, 300))
+        # duplicate candidates to check that the first one wins on equal sums
+        candidates[25] = candidates[3]
+        queries = candidates[[3, 10, 39]] + rng.normal(scale=0.01, size=(3, 300))
+        results = matching.find_best_fits(candidates, queries, chunk_size=9)
+        for query, result in zip(queries, results):
+            self.assertEqual(result, matching.find_best_fit(candidates, query))
+        self.assertEqual([r[0] for r in results], [3, 10, 39])
+
+        # the batch matching of the ideal data set should find the same
+        # functions as the python method
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        expected_results = ideal_data_set.compare_functions(train_dataframe, method='python')
+        results = ideal_data_set.compare_functions(train_dataframe)
+        self.assertEqual(list(results.keys()), ['y1', 'y2', 'y3', 'y4'])
+        for c in results:
+            self.assertEqual(results[c]['ideal_function_found'], expected_results[c]['ideal_function_found'])
+            self.assertAlmostEqual(results[c]['max_distance'], expected_results[c]['max_distance'])
+
+    def test_find_best_fit_pruned(self):
+        # the pruned search should give exactly the same results as the
+        # exhaustive search, with and without ordering by the lower bounds
+        rng = np.random.default_rng(4)
+        for trial in range(100):
+            candidates = rng.integers(-3, 3, size=(rng.integers(1, 30), rng.integers(0, 50))).astype(float)
+            # duplicate candidates to check that the first one wins on equal sums
+            candidates[-1] = candidates[0]
+            y_values = rng.integers(-3, 3, size=candidates.shape[1]).astype(float)
+            means, norms = matching.candidate_statistics(candidates, chunk_size=3)
+            lower_bounds = matching.get_lower_bounds(means, norms, y_values)
+            expected_result = matching.find_best_fit(candidates, y_values)
+            sums, max_distances = matching.candidate_errors(candidates, y_values)
+            self.assertTrue((lower_bounds <= sums * (1 + 1e-12)).all())
+            for bounds in [None, lower_bounds]:
+                self.assertEqual(matching.find_best_fit_pruned(candidates, y_values, chunk_size=4, segment_size=7,
+                                                               lower_bounds=bounds), expected_result)
+
+        # far away from 0 the rounding errors of the means and norms are greater than
+        # the differences of candidates that differ only in the last digits of a few
+        # x-samples, the lower bounds must still not abandon the best candidate
+        for offset in [1e3, 1e6]:
+            for trial in range(20):
+                y_values = offset + rng.normal(size=400)
+                candidates = np.tile(y_values, (30, 1))
+                for candidate in candidates:
+                    changed = rng.choice(400, size=20, replace=False)
+                    candidate[changed] += rng.integers(-3, 4, size=20) * np.spacing(y_values[changed])
+                means, norms = matching.candidate_statistics(candidates)
+                lower_bounds = matching.get_lower_bounds(means, norms, y_values)
+                sums, max_distances = matching.candidate_errors(candidates, y_values)
+                self.assertTrue((lower_bounds <= sums).all())
+                self.assertEqual(matching.find_best_fit_pruned(candidates, y_values, lower_bounds=lower_bounds),
+                                 matching.find_best_fit(candidates, y_values))
+
+        # the pruned method of the ideal data set should find the same functions
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        self.assertEqual(ideal_data_set.compare_functions(train_dataframe, method='pruned'),
+                         ideal_data_set.compare_functions(train_dataframe))
+        y_column = train_dataframe['y2'].tolist()
+        self.assertEqual(ideal_data_set.compare_function(y_column, method='pruned'),
+                         ideal_data_set.compare_function(y_column, method='numpy'))
+        # the means and norms are calculated only once for all comparisons
+        self.assertIs(ideal_data_set.get_candidate_statistics(), ideal_data_set.get_candidate_statistics())
+
+    def test_class_ParallelMatcher(self):
+        # the parallel matching should give exactly the same results as the
+        # serial matching, also with duplicate candidates in different shards
+        rng = np.random.default_rng(2)
+        candidates = rng.normal(size=(30, 200))
+        candidates[29] = candidates[2]
+        queries = candidates[[2, 15, 28]] + rng.normal(scale=0.01, size=(3, 200))
+        with matching.ParallelMatcher(candidates, workers=3) as parallel_matcher:
+            self.assertEqual(parallel_matcher.find_best_fits(queries, chunk_size=4),
+                             matching.find_best_fits(candidates, queries))
+            self.assertEqual(parallel_matcher.find_best_fit(queries[0]),
+                             matching.find_best_fit(candidates, queries[0]))
+
+        # the parallel method of the ideal data set should find the same functions
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        self.assertEqual(ideal_data_set.compare_functions(train_dataframe, method='parallel', workers=2),
+                         ideal_data_set.compare_functions(train_dataframe))
+        y_column = train_dataframe['y1'].tolist()
+        self.assertEqual(ideal_data_set.compare_function(y_column, method='parallel', workers=2),
+                         ideal_data_set.compare_function(y_column, method='numpy'))
+
+        # the worker processes are started once and reused by all comparisons
+        # with the same number of workers until the data set is closed
+        parallel_matcher = ideal_data_set.get_parallel_matcher(workers=2)
+        self.assertIs(ideal_data_set.get_parallel_matcher(workers=2), parallel_matcher)
+        self.assertIsNot(ideal_data_set.get_parallel_matcher(workers=1), parallel_matcher)
+        ideal_data_set.close()
+        self.assertIsNone(ideal_data_set.parallel_matcher)
+
+
+if __name__ == '__main__':
+    unittest.main()
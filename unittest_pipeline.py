@@ -0,0 +1,49 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from database import SQLiteDataBase
+import datasets as ds
+import pipeline
+
+
+class UnitTestPipeline(unittest.TestCase):
+
+    def test_load_concurrently(self):
+        # the results come back in the order of the loaders
+        futures = pipeline.load_concurrently([lambda: ds.DataSet('TrainDataSet', 'train.csv'),
+                                              lambda: ds.IdealDataSet('IdealDataSet', 'ideal.csv')])
+        self.assertIsInstance(futures[0].result(), ds.DataSet)
+        self.assertIsInstance(futures[1].result(), ds.IdealDataSet)
+
+        # an exception of a loader is raised when the result is requested
+        futures = pipeline.load_concurrently([lambda: ds.DataSet('NoDataSet', 'not_existing_file.csv')])
+        with self.assertRaises(FileNotFoundError):
+            futures[0].result()
+
+    def test_class_DatabaseWriter(self):
+        # use a database in a temporary directory to keep the database of the program untouched
+        directory = tempfile.mkdtemp()
+        try:
+            database_file = os.path.join(directory, 'test.db')
+            train_data_set = ds.DataSet('TrainData', 'train.csv')
+            ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv')
+            with SQLiteDataBase('/' + database_file) as db:
+                with pipeline.DatabaseWriter(db) as database_writer:
+                    futures = [database_writer.write(train_data_set),
+                               database_writer.write(ideal_data_set, mode='bulk')]
+                # everything is written at the end of the with-statement
+                self.assertTrue(all(future.done() and future.result() for future in futures))
+            connection = sqlite3.connect(database_file)
+            try:
+                self.assertEqual(connection.execute('SELECT COUNT(*) FROM TrainData').fetchone()[0], 400)
+                self.assertEqual(connection.execute('SELECT COUNT(*) FROM IdealData').fetchone()[0], 400)
+            finally:
+                connection.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
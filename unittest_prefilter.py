@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import datasets as ds
+import matching
+import prefilter
+
+
+class UnitTestPrefilter(unittest.TestCase):
+    def setUp(self):
+        # the index files are written next to the data file,
+        # so a copy of the data file in a temporary directory is used
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'ideal.csv')
+        shutil.copyfile('ideal.csv', self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_class_PrefilterIndex(self):
+        # the lower bounds should never be greater than the sums of squared distances
+        rng = np.random.default_rng(5)
+        for number_of_samples in [0, 1, 5, 300]:
+            candidates = rng.normal(size=(20, number_of_samples)) + rng.normal(size=(20, 1))
+            y_values = rng.normal(size=number_of_samples)
+            sums, max_distances = matching.candidate_errors(candidates, y_values)
+            for number_of_segments in [1, 7, 64]:
+                prefilter_index = prefilter.build_prefilter_index(candidates, number_of_segments, chunk_size=6)
+                lower_bounds = prefilter_index.get_lower_bounds(y_values)
+                self.assertTrue((lower_bounds <= sums * (1 + 1e-12)).all())
+
+        # also far away from 0, where the rounding errors of the summaries are greater
+        # than the differences of candidates that differ only in the last digits of a
+        # few x-samples, the indexed search should find the same candidate
+        for offset in [1e3, 1e6]:
+            for trial in range(20):
+                y_values = offset + rng.normal(size=400)
+                candidates = np.tile(y_values, (30, 1))
+                for candidate in candidates:
+                    changed = rng.choice(400, size=20, replace=False)
+                    candidate[changed] += rng.integers(-3, 4, size=20) * np.spacing(y_values[changed])
+                sums, max_distances = matching.candidate_errors(candidates, y_values)
+                lower_bounds = prefilter.build_prefilter_index(candidates).get_lower_bounds(y_values)
+                self.assertTrue((lower_bounds <= sums).all())
+                self.assertEqual(matching.find_best_fit_pruned(candidates, y_values, lower_bounds=lower_bounds),
+                                 matching.find_best_fit(candidates, y_values))
+
+    def test_prefilter_index_file(self):
+        # the index is only stored next to the data file when the dataset uses the cache
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', self.filename)
+        ideal_data_set.get_prefilter_index()
+        for index_filename in prefilter.get_prefilter_filenames(self.filename):
+            self.assertFalse(os.path.exists(index_filename))
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', self.filename, cache=True)
+        prefilter_index = ideal_data_set.get_prefilter_index()
+        for index_filename in prefilter.get_prefilter_filenames(self.filename):
+            self.assertTrue(os.path.exists(index_filename))
+
+        # the stored index contains the same summaries
+        columns = ideal_data_set.get_function_columns()
+        stored_index = prefilter.read_prefilter_index(self.filename, columns)
+        np.testing.assert_array_equal(stored_index.segment_means, prefilter_index.segment_means)
+        np.testing.assert_array_equal(stored_index.norms, prefilter_index.norms)
+
+        # the index is only valid for the same columns and load options
+        self.assertIsNone(prefilter.read_prefilter_index(self.filename, columns[1:]))
+        self.assertIsNone(prefilter.read_prefilter_index(self.filename, columns, dtype='float32'))
+
+        # the index is not valid anymore when the data file changes
+        with open(self.filename, 'a') as file:
+            file.write('20.0' + ',1.0' * len(columns) + '\n')
+        self.assertIsNone(prefilter.read_prefilter_index(self.filename, columns))
+
+    def test_compare_method_indexed(self):
+        # the indexed method should find the same functions as the exhaustive search
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', self.filename, cache=True)
+        train_dataframe = ds.DataSet('TrainDataSet', 'train.csv').get_dataframe()
+        expected_results = ideal_data_set.compare_functions(train_dataframe)
+        self.assertEqual(ideal_data_set.compare_functions(train_dataframe, method='indexed'), expected_results)
+        # also with the index read from the file
+        ideal_data_set = ds.IdealDataSet('IdealDataSet', self.filename, cache=True)
+        self.assertEqual(ideal_data_set.compare_function(train_dataframe['y4'].tolist(), method='indexed'),
+                         expected_results['y4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
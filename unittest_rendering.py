@@ -0,0 +1,70 @@
+import unittest
+import matplotlib
+import numpy as np
+import rendering
+
+# render the plots without a window
+matplotlib.use('Agg')
+
+
+class UnitTestRendering(unittest.TestCase):
+    def test_decimate_line(self):
+        rng = np.random.default_rng(3)
+        x_values = np.linspace(-20, 20, 100000)
+        y_values = np.sin(x_values) + rng.normal(0, 0.1, len(x_values))
+        decimated_x, decimated_y = rendering.decimate_line(x_values, y_values, buckets=500)
+        # at most four points per bucket in the order of the x-values
+        self.assertLessEqual(len(decimated_x), 4 * 500)
+        self.assertTrue((np.diff(decimated_x) >= 0).all())
+        # the first, the last, the lowest and the highest point of the line are kept
+        self.assertEqual((decimated_x[0], decimated_x[-1]), (x_values[0], x_values[-1]))
+        self.assertEqual((decimated_y.min(), decimated_y.max()), (y_values.min(), y_values.max()))
+        # every kept point is a point of the line
+        positions = np.searchsorted(x_values, decimated_x)
+        np.testing.assert_array_equal(y_values[positions], decimated_y)
+
+        # the points of an unsorted line are sorted by their x-values
+        order = rng.permutation(len(x_values))
+        unsorted_x, unsorted_y = rendering.decimate_line(x_values[order], y_values[order], buckets=500)
+        np.testing.assert_array_equal(unsorted_x, decimated_x)
+        np.testing.assert_array_equal(unsorted_y, decimated_y)
+
+        # a short line is not changed
+        short_x, short_y = rendering.decimate_line(x_values[:100], y_values[:100], buckets=500)
+        np.testing.assert_array_equal(short_x, x_values[:100])
+        np.testing.assert_array_equal(short_y, y_values[:100])
+
+    def test_bin_points(self):
+        rng = np.random.default_rng(4)
+        x_values = rng.normal(size=5000)
+        y_values = rng.normal(size=5000)
+        counts, extent = rendering.bin_points(x_values, y_values, bins=(30, 20))
+        self.assertEqual(counts.shape, (20, 30))
+        self.assertEqual(counts.sum(), 5000)
+        self.assertEqual(extent, (x_values.min(), x_values.max(), y_values.min(), y_values.max()))
+
+    def test_plot(self):
+        from matplotlib import pyplot as plt
+        x_values = np.linspace(0, 1, 50000)
+        y_values = x_values ** 2
+        for mode in rendering.RENDER_MODES:
+            fig, ax = plt.subplots(figsize=(10, 6))
+            rendering.plot_line(ax, x_values, y_values, mode=mode, label='line')
+            rendering.plot_points(ax, x_values, y_values, 'bo', mode=mode, max_points=1000, label='points')
+            drawn_points = len(ax.lines[0].get_xdata())
+            if mode == 'full':
+                self.assertEqual(drawn_points, len(x_values))
+                self.assertEqual(len(ax.images), 0)
+            else:
+                # not more points than could be seen in the width of the plot
+                self.assertLessEqual(drawn_points, 4 * rendering.get_number_of_buckets(ax))
+                self.assertEqual(len(ax.images), 1)
+            # both are in the legend
+            self.assertEqual([line.get_label() for line in ax.lines], ['line', 'points'])
+            plt.close(fig)
+        with self.assertRaises(ValueError):
+            rendering.plot_line(None, x_values, y_values, mode='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
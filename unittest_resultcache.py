@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from database import SQLiteDataBase
+import datasets as ds
+import resultcache
+
+
+class UnitTestResultCache(unittest.TestCase):
+
+    def test_get_key(self):
+        # the same y-values give the same key in every form
+        y_values = [0.5, 1.5, 2.25]
+        key = resultcache.get_key('version', y_values)
+        self.assertEqual(resultcache.get_key('version', np.array(y_values)), key)
+        self.assertNotEqual(resultcache.get_key('other version', y_values), key)
+        self.assertNotEqual(resultcache.get_key('version', [0.5, 1.5, 2.5]), key)
+
+    def test_class_MatchResultCache(self):
+        # the least recently used result is dropped from memory
+        cache = resultcache.MatchResultCache(max_entries=2)
+        cache.put('a', {"ideal_function_found": 'y1', "max_distance": 0.5})
+        cache.put('b', {"ideal_function_found": 'y2', "max_distance": 0.25})
+        self.assertEqual(cache.get('a'), {"ideal_function_found": 'y1', "max_distance": 0.5})
+        cache.put('c', {"ideal_function_found": 'y3', "max_distance": 0.125})
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # with a database the results survive the cache
+        directory = tempfile.mkdtemp()
+        try:
+            with SQLiteDataBase('/' + os.path.join(directory, 'test.db')) as db:
+                cache = resultcache.MatchResultCache(db, max_entries=1)
+                cache.put('a', {"ideal_function_found": 'y1', "max_distance": 0.5})
+                cache.put('b', {"ideal_function_found": None, "max_distance": 0.0})
+                cache = resultcache.MatchResultCache(db)
+                self.assertEqual(cache.get('a'), {"ideal_function_found": 'y1', "max_distance": 0.5})
+                self.assertEqual(cache.get('b'), {"ideal_function_found": None, "max_distance": 0.0})
+                self.assertIsNone(cache.get('c'))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_compare_functions_with_cache(self):
+        ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainData', 'train.csv').get_dataframe()
+        expected_results = ideal_data_set.compare_functions(train_dataframe)
+        cache = resultcache.MatchResultCache()
+        # the first call compares every function, the second one only reads the cache
+        self.assertEqual(ideal_data_set.compare_functions(train_dataframe[['x', 'y1', 'y2']], result_cache=cache),
+                         {c: expected_results[c] for c in ['y1', 'y2']})
+        self.assertEqual(ideal_data_set.compare_functions(train_dataframe, result_cache=cache), expected_results)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(ideal_data_set.compare_function(train_dataframe['y3'].tolist(), result_cache=cache),
+                         expected_results['y3'])
+        self.assertEqual(cache.hits, 3)
+
+        # loading other columns of the ideal data gives another version
+        other_ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv', usecols=['x', 'y1', 'y2'])
+        self.assertNotEqual(other_ideal_data_set.get_version(), ideal_data_set.get_version())
+
+
+if __name__ == '__main__':
+    unittest.main()
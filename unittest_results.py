@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from database import SQLiteDataBase
+import datasets as ds
+import results
+
+
+class UnitTestResults(unittest.TestCase):
+
+    def test_get_results(self):
+        test_data_set = ds.TestDataSet('TestData', 'test.csv')
+        ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv')
+        test_data_set.check_coordinates_against_functions([(ideal_data_set.get_ideal_function_by_name('y36'),
+                                                            'y36', 0.5)])
+        ideal_functions_found = [{"TrainFunction": 'y1', "IdealFunction": 'y36', "MaxDistance": 0.5}]
+        result = results.get_results(ideal_functions_found, test_data_set.get_dataframe())
+        # the results could be written as json and contain every test point
+        result = json.loads(json.dumps(result))
+        self.assertEqual(result['matches'], ideal_functions_found)
+        self.assertEqual(len(result['assignments']['x']), 100)
+        self.assertEqual(sum(result['assignment_counts'].values()), 100)
+        self.assertEqual(result['assignment_counts']['y36'],
+                         result['assignments']['IdealFunction'].count('y36'))
+
+    def test_write_results(self):
+        # use a temporary directory to keep the database of the program untouched
+        directory = tempfile.mkdtemp()
+        try:
+            ideal_functions_found = [{"TrainFunction": 'y1', "IdealFunction": 'y36', "MaxDistance": 0.5},
+                                     {"TrainFunction": 'y2', "IdealFunction": 'y11', "MaxDistance": 0.25}]
+            results_file = os.path.join(directory, 'results.json')
+            self.assertTrue(results.write_results_file(results_file, {"matches": ideal_functions_found}))
+            with open(results_file) as file:
+                self.assertEqual(json.load(file), {"matches": ideal_functions_found})
+            self.assertFalse(results.write_results_file(os.path.join(directory, 'missing', 'results.json'), {}))
+
+            database_file = os.path.join(directory, 'test.db')
+            with SQLiteDataBase('/' + database_file) as db:
+                self.assertTrue(results.write_matches_to_database(db, ideal_functions_found))
+            connection = sqlite3.connect(database_file)
+            try:
+                rows = connection.execute('SELECT TrainFunction, IdealFunction, MaxDistance FROM ' +
+                                          results.MATCHES_TABLE).fetchall()
+            finally:
+                connection.close()
+            self.assertEqual(rows, [('y1', 'y36', 0.5), ('y2', 'y11', 0.25)])
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+import datasets as ds
+import server
+
+
+class UnitTestServer(unittest.TestCase):
+
+    def test_class_MatchingService(self):
+        ideal_data_set = ds.IdealDataSet('IdealData', 'ideal.csv')
+        train_dataframe = ds.DataSet('TrainData', 'train.csv').get_dataframe()
+        service = server.MatchingService(ideal_data_set)
+        self.assertEqual(service.get_status(), {"ideal_functions": 50, "x_values": 400})
+
+        # the service should find the same functions as compare_functions
+        functions = {c: train_dataframe[c].tolist() for c in ['y1', 'y2', 'y3', 'y4']}
+        self.assertEqual(service.match(functions), ideal_data_set.compare_functions(train_dataframe))
+        with self.assertRaises(ValueError):
+            service.match({'y1': [1.0, 2.0]})
+
+        # the service should assign the same functions as check_coordinates_against_functions
+        test_data_set = ds.TestDataSet('TestData', 'test.csv')
+        functions = [('y36', 0.5), ('y11', 0.49), ('y2', 0.5), ('y33', 0.49)]
+        test_data_set.check_coordinates_against_functions(
+            [(ideal_data_set.get_ideal_function_by_name(name), name, max_distance)
+             for name, max_distance in functions])
+        test_dataframe = test_data_set.get_dataframe()
+        assignment = service.assign(test_dataframe['x'].tolist(), test_dataframe['y'].tolist(), functions)
+        self.assertEqual(assignment['IdealFunction'], test_dataframe['IdealFunction'].tolist())
+        self.assertEqual(assignment['DeltaY'], test_dataframe['DeltaY'].astype(float).tolist())
+        with self.assertRaises(ValueError):
+            service.assign([1.0], [1.0], [('unknown', 1.0)])
+
+    def test_create_server(self):
+        service = server.MatchingService(ds.IdealDataSet('IdealData', 'ideal.csv'))
+        http_server = server.create_server(service, port=0)
+        thread = threading.Thread(target=http_server.serve_forever)
+        thread.start()
+        try:
+            url = 'http://127.0.0.1:' + str(http_server.server_address[1])
+            with urllib.request.urlopen(url + '/status') as response:
+                self.assertEqual(json.load(response), service.get_status())
+            y_values = ds.IdealDataSet('IdealData', 'ideal.csv').get_dataframe()['y7'].tolist()
+            request = urllib.request.Request(url + '/match', json.dumps({"functions": {"f": y_values}}).encode())
+            with urllib.request.urlopen(request) as response:
+                self.assertEqual(json.load(response)['f']['ideal_function_found'], 'y7')
+            # invalid requests are answered with an error
+            request = urllib.request.Request(url + '/assign', json.dumps({"x": [1.0]}).encode())
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)
+            self.assertEqual(context.exception.code, 400)
+            context.exception.close()
+        finally:
+            http_server.shutdown()
+            http_server.server_close()
+            thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from spatial import FunctionIndex, nearest_distances_parallel
+
+
+class UnitTestSpatial(unittest.TestCase):
+    def test_class_FunctionIndex(self):
+        # the distances found with the index should be exactly the same as the
+        # distances found by comparing every test point with every point
+        rng = np.random.default_rng(1)
+        x_values = rng.uniform(-20, 20, 2000)
+        y_values = np.sin(x_values) * 5 + x_values
+        test_x = rng.uniform(-21, 21, 500)
+        test_y = np.sin(test_x) * 5 + test_x + rng.normal(0, 1, 500)
+        radius = 0.7
+        expected_distances = np.hypot(test_x[:, np.newaxis] - x_values,
+                                      test_y[:, np.newaxis] - y_values).min(axis=1)
+        expected_distances[expected_distances > radius] = np.inf
+        for block_size in [None, 1, 7, 5000]:
+            function_index = FunctionIndex(x_values, y_values, block_size)
+            distances = function_index.nearest_distances(test_x, test_y, radius, chunk_bytes=10000)
+            np.testing.assert_array_equal(distances, expected_distances)
+
+        # without any point in the function no test point is within the radius
+        function_index = FunctionIndex([], [])
+        self.assertTrue(np.isinf(function_index.nearest_distances(test_x, test_y, radius)).all())
+
+    def test_nearest_distances_parallel(self):
+        # the distances calculated by the worker processes should be exactly
+        # the same as the distances calculated with one index per function
+        rng = np.random.default_rng(3)
+        x_values = np.linspace(-10, 10, 3000)
+        functions = [(x_values, np.sin(x_values) * k, 0.2 * k) for k in range(1, 4)]
+        test_x = rng.uniform(-11, 11, 1000)
+        test_y = rng.uniform(-3, 3, 1000)
+        expected_distances = np.column_stack([FunctionIndex(x, y).nearest_distances(test_x, test_y, radius)
+                                              for x, y, radius in functions])
+        for chunk_size in [None, 1, 333, 5000]:
+            distances = nearest_distances_parallel(functions, test_x, test_y, workers=2, chunk_size=chunk_size)
+            np.testing.assert_array_equal(distances, expected_distances)
+
+        # without functions or test points there is nothing to calculate
+        self.assertEqual(nearest_distances_parallel([], test_x, test_y).shape, (1000, 0))
+        self.assertEqual(nearest_distances_parallel(functions, [], []).shape, (0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()